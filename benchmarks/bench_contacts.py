@@ -0,0 +1,136 @@
+"""
+Benchmark of the parsing of the contact names and email addresses of birth cohorts.
+
+Compares derive_first_last_name and derive_email_address of
+scripts/import_birthcohorts.py (loaded from the script, without running it) with
+contacts.ContactParser. Uses the contacts and investigators of all cohorts of
+birthcohorts.net with --fetch, of a JSON file with cohorts (as returned by
+BirthCohorts.get_cohorts) with --cohorts, or of generated cohorts otherwise.
+
+Usage: python benchmarks/bench_contacts.py [--fetch | --cohorts cohorts.json]
+"""
+
+import argparse
+import ast
+import gc
+import json
+import logging
+import re
+import time
+from pathlib import Path
+from typing import List, Tuple
+
+from molgenis.eucan_connect.birthcohorts import BirthCohorts
+from molgenis.eucan_connect.contacts import TITLES, ContactParser
+from molgenis.eucan_connect.model import Catalogue
+from molgenis.eucan_connect.printer import Printer
+
+SCRIPT = Path(__file__).parents[1] / "scripts" / "import_birthcohorts.py"
+BIRTHCOHORTS_URL = (
+    "https://www.birthcohorts.net/wp-content/themes/x-child/rss.cohorts.php"
+)
+
+
+def load_script_functions() -> dict:
+    """Compiles only the function definitions of the import script"""
+    tree = ast.parse(SCRIPT.read_text())
+    functions = [node for node in tree.body if isinstance(node, ast.FunctionDef)]
+    namespace = {"re": re, "log": logging}
+    exec(compile(ast.Module(functions, type_ignores=[]), SCRIPT, "exec"), namespace)
+    return namespace
+
+
+def generated_cohorts(n_cohorts: int) -> List[dict]:
+    first_names = ["Jan", "Anne Marie", "J.A.", "Piet", "Kristine", "M.", "Lena"]
+    last_names = ["Jansen", "de Vries", "Bos (Jr)", "Smith", "Müller", "Olsen"]
+    titles = ["Prof.", "Dr.", "", "PhD", "MD"]
+    cohorts = []
+    for i in range(n_cohorts):
+        # Contacts recur over cohorts, a few persons run many cohorts
+        people = [
+            f"{titles[(i + j) % 5]} {first_names[(i + j) % 7]} "
+            f"{last_names[(i * j + j) % 6]}".strip()
+            for j in range(1 + i % 3)
+        ]
+        emails = [f"person{(i + j) % 40} at cohort.org" for j in range(len(people))]
+        cohorts.append(
+            {
+                "identification": {
+                    "contact": {"name": "; ".join(people), "email": "; ".join(emails)},
+                    "investigator": {"name": people[0], "email": emails[0]},
+                }
+            }
+        )
+    return cohorts
+
+
+def contact_lists(cohorts: List[dict]) -> List[Tuple[str, str]]:
+    """The names and email addresses of the contacts and investigators"""
+    lists = []
+    for cohort in cohorts:
+        for role in ["contact", "investigator"]:
+            names = cohort["identification"][role]["name"]
+            emails = cohort["identification"][role]["email"]
+            if isinstance(names, str):
+                lists.append((names, emails if isinstance(emails, str) else ""))
+    return lists
+
+
+def script_parsing(lists, functions):
+    parser = ContactParser()
+    for names, emails in lists:
+        for i, name in enumerate(parser.split_names(names), start=1):
+            if name:
+                functions["derive_first_last_name"](name, TITLES)
+                if emails:
+                    # The script passes the position in a global variable
+                    functions["i"] = i
+                    functions["derive_email_address"](emails)
+
+
+def parser_parsing(lists, parser: ContactParser):
+    for names, emails in lists:
+        for i, name in enumerate(parser.split_names(names), start=1):
+            if name:
+                parser.parse(name)
+                if emails:
+                    parser.email_address(emails, i)
+
+
+def timed(function, *args) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    arguments = argparse.ArgumentParser()
+    arguments.add_argument("--fetch", action="store_true")
+    arguments.add_argument("--cohorts", type=Path)
+    args = arguments.parse_args()
+
+    logging.disable(logging.WARNING)
+    if args.fetch:
+        catalogue = Catalogue("BC", "BirthCohorts", BIRTHCOHORTS_URL, "BirthCohorts")
+        cohorts = BirthCohorts(None, Printer(), catalogue).get_cohorts()
+    elif args.cohorts:
+        cohorts = json.loads(args.cohorts.read_text())
+    else:
+        cohorts = generated_cohorts(1000)
+
+    lists = contact_lists(cohorts)
+    functions = load_script_functions()
+    # Repeated 20 times, as in a run over many catalogues with recurring contacts
+    lists = lists * 20
+    parser = ContactParser()
+    script = timed(script_parsing, lists, functions)
+    parsed = timed(parser_parsing, lists, parser)
+    info = parser.cache_info()
+    print(f"{len(lists)} contact lists of {len(cohorts)} cohorts")
+    print(f"script functions  {script:>8.3f} s")
+    print(f"ContactParser     {parsed:>8.3f} s   ({info.hits} memo hits)")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,77 @@
+"""
+Benchmark of the encoding of the upload payloads.
+
+Compares the previous encoding of the add_all requests (converting the NumPy values
+by hand and json.dumps of a list of dicts per batch) with payload.encode, with and
+without orjson installed.
+
+Usage: python benchmarks/bench_payload.py
+"""
+
+import gc
+import json
+import time
+from unittest.mock import patch
+
+import numpy as np
+
+from molgenis.eucan_connect import payload, utils
+from molgenis.eucan_connect.model import ColumnarRows
+
+
+def event_rows(n_rows: int):
+    return [
+        {
+            "id": f"lifecycle:eventID:{i:07}",
+            "name": f"COHORT{i % 500} - event {i}",
+            "start_year": np.int64(1990 + i % 30),
+            "biosamples_type": np.array(["blood", "urine"], dtype=object),
+            "source_catalogue": "LC",
+        }
+        for i in range(n_rows)
+    ]
+
+
+def previous_encoding(rows):
+    """Conversion of the NumPy values and json.dumps of every batch of rows"""
+    for batch in utils.batched(rows, 1000):
+        entities = []
+        for row in batch:
+            entity = row.to_dict()
+            for key, value in entity.items():
+                if isinstance(value, np.ndarray):
+                    entity[key] = value.tolist()
+                elif isinstance(value, np.generic):
+                    entity[key] = value.item()
+            entities.append(entity)
+        json.dumps({"entities": entities})
+
+
+def payload_encoding(rows):
+    for batch in utils.batched(rows, 1000):
+        payload.encode(batch)
+
+
+def timed(function, rows) -> float:
+    gc.collect()
+    start = time.perf_counter()
+    function(rows)
+    return time.perf_counter() - start
+
+
+def main():
+    print("rows       previous      stdlib        orjson")
+    for n_rows in [10_000, 100_000, 500_000]:
+        rows = ColumnarRows(event_rows(n_rows)).rows
+        previous = timed(previous_encoding, rows)
+        with patch.object(payload, "orjson", None):
+            stdlib = timed(payload_encoding, rows)
+        if payload.orjson is not None:
+            fast = f"{timed(payload_encoding, rows):>9.3f} s"
+        else:
+            fast = "not installed"
+        print(f"{n_rows:<10} {previous:>9.3f} s   {stdlib:>9.3f} s   {fast}")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,244 @@
+"""
+Scaling benchmark of the import pipeline on synthetic LifeCycle data.
+
+Runs the stages of the import of a LifeCycle catalogue on generated cohorts (see
+synthetic.py) for several catalogue sizes, without a server:
+
+- transform: LifeCycle.transform of the GraphQL payload to the source frame
+- ref_modifier: RefModifier on the source frame
+- create_catalogue_data: EucanSession.create_catalogue_data
+- import: Importer.import_catalogue_data, the request bodies are encoded but not sent
+
+Records the time and the traced peak memory of every stage and compares them with
+benchmarks/baseline.json, which has the results per size and cohort shape
+("cohorts:contributors:events:subcohorts"). Exits with status 1 when a stage is
+slower or takes more memory than the baseline allows (by default 50% more time or
+20% more memory).
+
+Wall-clock seconds depend on the machine, so the time is compared in time units:
+the seconds of a stage divided by the seconds of a fixed calibration workload (see
+calibrate) on the same machine. The seconds are recorded for information only.
+
+The large target runs 10k cohorts (--large), the size of the biggest source
+catalogues. LifeCycle.transform takes about 20 minutes for 10k cohorts and the run
+under tracemalloc is several times slower, so the target takes a few hours and is
+not part of the default sizes. Record its baseline on its own with
+--sizes 10000 --update-baseline.
+
+Usage: python benchmarks/bench_pipeline.py [--sizes 10 50 200] [--large]
+                                           [--contributors 2] [--events 3]
+                                           [--subcohorts 2] [--update-baseline]
+"""
+
+import argparse
+import contextlib
+import copy
+import io
+import json
+import sys
+import time
+import tracemalloc
+import warnings
+from pathlib import Path
+from typing import Callable, Dict, List
+
+import pandas as pd
+import synthetic
+
+from molgenis.eucan_connect.eucan_client import EucanSession
+from molgenis.eucan_connect.importer import Importer
+from molgenis.eucan_connect.lifecycle import LifeCycle
+from molgenis.eucan_connect.model import Catalogue, TableMeta
+from molgenis.eucan_connect.printer import Printer
+from molgenis.eucan_connect.ref_modifier import RefModifier
+
+BASELINE = Path(__file__).parent / "baseline.json"
+STAGES = ["transform", "ref_modifier", "create_catalogue_data", "import"]
+LARGE_SIZE = 10000
+"""The number of cohorts of the large target"""
+NOISE = {"time_units": 0.1, "peak_mib": 0.01}
+"""Differences in the order of timer and allocator noise, these are ignored"""
+
+
+class OfflineSession(EucanSession):
+    """
+    An EucanSession that does not connect: the metadata is empty, the catalogue has
+    no rows yet and the encoded request bodies are counted instead of sent.
+    """
+
+    def __init__(self):
+        super().__init__(url="http://localhost/api/")
+        self.uploaded_bytes = 0
+
+    def get_meta(self, entity_type_id: str) -> TableMeta:
+        return TableMeta(meta={})
+
+    def get(self, entity_type_id: str, *args, **kwargs) -> List[dict]:
+        return []
+
+    def delete_list(self, entity_type_id: str, entities: List[str]):
+        pass
+
+    def add_encoded(self, entity_type_id: str, body: bytes, retries: int = 2):
+        self.uploaded_bytes += len(body)
+        return []
+
+
+def pipeline(cohorts: List[dict]) -> Dict[str, Callable[[], None]]:
+    """The stages of the import, every stage works on the output of the previous"""
+    catalogue = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    session = OfflineSession()
+    printer = Printer()
+    ref_data = synthetic.reference_data()
+    state = dict()
+
+    def transform():
+        lifecycle = LifeCycle(session, printer, catalogue)
+        state["source_data"] = lifecycle.transform(copy.deepcopy(cohorts))
+
+    def ref_modifier():
+        RefModifier(printer, ref_data, state["source_data"]).ref_modifier()
+
+    def create_catalogue_data():
+        state["catalogue_data"] = session.create_catalogue_data(
+            catalogue, state["source_data"]
+        )
+
+    def import_():
+        Importer(session, printer).import_catalogue_data(state["catalogue_data"])
+
+    return dict(zip(STAGES, [transform, ref_modifier, create_catalogue_data, import_]))
+
+
+def calibrate(repeat: int = 5) -> float:
+    """
+    The seconds of a fixed workload of dict, list, pandas and JSON operations (the
+    kind of work the stages do), the fastest of a few runs
+    """
+    rows = [
+        {"id": f"row{i}", "value": i % 97, "labels": [str(i), str(i * 7)]}
+        for i in range(20000)
+    ]
+    times = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        frame = pd.DataFrame(copy.deepcopy(rows))
+        frame.groupby("value")["id"].count()
+        frame["labels"].explode().unique()
+        json.dumps(frame.to_dict("records"))
+        times.append(time.perf_counter() - start)
+    return min(times)
+
+
+def measure(cohorts: List[dict], calibration: float) -> Dict[str, Dict[str, float]]:
+    """
+    Runs the pipeline twice: once for the time and once under tracemalloc for the
+    peak memory, since tracing slows down the stages
+
+    :param cohorts: the cohorts to import
+    :param calibration: the seconds of the calibration workload on this machine
+    """
+    results = {stage: dict() for stage in STAGES}
+    with contextlib.redirect_stdout(io.StringIO()):
+        for stage, run in pipeline(cohorts).items():
+            start = time.perf_counter()
+            run()
+            seconds = time.perf_counter() - start
+            results[stage]["seconds"] = round(seconds, 4)
+            results[stage]["time_units"] = round(seconds / calibration, 2)
+
+        for stage, run in pipeline(cohorts).items():
+            tracemalloc.start()
+            run()
+            _, peak = tracemalloc.get_traced_memory()
+            tracemalloc.stop()
+            results[stage]["peak_mib"] = round(peak / 2 ** 20, 2)
+    return results
+
+
+def regressions(
+    results: Dict[str, dict],
+    baseline: Dict[str, dict],
+    time_tolerance: float,
+    memory_tolerance: float,
+) -> List[str]:
+    """The stages that take more time or memory than the baseline allows"""
+    found = []
+    for key, stages in results.items():
+        for stage, measured in stages.items():
+            expected = baseline.get(key, {}).get(stage)
+            if expected is None:
+                continue
+            for metric, tolerance in [
+                ("time_units", time_tolerance),
+                ("peak_mib", memory_tolerance),
+            ]:
+                if metric not in expected:
+                    continue
+                limit = expected[metric] * (1 + tolerance)
+                if (
+                    measured[metric] > limit
+                    and measured[metric] - limit > NOISE[metric]
+                ):
+                    found.append(
+                        f"{stage} ({key}): {metric} {measured[metric]} "
+                        f"exceeds the baseline {expected[metric]} by more than "
+                        f"{tolerance:.0%}"
+                    )
+    return found
+
+
+def main():
+    arguments = argparse.ArgumentParser()
+    arguments.add_argument("--sizes", type=int, nargs="+", default=[10, 50, 200])
+    arguments.add_argument(
+        "--large", action="store_true", help=f"run {LARGE_SIZE} cohorts as well"
+    )
+    arguments.add_argument("--contributors", type=int, default=2)
+    arguments.add_argument("--events", type=int, default=3)
+    arguments.add_argument("--subcohorts", type=int, default=2)
+    arguments.add_argument("--time-tolerance", type=float, default=0.5)
+    arguments.add_argument("--memory-tolerance", type=float, default=0.2)
+    arguments.add_argument("--update-baseline", action="store_true")
+    args = arguments.parse_args()
+
+    # The deprecation warnings of pandas would be printed for every cohort
+    warnings.simplefilter("ignore", FutureWarning)
+
+    sizes = args.sizes + ([LARGE_SIZE] if args.large else [])
+    calibration = calibrate()
+    print(f"Calibration workload: {calibration:.3f} s (1 time unit)")
+
+    results = dict()
+    print(
+        f"{'cohorts':<9} {'stage':<22} {'time':>10} {'time units':>11} "
+        f"{'peak memory':>14}"
+    )
+    for size in sizes:
+        cohorts = synthetic.lifecycle_cohorts(
+            size, args.contributors, args.events, args.subcohorts
+        )
+        key = f"{size}:{args.contributors}:{args.events}:{args.subcohorts}"
+        results[key] = measure(cohorts, calibration)
+        for stage, measured in results[key].items():
+            print(
+                f"{size:<9} {stage:<22} {measured['seconds']:>8.3f} s "
+                f"{measured['time_units']:>11.2f} {measured['peak_mib']:>10.2f} MiB"
+            )
+
+    baseline = json.loads(BASELINE.read_text()) if BASELINE.exists() else {}
+    if args.update_baseline:
+        baseline.update(results)
+        BASELINE.write_text(json.dumps(baseline, indent=2, sort_keys=True) + "\n")
+        print(f"Baseline written to {BASELINE}")
+        return
+
+    found = regressions(results, baseline, args.time_tolerance, args.memory_tolerance)
+    for regression in found:
+        print(f"REGRESSION {regression}")
+    if found:
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
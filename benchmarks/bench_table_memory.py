@@ -0,0 +1,66 @@
+"""
+Benchmark of the memory that a model.Table takes for its rows.
+
+Builds a persons table of sparse rows (not every person has every attribute) and
+compares the traced allocations of the columnar ColumnarRows storage with the
+previous OrderedDict of per-row dicts.
+
+Usage: python benchmarks/bench_table_memory.py
+"""
+import tracemalloc
+from collections import OrderedDict
+
+from molgenis.eucan_connect.model import Table, TableMeta, TableType
+
+
+def person_rows(n_rows: int):
+    rows = []
+    for i in range(n_rows):
+        row = {
+            "id": f"lifecycle:contactID:{i:07}",
+            "first_name": f"First{i % 1000}",
+            "last_name": f"Last{i % 5000}",
+            "source_catalogue": "LC",
+        }
+        if i % 3:
+            row["email"] = f"person{i}@example.org"
+        if i % 5 == 0:
+            row["country"] = "NL"
+        rows.append(row)
+    return rows
+
+
+def ordered_dict_rows(rows):
+    """The previous storage"""
+    rows_by_id = OrderedDict()
+    for row in rows:
+        rows_by_id[row["id"]] = dict(row)
+    return rows_by_id
+
+
+def columnar_rows(rows):
+    return Table.of(TableType.PERSONS, TableMeta(meta={}), rows)
+
+
+def traced(function, rows) -> int:
+    tracemalloc.start()
+    result = function(rows)  # noqa: F841 (keep the result alive while measuring)
+    size, _ = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    return size
+
+
+def main():
+    print("rows       previous (MiB)  columnar (MiB)  ratio")
+    for n_rows in [10_000, 100_000, 500_000]:
+        rows = person_rows(n_rows)
+        previous = traced(ordered_dict_rows, rows)
+        columnar = traced(columnar_rows, rows)
+        print(
+            f"{n_rows:<10} {previous / 2**20:>14.1f}  {columnar / 2**20:>14.1f}"
+            f"  {previous / columnar:>5.1f}"
+        )
+
+
+if __name__ == "__main__":
+    main()
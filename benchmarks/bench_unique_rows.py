@@ -0,0 +1,80 @@
+"""
+Benchmark of the removal of duplicate rows in EucanSession._partition_table.
+
+Generates a frame like the exploded LifeCycle frame (every event row is repeated
+for each contributor and subcohort of its study) and shows that splitting off the
+events table, which drops the duplicate rows, scales linearly up to a million rows,
+while the previous list based deduplication is quadratic.
+
+Usage: python benchmarks/bench_unique_rows.py
+"""
+import time
+
+import pandas as pd
+
+from molgenis.eucan_connect.eucan_client import EucanSession
+
+COLUMNS = {
+    "events_id": "id",
+    "events_name": "name",
+    "events_start_end_year": "start_end_year",
+    "events_biosamples_type": "biosamples_type",
+}
+
+
+def exploded_rows(n_rows: int, repeats: int = 10):
+    """Event rows, each distinct row repeated 'repeats' times"""
+    rows = []
+    for i in range(n_rows):
+        event = i // repeats
+        rows.append(
+            {
+                "id": f"lifecycle:eventID:{event:07}",
+                "name": f"COHORT{event % 500} - event {event}",
+                "start_end_year": "2001-2010",
+                "biosamples_type": ["blood", "urine", f"sample_{event % 7}"],
+            }
+        )
+    return rows
+
+
+def exploded_frame(n_rows: int) -> pd.DataFrame:
+    """The event rows as columns of the source frame"""
+    frame = pd.DataFrame(exploded_rows(n_rows))
+    return frame.rename(columns={name: column for column, name in COLUMNS.items()})
+
+
+def quadratic_unique_rows(rows):
+    """The previous implementation"""
+    unique_data = [i for n, i in enumerate(rows) if i not in rows[n + 1 :]]
+    while {} in unique_data:
+        unique_data.remove({})
+    return unique_data
+
+
+def timed(function, *args) -> float:
+    start = time.perf_counter()
+    function(*args)
+    return time.perf_counter() - start
+
+
+def main():
+    print("rows       _partition_table   per row (us)")
+    per_row = []
+    for n_rows in [10_000, 100_000, 1_000_000]:
+        seconds = timed(EucanSession._partition_table, exploded_frame(n_rows), COLUMNS)
+        per_row.append(seconds / n_rows)
+        print(f"{n_rows:<10} {seconds:>14.3f} s   {per_row[-1] * 1e6:>10.2f}")
+
+    print()
+    print("rows       previous           per row (us)")
+    for n_rows in [1_000, 2_000, 4_000]:
+        seconds = timed(quadratic_unique_rows, exploded_rows(n_rows))
+        print(f"{n_rows:<10} {seconds:>14.3f} s   {seconds / n_rows * 1e6:>10.2f}")
+
+    # Linear scaling: the time per row may not grow with the number of rows
+    assert per_row[-1] < 3 * per_row[0], "_partition_table does not scale linearly"
+
+
+if __name__ == "__main__":
+    main()
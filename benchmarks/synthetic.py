@@ -0,0 +1,184 @@
+"""
+Generator of synthetic LifeCycle catalogue data for the benchmarks.
+
+lifecycle_cohorts() produces cohorts in the shape of the GraphQL response of a
+LifeCycle catalogue (see tests/resources/lifecycle_data.json), with a configurable
+number of cohorts, contributors, collection events and subcohorts. The data is
+deterministic for a seed. reference_data() produces the reference tables of the
+EUCAN-Connect Catalogue, with part of the generated reference labels already known.
+
+Usage: python benchmarks/synthetic.py 10000 > cohorts.json
+"""
+
+import json
+import random
+import sys
+from typing import Dict, List
+
+from molgenis.eucan_connect.model import RefData, RefEntity, RefTable
+from molgenis.eucan_connect.ref_modifier import RefNormaliser
+
+FIRST_NAMES = ["Jan", "Anna", "Piet", "Maria", "Lars", "Sofia", "Ahmed", "Chloé"]
+SURNAMES = ["Jansen", "Smith", "Müller", "Olsen", "Rossi", "Novak", "García"]
+PREFIXES = ["de", "van", "van der"]
+TITLES = ["Prof", "Dr"]
+CONTRIBUTION_TYPES = ["Principal Investigator", "Contact person", "Data manager"]
+ACCESS_CONDITIONS = ["General research use", "Health or medical", "Disease specific"]
+
+REFERENCE_LABELS: Dict[RefEntity, List[str]] = {
+    RefEntity.DATABASETYPES: [f"Area of information {i}" for i in range(40)],
+    RefEntity.BIOSAMPLES: [f"Sample category {i}" for i in range(25)],
+    RefEntity.DATASOURCES: [f"Data category {i}" for i in range(30)],
+    RefEntity.RECRUITMENTSOURCES: [f"Age group {i}" for i in range(15)],
+}
+"""The labels of the reference values that the cohorts use, per reference table"""
+
+
+def lifecycle_cohorts(
+    n_cohorts: int,
+    contributors: int = 2,
+    events: int = 3,
+    subcohorts: int = 2,
+    seed: int = 0,
+) -> List[dict]:
+    """
+    Generates LifeCycle cohorts. The number of contributors, events and subcohorts
+    of a cohort varies between 0 and twice the given average. Contributors recur
+    over cohorts, like persons that work on several cohorts.
+
+    :param n_cohorts: the number of cohorts
+    :param contributors: the average number of contributors of a cohort
+    :param events: the average number of collection events of a cohort
+    :param subcohorts: the average number of subcohorts of a cohort
+    :param seed: the seed of the random generator
+    :return: the cohorts as returned by the GraphQL API
+    """
+    rng = random.Random(seed)
+    n_persons = max(1, n_cohorts * contributors // 2)
+    return [
+        _cohort(rng, i, n_persons, contributors, events, subcohorts)
+        for i in range(n_cohorts)
+    ]
+
+
+def reference_data(known: float = 0.8, seed: int = 0) -> RefData:
+    """
+    Generates the reference tables of the EUCAN-Connect Catalogue
+
+    :param known: the fraction of the reference labels of the cohorts that is
+                  already in the reference tables
+    :param seed: the seed of the random generator
+    :return: the reference data
+    """
+    rng = random.Random(seed)
+    normaliser = RefNormaliser()
+    tables = dict()
+    for ref_entity in RefEntity.get_ref_entities():
+        labels = REFERENCE_LABELS[ref_entity]
+        known_labels = rng.sample(labels, round(len(labels) * known))
+        tables[ref_entity] = RefTable.of(
+            ref_entity,
+            [{"id": normaliser(label), "label": label} for label in known_labels],
+        )
+    return RefData.from_dict(tables)
+
+
+def _names(rng: random.Random, ref_entity: RefEntity, key: str = "name") -> List[dict]:
+    labels = REFERENCE_LABELS[ref_entity]
+    return [{key: label} for label in rng.sample(labels, rng.randint(0, 4))]
+
+
+def _count(rng: random.Random, average: int) -> int:
+    return rng.randint(0, 2 * average)
+
+
+def _cohort(
+    rng: random.Random,
+    i: int,
+    n_persons: int,
+    contributors: int,
+    events: int,
+    subcohorts: int,
+) -> dict:
+    acronym = f"COH{i:06}"
+    start_year = rng.randint(1960, 2015)
+    cohort = {
+        "pid": acronym,
+        "name": f"Synthetic cohort {i}",
+        "acronym": acronym,
+        "description": f"Synthetic birth cohort number {i} " * rng.randint(1, 20),
+        "startYear": start_year,
+        "endYear": start_year + rng.randint(1, 30),
+        "website": f"https://cohort{i}.example.org/",
+        "fundingStatement": f"Funded by grant {rng.randint(1000, 9999)}",
+        "design": {"name": rng.choice(["Longitudinal", "Cross-sectional"])},
+        "numberOfParticipants": rng.randint(100, 100000),
+        "numberOfParticipantsWithSamples": rng.randint(0, 100),
+        "supplementaryInformation": "Synthetic",
+        "dataAccessConditions": [
+            {"name": name} for name in rng.sample(ACCESS_CONDITIONS, rng.randint(0, 2))
+        ],
+        "dataAccessConditionsDescription": "Access on request",
+        "designPaper": {"doi": f"10.1000/{i}"},
+        "contributors": [
+            _contributor(rng, rng.randrange(n_persons))
+            for _ in range(_count(rng, contributors))
+        ],
+        "collectionEvents": [
+            _event(rng, acronym, j, start_year) for j in range(_count(rng, events))
+        ],
+        "subcohorts": [
+            _subcohort(rng, acronym, j) for j in range(_count(rng, subcohorts))
+        ],
+    }
+    # Optional fields are left out, as the GraphQL API does with null values
+    return {key: value for key, value in cohort.items() if value != []}
+
+
+def _contributor(rng: random.Random, person: int) -> dict:
+    contact = {
+        "firstName": FIRST_NAMES[person % len(FIRST_NAMES)],
+        "surname": f"{SURNAMES[person % len(SURNAMES)]}{person}",
+    }
+    if person % 3 == 0:
+        contact["prefix"] = PREFIXES[person % len(PREFIXES)]
+    if person % 4:
+        contact["email"] = f"person{person}@example.org"
+    if person % 2:
+        contact["title"] = {"name": TITLES[person % len(TITLES)]}
+    return {
+        "contact": contact,
+        "contributionType": [{"name": rng.choice(CONTRIBUTION_TYPES)}],
+    }
+
+
+def _event(rng: random.Random, acronym: str, j: int, start_year: int) -> dict:
+    year = start_year + rng.randint(0, 20)
+    event = {
+        "name": f"{acronym} wave {j}",
+        "description": f"Data collection wave {j}",
+        "startYear": {"name": str(year)},
+        "endYear": {"name": str(year + rng.randint(0, 3))},
+        "areasOfInformation": _names(rng, RefEntity.DATABASETYPES),
+        "sampleCategories": _names(rng, RefEntity.BIOSAMPLES),
+        "dataCategories": _names(rng, RefEntity.DATASOURCES),
+    }
+    if rng.random() < 0.5:
+        event["startMonth"] = {"code": f"{rng.randint(1, 12):02}"}
+        event["endMonth"] = {"code": f"{rng.randint(1, 12):02}"}
+    return {key: value for key, value in event.items() if value != []}
+
+
+def _subcohort(rng: random.Random, acronym: str, j: int) -> dict:
+    subcohort = {
+        "name": f"{acronym} subcohort {j}",
+        "description": f"Subcohort {j}",
+        "inclusionCriteria": "Synthetic inclusion criteria",
+        "numberOfParticipants": rng.randint(10, 10000),
+        "ageGroups": _names(rng, RefEntity.RECRUITMENTSOURCES, key="code"),
+    }
+    return {key: value for key, value in subcohort.items() if value != []}
+
+
+if __name__ == "__main__":
+    json.dump(lifecycle_cohorts(int(sys.argv[1])), sys.stdout)
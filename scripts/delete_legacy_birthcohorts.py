@@ -0,0 +1,25 @@
+"""
+One-off migration: deletes the rows that were imported by import_birthcohorts.py
+(ids starting with birthcohorts:), once the BirthCohorts catalogue is imported with
+the connector. Make sure you have an .env file in this folder.
+"""
+
+from dotenv import dotenv_values
+
+from molgenis.eucan_connect.birthcohorts import BirthCohorts
+from molgenis.eucan_connect.eucan_client import EucanSession
+from molgenis.eucan_connect.printer import Printer
+
+# Get credentials from .env
+config = dotenv_values(".env")
+target = config["TARGET"]
+username = config["USERNAME"]
+password = config["PASSWORD"]
+
+# Login to the EUCAN-Connect Catalogue with an EucanSession
+session = EucanSession(url=target)
+session.login(username, password)
+
+# Delete the legacy rows of the BirthCohorts catalogue
+catalogue = session.get_catalogues(["BC"])[0]
+BirthCohorts(session, Printer(), catalogue).delete_legacy_rows()
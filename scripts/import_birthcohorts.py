@@ -12,6 +12,9 @@ import re
 import molgenis.client as molgenis
 import requests
 
+from molgenis.eucan_connect import utils
+from molgenis.eucan_connect.changes import ChangeSet
+
 
 # Define function(s)
 # Function to derive the e-mail address from a list
@@ -524,28 +527,10 @@ while pageNr < int(ApiCount) + call_limit:
                         if first_name != "Unknown" or last_name != "Unknown":
 
                             contact_id = (
-                                study_id + ":contactID:" + last_name + first_name
+                                study_id
+                                + ":contactID:"
+                                + utils.slugify(last_name + first_name)
                             )
-                            contact_id = (
-                                contact_id.replace(" ", "")
-                                .replace("-", "")
-                                .replace(".", "")
-                                .replace("(", "")
-                                .replace(")", "")
-                                .replace("ć", "c")
-                                .replace("á", "a")
-                                .replace("í", "i")
-                                .replace("ñ", "n")
-                                .replace("ä", "a")
-                                .replace("ø", "o")
-                                .replace("è", "e")
-                                .replace("ö", "o")
-                                .replace("é", "e")
-                                .replace("ã", "a")
-                                .replace("Ö", "O")
-                                .replace("š", "s")
-                                .replace("Å", "A")
-                            )  # random_string(n_chars=10)
                             if contact_emails is not None:
                                 contact_email = derive_email_address(contact_emails)
                             else:
@@ -610,28 +595,10 @@ while pageNr < int(ApiCount) + call_limit:
                         )
                         if first_name != "Unknown" or last_name != "Unknown":
                             contact_id = (
-                                study_id + ":contactID:" + last_name + first_name
+                                study_id
+                                + ":contactID:"
+                                + utils.slugify(last_name + first_name)
                             )
-                            contact_id = (
-                                contact_id.replace(" ", "")
-                                .replace("-", "")
-                                .replace("(", "")
-                                .replace(")", "")
-                                .replace(".", "")
-                                .replace("ć", "c")
-                                .replace("á", "a")
-                                .replace("í", "i")
-                                .replace("ñ", "n")
-                                .replace("ä", "a")
-                                .replace("ø", "o")
-                                .replace("è", "e")
-                                .replace("ö", "o")
-                                .replace("é", "e")
-                                .replace("ã", "a")
-                                .replace("Ö", "O")
-                                .replace("š", "s")
-                                .replace("Å", "A")
-                            )  # random_string(n_chars=10)
                             contact_email = None
                             if investigator_emails is not None:
                                 contact_email = derive_email_address(
@@ -947,88 +914,27 @@ else:
     log.info("Number of new birth cohort studies is %s", nRetrievedCohorts)
 
 
-# Report the deleted birth cohort records
-log.info("Report any deleted birth cohort records")
-eucan_study_ids = [value for study in eucan_studies for value in study.values()]
-deleted = 0
-for study_id in existing_studies.keys():
-    if study_id not in eucan_study_ids:
-        deleted += 1
-        print(
-            "This birth cohort study does not exist anymore:",
-            existing_studies[study_id],
-        )
-if deleted == 0:
-    log.info("No birth cohort studies that are deleted")
-
-eucan_person_ids = [value for person in eucan_persons for value in person.values()]
-deleted = 0
-for person_id in existing_persons.keys():
-    if person_id not in eucan_person_ids:
-        deleted += 1
-        print("This birth cohort person will be deleted:", existing_persons[person_id])
-if deleted == 0:
-    log.info("No birth cohort persons that are deleted")
-
-eucan_event_ids = [value for event in eucan_events for value in event.values()]
-deleted = 0
-for event_id in existing_events.keys():
-    if event_id not in eucan_event_ids:
-        deleted += 1
-        print(
-            "This birth cohort data collection event does not exist anymore:",
-            existing_events[event_id],
-        )
-if deleted == 0:
-    log.info("No birth cohort data collection events that are deleted")
-
-eucan_population_ids = [
-    value for population in eucan_populations for value in population.values()
-]
-deleted = 0
-for population_id in existing_populations.keys():
-    if population_id not in eucan_population_ids:
-        deleted += 1
+# Report the deleted and new birth cohort records. The existing rows (REST output)
+# and the new rows do not have the same format, so only their ids are compared
+log.info("Report any deleted and new birth cohort records")
+for label, existing_rows, eucan_rows in [
+    ("study", existing_studies, eucan_studies),
+    ("person", existing_persons, eucan_persons),
+    ("data collection event", existing_events, eucan_events),
+    ("population", existing_populations, eucan_populations),
+]:
+    changes = ChangeSet.from_ids(
+        existing_rows.keys(), [row["id"] for row in eucan_rows]
+    )
+    log.info("Birth cohort %s records: %s", label, changes.summary())
+    eucan_rows_by_id = {row["id"]: row for row in eucan_rows}
+    for row_id in sorted(changes.removed):
         print(
-            "This birth cohort population does not exist anymore:",
-            existing_populations[population_id],
+            "This birth cohort " + label + " does not exist anymore:",
+            existing_rows[row_id],
         )
-if deleted == 0:
-    log.info("No birth cohort populations that are deleted")
-
-# Report any new birth cohort studies, persons, data collection events and populations
-log.info("Report any new birth cohort studies")
-new = 0
-for study in eucan_studies:
-    if study["id"] not in existing_study_ids:
-        new += 1
-        print("New birth cohort study:", study)
-if new == 0:
-    log.info("No new birth cohort studies")
-
-new = 0
-for person in eucan_persons:
-    if person["id"] not in existing_person_ids:
-        new += 1
-        print("New birth cohort person:", person)
-if new == 0:
-    log.info("No new birth cohort persons")
-
-new = 0
-for event in eucan_events:
-    if event["id"] not in existing_event_ids:
-        new += 1
-        print("New birth cohort data collection event:", event)
-if new == 0:
-    log.info("No new birth cohort data collection events")
-
-new = 0
-for population in eucan_populations:
-    if population["id"] not in existing_population_ids:
-        new += 1
-        print("New birth cohort population:", population)
-if new == 0:
-    log.info("No new birth cohort populations")
+    for row_id in sorted(changes.added):
+        print("New birth cohort " + label + ":", eucan_rows_by_id[row_id])
 
 # Delete all existing birth cohort data from EUCAN
 if len(eucan_studies) > 0 and len(existing_study_ids) > 0:
@@ -0,0 +1,375 @@
+from typing import Dict, Iterator, List, Optional, Sequence
+
+import pandas as pd
+import requests
+from requests.adapters import HTTPAdapter
+
+from molgenis.client import BlockAll, MolgenisRequestError
+from molgenis.eucan_connect import utils
+from molgenis.eucan_connect.contacts import ContactParser
+from molgenis.eucan_connect.crawler import PagedCrawler
+from molgenis.eucan_connect.errors import EucanError, EucanWarning
+from molgenis.eucan_connect.eucan_client import EucanSession
+from molgenis.eucan_connect.model import Catalogue, IsoCountryData, TableType
+from molgenis.eucan_connect.printer import Printer
+
+POPULATIONS = {
+    "children": "Children",
+    "mothers": "Mothers",
+    "fathers": "Fathers",
+    "grandparents": "Grandparents",
+    "familymembers": "FamilyMembers",
+}
+"""The recruited groups of a birth cohort that become populations"""
+
+COHORT_KEYS = ["identification", "description", "questionnaire", "comments"]
+
+LEGACY_ID_PREFIX = "birthcohorts:"
+"""
+The prefix of the ids of the rows that were imported by scripts/import_birthcohorts.py
+(birthcohorts:<cohort id>:contactID:<name> and the like). These rows have the url of
+the cohort as source catalogue, so they are not replaced by an import of the
+connector and are deleted once with delete_legacy_rows.
+"""
+
+
+def _value(value):
+    """Birthcohorts.net returns an empty dict for a missing value"""
+    if isinstance(value, dict) and len(value) == 0:
+        return None
+    return value
+
+
+class BirthCohorts:
+    """
+    This class is responsible for retrieving data from the source catalogue
+    birthcohorts.net and convert it to the EUCAN-Connect Catalogue data model.
+    """
+
+    user_agent = (
+        "Mozilla/5.0 (X11; Linux x86_64) AppleWebKit/537.36 (KHTML, like Gecko) "
+        "Chrome/51.0.2704.103 Safari/537.36"
+    )
+
+    def __init__(
+        self,
+        session: EucanSession,
+        printer: Printer,
+        catalogue: Catalogue,
+        iso_country_data: Optional[IsoCountryData] = None,
+        page_size: int = 10,
+        max_workers: int = 4,
+        calls_per_second: Optional[float] = 5,
+        contact_parser: Optional[ContactParser] = None,
+    ):
+        """
+        :param session: the session with the EUCAN-Connect Catalogue
+        :param printer: the printer
+        :param catalogue: the source catalogue, its url is the url of the cohorts feed
+        :param iso_country_data: the countries to resolve the free-text country
+                                 of a cohort with, without it the country is left out
+        :param page_size: the number of cohorts per page
+        :param max_workers: the maximum number of pages that are fetched concurrently
+        :param calls_per_second: the maximum number of requests per second
+        :param contact_parser: the parser of the contact names and email addresses
+        """
+        self.catalogue = catalogue
+        self.eucan_session = session
+        self.iso_country_data = iso_country_data
+        self.contact_parser = contact_parser or ContactParser()
+        self._bc_session = requests.Session()
+        # Pooled connections, so the concurrent page requests reuse their connection
+        adapter = HTTPAdapter(pool_maxsize=max_workers)
+        self._bc_session.mount("http://", adapter)
+        self._bc_session.mount("https://", adapter)
+        self._bc_session.headers.update({"User-Agent": self.user_agent})
+        self._bc_session.cookies.policy = BlockAll()
+        self.crawler = PagedCrawler(
+            session=self._bc_session,
+            url=catalogue.catalogue_url,
+            item_key="cohort",
+            page_size=page_size,
+            max_workers=max_workers,
+            calls_per_second=calls_per_second,
+        )
+        self.printer = printer
+        self.warnings: List[EucanWarning] = []
+
+    def birthcohorts_data(self) -> pd.DataFrame:
+        """
+        Retrieves data from the provided source catalogue
+        """
+        self.printer.print(f"Get {self.catalogue.description} cohorts")
+
+        cohorts = self.get_cohorts()
+
+        if len(cohorts) == 0:
+            raise EucanError(f"Number of records for {self.catalogue.description} is 0")
+        else:
+            self.printer.print_sub_header(
+                f"Number of cohorts retrieved for {self.catalogue.description} is "
+                f"{len(cohorts)}"
+            )
+
+        return self.transform(cohorts)
+
+    def get_cohorts(self) -> List[dict]:
+        """
+        Retrieves all cohorts of the source catalogue, in the order of the pages.
+        When country data is available, the country id of every cohort is resolved
+        (as "country_id").
+        """
+        return list(self.iter_cohorts())
+
+    def iter_cohorts(self) -> Iterator[dict]:
+        """Streaming variant of get_cohorts, yields the cohorts while the next
+        pages are being fetched."""
+        for cohort in self.crawler.items():
+            if self.iso_country_data is not None:
+                country = _value(cohort["identification"].get("country"))
+                cohort["country_id"] = (
+                    self.iso_country_data.find_country_id(country) or None
+                    if country
+                    else None
+                )
+            yield cohort
+
+    def transform(self, cohorts: List[dict]) -> pd.DataFrame:
+        """
+        Converts the retrieved cohorts to the EUCAN-Connect Catalogue data model.
+        Does not need a connection, so it can run in a separate process.
+
+        :return: one frame with the rows of all four tables, the columns of a table
+                 have the table as prefix (as in the frame of LifeCycle)
+        """
+        rows: Dict[TableType, List[dict]] = {table_type: [] for table_type in TableType}
+        for cohort in cohorts:
+            unknown_keys = set(cohort.keys()).difference(COHORT_KEYS + ["country_id"])
+            if unknown_keys:
+                raise EucanError(
+                    f"Unknown key(s) {', '.join(sorted(unknown_keys))} in cohort "
+                    f"{cohort['identification']['id']}"
+                )
+            for table_type, table_rows in self._convert_cohort(cohort).items():
+                rows[table_type] += table_rows
+
+        frames = [
+            pd.DataFrame(table_rows, dtype=object).add_prefix(f"{table_type.table}_")
+            for table_type, table_rows in rows.items()
+            if table_rows
+        ]
+        return pd.concat(frames, ignore_index=True) if frames else pd.DataFrame()
+
+    def _convert_cohort(self, cohort: dict) -> Dict[TableType, List[dict]]:
+        """Converts a single cohort to the rows of the four tables"""
+        identification = cohort["identification"]
+        description = cohort.get("description", {})
+        cohort_id = identification["id"]
+        acronym = self._acronym(identification)
+        country = cohort.get("country_id")
+
+        persons: Dict[str, dict] = dict()
+        contact_ids = self._add_persons(
+            persons,
+            cohort_id,
+            _value(identification["contact"]["name"]),
+            _value(identification["contact"]["email"]),
+            country,
+        )
+        investigator_ids = self._add_persons(
+            persons,
+            cohort_id,
+            _value(identification["investigator"]["name"]),
+            _value(identification["investigator"]["email"]),
+            country,
+            prefixes=["co-PI:", "PI:"],
+        )
+
+        study = {
+            "id": self._id(TableType.STUDIES, cohort_id),
+            "study_name": identification["name"].strip(),
+            "acronym": acronym,
+            "start_year": self._year(_value(identification.get("date"))),
+            "website": self._website(_value(identification.get("website"))),
+            "principle_investigators": investigator_ids,
+            "contacts": contact_ids,
+            "populations": [],
+        }
+
+        events = []
+        enrollment = description.get("enrollment", {})
+        followup = _value(enrollment.get("followup"))
+        if followup:
+            event = self._event(cohort_id, acronym, followup, enrollment)
+            events.append(event)
+            study["data_collection_events"] = [event["id"]]
+
+        populations = []
+        criteria = _value(enrollment.get("criteria_exclusion"))
+        recruited = description.get("recruited", {})
+        for group, label in POPULATIONS.items():
+            number = int(_value(recruited.get(group)) or 0)
+            if number > 0:
+                populations.append(
+                    {
+                        "id": self._id(TableType.POPULATIONS, f"{cohort_id}:{group}"),
+                        "name": f"{acronym} - {label}",
+                        "number_of_participants": number,
+                        "selection_criteria_supplement": (
+                            criteria.replace("\n", "") if criteria else None
+                        ),
+                    }
+                )
+                study["populations"].append(populations[-1]["id"])
+
+        aim = _value(description.get("aim"))
+        if aim:
+            study["objectives"] = aim
+
+        return {
+            TableType.PERSONS: list(persons.values()),
+            TableType.EVENTS: events,
+            TableType.POPULATIONS: populations,
+            TableType.STUDIES: [study],
+        }
+
+    def _add_persons(
+        self,
+        persons: Dict[str, dict],
+        cohort_id: str,
+        names: Optional[str],
+        emails: Optional[str],
+        country: Optional[str],
+        prefixes: Sequence[str] = (),
+    ) -> List[str]:
+        """
+        Splits a list of names into persons. Persons that are already in the persons
+        of the cohort (a contact that is also an investigator) are completed with
+        the information that they miss.
+
+        :return: the ids of the persons
+        """
+        if not names:
+            return []
+
+        person_ids = []
+        for position, name in enumerate(
+            self.contact_parser.split_names(names), start=1
+        ):
+            for prefix in prefixes:
+                name = name.replace(prefix, "").strip()
+            contact_name = self.contact_parser.parse(name)
+            if len(name) == 0 or contact_name.is_unknown:
+                continue
+            first_name = contact_name.first_name
+            last_name = contact_name.last_name
+
+            person = {
+                "id": self._id(
+                    TableType.PERSONS,
+                    f"{cohort_id}:{utils.slugify(last_name + first_name)}",
+                ),
+                "title": " ".join(contact_name.titles) or None,
+                "country": country,
+                "first_name": first_name,
+                "last_name": last_name,
+                "email": (
+                    self.contact_parser.email_address(emails, position)
+                    if emails
+                    else None
+                ),
+            }
+            existing = persons.setdefault(person["id"], person)
+            for key, value in person.items():
+                if existing.get(key) is None:
+                    existing[key] = value
+            if person["id"] not in person_ids:
+                person_ids.append(person["id"])
+        return person_ids
+
+    def delete_legacy_rows(self):
+        """
+        Deletes the rows that were imported by scripts/import_birthcohorts.py, so
+        they are not kept next to the rows of this connector. This is a one-off
+        migration (see scripts/delete_legacy_birthcohorts.py), it is not part of an
+        import. The legacy rows are only deleted when the studies of the catalogue
+        are imported by the connector already, and the tables are emptied in the
+        reverse import order, so no row is deleted while it is still referred to.
+        """
+        prefixes = tuple(
+            self.catalogue.get_id_prefix(table_type) for table_type in TableType
+        )
+        for table_type in reversed(TableType.get_import_order()):
+            entity_type_id = table_type.base_id
+            try:
+                ids = [
+                    row["id"]
+                    for row in self.eucan_session.get(
+                        entity_type_id, batch_size=10000, attributes="id"
+                    )
+                ]
+                study_prefix = self.catalogue.get_id_prefix(TableType.STUDIES)
+                if table_type == TableType.STUDIES and not any(
+                    id_.startswith(study_prefix) for id_ in ids
+                ):
+                    raise EucanError(
+                        f"No studies of {self.catalogue.description} are imported "
+                        f"yet, the legacy rows are kept"
+                    )
+                legacy_ids = [
+                    id_
+                    for id_ in ids
+                    if id_.startswith(LEGACY_ID_PREFIX) and not id_.startswith(prefixes)
+                ]
+                if legacy_ids:
+                    self.printer.print(
+                        f"Deleting {len(legacy_ids)} legacy rows in {entity_type_id}"
+                    )
+                    self.eucan_session.delete_list(entity_type_id, legacy_ids)
+            except MolgenisRequestError as e:
+                raise EucanError(
+                    f"Error deleting legacy rows from {entity_type_id}"
+                ) from e
+
+    def _event(
+        self, cohort_id: str, acronym: str, followup: str, enrollment: dict
+    ) -> dict:
+        key = followup.translate(
+            str.maketrans({"\t": None, "\n": None, " ": None, ".": None, "/": "_"})
+        ).replace("-", "_")
+        if key.find("(") > -1:
+            key = key[: key.find("(")]
+
+        period = enrollment.get("period", {})
+        start = _value(period.get("start"))
+        end = _value(period.get("end"))
+        return {
+            "id": self._id(TableType.EVENTS, f"{cohort_id}:{key.strip()}"),
+            "name": f"{acronym} - {followup.replace(chr(9), '').strip()}",
+            "description": followup,
+            "start_end_year": f"{start[0:4]}-{end[0:4]}" if start and end else None,
+            "start_end_month": f"{start[5:7]}-{end[5:7]}" if start and end else None,
+        }
+
+    def _id(self, table_type: TableType, key: str) -> str:
+        return self.catalogue.get_id_prefix(table_type) + key
+
+    @staticmethod
+    def _acronym(identification: dict) -> str:
+        abbreviation = _value(identification.get("abbreviation"))
+        if abbreviation:
+            return abbreviation.replace(",", " and")
+        words = identification["name"].split()
+        if len(words) == 1:
+            return identification["name"]
+        return "".join(word[0].upper() for word in words)
+
+    @staticmethod
+    def _year(date: Optional[str]) -> Optional[int]:
+        year = (date or "")[0:4]
+        return int(year) if year.isdigit() and year != "0000" else None
+
+    @staticmethod
+    def _website(website: Optional[str]) -> Optional[str]:
+        # If more than one website is available, the first one is stored
+        return website.split()[0].strip() if website and website.split() else None
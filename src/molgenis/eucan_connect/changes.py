@@ -0,0 +1,35 @@
+from dataclasses import dataclass
+from typing import Iterable, Set
+
+
+@dataclass(frozen=True)
+class ChangeSet:
+    """
+    The differences between the ids of a table in the EUCAN-Connect Catalogue
+    (existing) and the ids of the source catalogue.
+    """
+
+    added: Set[str]
+    removed: Set[str]
+    kept: Set[str]
+
+    @staticmethod
+    def from_ids(existing_ids: Iterable[str], source_ids: Iterable[str]) -> "ChangeSet":
+        """
+        :param existing_ids: the ids in the EUCAN-Connect Catalogue
+        :param source_ids: the ids of the source catalogue
+        :return: the ChangeSet
+        """
+        existing_ids = set(existing_ids)
+        source_ids = set(source_ids)
+        return ChangeSet(
+            added=source_ids - existing_ids,
+            removed=existing_ids - source_ids,
+            kept=existing_ids & source_ids,
+        )
+
+    def summary(self) -> str:
+        return (
+            f"{len(self.added)} added, {len(self.removed)} removed, "
+            f"{len(self.kept)} kept"
+        )
@@ -0,0 +1,180 @@
+import re
+from dataclasses import dataclass
+from functools import lru_cache
+from typing import Iterable, Optional, Tuple
+
+TITLES = [
+    "Adj.",
+    "prof.",
+    "Prof.",
+    "Professor.",
+    "Professor",
+    "Prof",
+    "Dr.",
+    "dr.",
+    "Dr",
+    "PharmD",
+    "PhD",
+    "Associate",
+    "MD",
+    "Executive",
+    "MSc",
+    "Clinical study nurse",
+]
+"""Titles that are split off the contact names, in order of matching"""
+
+SECOND_FIRST_NAMES = [
+    "Aysimi",
+    "Cristina",
+    "Eek",
+    "Kristine",
+    "L",
+    "M",
+    "Marie",
+    "Mette",
+    "Peter",
+    "Pia",
+]
+"""Second words of a name that belong to the first name"""
+
+
+@dataclass(frozen=True)
+class ContactName:
+    """The parts of the name of a contact person in a source catalogue."""
+
+    titles: Tuple[str, ...]
+    first_name: str
+    last_name: str
+
+    @property
+    def is_unknown(self) -> bool:
+        return self.first_name == "Unknown" and self.last_name == "Unknown"
+
+
+class ContactParser:
+    """
+    Parses the free-text contact fields of source catalogues: lists of names like
+    "Prof. J.A. Jansen (Jan); Dr. P. de Vries" and lists of email addresses. All
+    patterns are compiled once and the results are kept in a bounded LRU memo, since
+    the same contacts recur in many studies (as contact and as investigator).
+    """
+
+    def __init__(
+        self,
+        titles: Iterable[str] = TITLES,
+        second_first_names: Iterable[str] = SECOND_FIRST_NAMES,
+        maxsize: Optional[int] = 10000,
+    ):
+        """
+        :param titles: the titles to split off, in order of matching
+        :param second_first_names: second words of a name that belong to the first name
+        :param int maxsize: the maximum number of entries per memo, None for no limit
+        """
+        self._titles = list(titles)
+        self._second_first_names = set(second_first_names)
+        titles_pattern = "|".join(re.escape(title) for title in self._titles)
+        self._title = re.compile(titles_pattern)
+        # A list of names that contains "Jansen, Prof. De Vries" is separated by
+        # semicolons, otherwise the comma is a separator as well
+        self._titled_comma = re.compile(f", (?:{titles_pattern})")
+        self._name_separators = re.compile(";|/|&| and ")
+        self._all_name_separators = re.compile(",|;|/|&| and ")
+        self._email_separators = re.compile(", |; ")
+        self._initial = re.compile(r".\.", re.DOTALL)
+        self._parenthesis = re.compile(r"\([^)]*\)")
+
+        self.parse = lru_cache(maxsize=maxsize)(self._parse)
+        self._split_names = lru_cache(maxsize=maxsize)(self._split)
+        self._email_addresses = lru_cache(maxsize=maxsize)(self._split_emails)
+
+    def split_names(self, names: str) -> Tuple[str, ...]:
+        """
+        Splits a list of names into the separate names
+
+        :param names: the names separated by ";", "/", "&", " and " or ","
+        :return: the stripped names, including empty ones so the positions match
+                 the positions of the email addresses
+        """
+        return self._split_names(names)
+
+    def email_address(self, email_list: str, position: int) -> Optional[str]:
+        """
+        Returns the email address of the contact at a position in a list of contacts.
+        When there are less addresses than contacts, the last address is used.
+
+        :param email_list: the email addresses separated by ", " or "; "
+        :param position: the position (starting at 1) of the contact
+        :return: the email address or None if it is not valid
+        """
+        email_addresses = self._email_addresses(email_list)
+        return email_addresses[min(position, len(email_addresses)) - 1]
+
+    def cache_info(self):
+        """The statistics of the name memo (hits, misses, maxsize and currsize)"""
+        return self.parse.cache_info()
+
+    def _split(self, names: str) -> Tuple[str, ...]:
+        if ";" in names or self._titled_comma.search(names):
+            separators = self._name_separators
+        else:
+            separators = self._all_name_separators
+        return tuple(name.strip() for name in separators.split(names))
+
+    def _split_emails(self, email_list: str) -> Tuple[Optional[str], ...]:
+        return tuple(
+            self._valid_email(email_address.strip())
+            for email_address in self._email_separators.split(email_list)
+        )
+
+    @staticmethod
+    def _valid_email(email_address: str) -> Optional[str]:
+        if "@" in email_address:
+            return email_address
+        # Addresses like "j.jansen at umcg.nl"
+        if " at " in email_address:
+            return email_address.replace(" at ", "@").replace(" ", "")
+        return None
+
+    def _parse(self, full_name: str) -> ContactName:
+        """
+        Derives the titles, first name and last name from a single name. Initials
+        and a part between parenthesis belong to the first name. A name without
+        first name gets "Unknown" as first name, a name that only consists of
+        titles gets "Unknown" as first and last name.
+        """
+        if len(full_name) == 0:
+            return ContactName((), "", "")
+
+        found = set(self._title.findall(full_name))
+        titles = tuple(title for title in self._titles if title in found)
+        full_name = self._title.sub("", full_name).replace(",", "").strip()
+        if full_name == "":
+            return ContactName(titles, "Unknown", "Unknown")
+
+        words = full_name.split(" ", 2)
+        if len(words) == 1:
+            first_name, last_name = self._move_initials("", full_name)
+            return ContactName(titles, first_name or "Unknown", last_name.strip())
+
+        if words[1] in self._second_first_names:
+            first_name = f"{words[0]} {words[1]}"
+        else:
+            first_name = words[0]
+        first_name, last_name = self._move_initials(
+            first_name, full_name[len(first_name) :]
+        )
+        parenthesis = self._parenthesis.search(last_name)
+        if parenthesis:
+            first_name = f"{first_name} {parenthesis.group()}".strip()
+            last_name = last_name.replace(parenthesis.group(), "")
+
+        return ContactName(titles, first_name.strip(), last_name.strip())
+
+    def _move_initials(self, first_name: str, last_name: str) -> Tuple[str, str]:
+        """Moves the initials (a letter followed by a dot) from the last name to the
+        first name"""
+        initials = self._initial.findall(last_name)
+        if not initials:
+            return first_name, last_name
+        first_name = " ".join(([first_name] if first_name else []) + initials)
+        return first_name, self._initial.sub("", last_name)
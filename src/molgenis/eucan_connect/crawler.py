@@ -0,0 +1,114 @@
+import threading
+import time
+from collections import deque
+from concurrent.futures import Future, ThreadPoolExecutor
+from typing import Deque, Iterator, List, Optional
+
+import requests
+
+from molgenis.eucan_connect.errors import EucanError
+
+
+class RateLimiter:
+    """
+    Limits the number of calls per second over all threads: every call to wait()
+    blocks until the minimal interval since the previous call has passed.
+    """
+
+    def __init__(self, calls_per_second: Optional[float]):
+        """
+        :param calls_per_second: the maximum rate, None for no limit
+        """
+        self._interval = 1 / calls_per_second if calls_per_second else 0.0
+        self._next_call = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        if not self._interval:
+            return
+        with self._lock:
+            now = time.monotonic()
+            call_at = max(now, self._next_call)
+            self._next_call = call_at + self._interval
+        if call_at > now:
+            time.sleep(call_at - now)
+
+
+class PagedCrawler:
+    """
+    Retrieves the items of a paged JSON feed like the cohorts feed of
+    birthcohorts.net (?limit=..&page=..&json). The total number of items is
+    requested first (limit=0), after that the pages are fetched concurrently with a
+    limited rate. A page is addressed by the position of its first item, so with
+    10 items per page the pages are 1, 11, 21 and so on. Every response is parsed
+    once and the items are yielded in page order while the next pages are fetched.
+    """
+
+    def __init__(
+        self,
+        session: requests.Session,
+        url: str,
+        item_key: str,
+        page_size: int = 10,
+        max_workers: int = 4,
+        calls_per_second: Optional[float] = None,
+    ):
+        """
+        :param session: the HTTP session to send the requests with
+        :param url: the url of the feed, without the paging parameters
+        :param item_key: the key of the items in a page
+        :param page_size: the number of items per page
+        :param max_workers: the maximum number of pages that are fetched concurrently
+        :param calls_per_second: the maximum number of requests per second, None for
+                                 no limit
+        """
+        self.session = session
+        self.url = url
+        self.item_key = item_key
+        self.page_size = page_size
+        self.max_workers = max_workers
+        self.rate_limiter = RateLimiter(calls_per_second)
+
+    def count(self) -> int:
+        """The total number of items, as reported by the feed"""
+        return int(self._get(limit=0)["@attributes"]["count"])
+
+    def items(self) -> Iterator[dict]:
+        """
+        Yields the items of all pages in page order. At most max_workers pages are
+        fetched ahead of the page that is being consumed.
+        """
+        pages = iter(range(1, self.count() + 1, self.page_size))
+        with ThreadPoolExecutor(max_workers=self.max_workers) as executor:
+            pending: Deque[Future] = deque()
+            for page in pages:
+                pending.append(executor.submit(self.page, page))
+                if len(pending) == self.max_workers:
+                    break
+            while pending:
+                items = pending.popleft().result()
+                next_page = next(pages, None)
+                if next_page is not None:
+                    pending.append(executor.submit(self.page, next_page))
+                yield from items
+
+    def page(self, page: int) -> List[dict]:
+        """Retrieves the items of the page that starts at an item (starting at 1)"""
+        data = self._get(limit=self.page_size, page=page)
+        unknown_keys = set(data.keys()).difference(["@attributes", self.item_key])
+        if unknown_keys:
+            raise EucanError(
+                f"Unknown key(s) {', '.join(sorted(unknown_keys))} in the response "
+                f"of {self.url}"
+            )
+        items = data.get(self.item_key, [])
+        # A page with a single item contains the item instead of a list
+        return [items] if isinstance(items, dict) else items
+
+    def _get(self, limit: int, page: int = None) -> dict:
+        separator = "&" if "?" in self.url else "?"
+        query = f"limit={limit}" + (f"&page={page}" if page is not None else "")
+        self.rate_limiter.wait()
+        response = self.session.get(f"{self.url}{separator}{query}&json")
+        response.raise_for_status()
+        return response.json()
@@ -1,6 +1,9 @@
-from typing import List
+from concurrent.futures import Future, ProcessPoolExecutor
+from contextlib import ExitStack
+from typing import Dict, List, Union
 
 from molgenis.client import MolgenisRequestError
+from molgenis.eucan_connect.birthcohorts import BirthCohorts
 from molgenis.eucan_connect.errors import (
     ErrorReport,
     EucanError,
@@ -15,9 +18,12 @@ from molgenis.eucan_connect.model import (
     CatalogueData,
     IsoCountryData,
     RefData,
+    StreamingCatalogueData,
 )
 from molgenis.eucan_connect.printer import Printer
-from molgenis.eucan_connect.ref_modifier import RefModifier
+from molgenis.eucan_connect.ref_modifier import RefModifier, RefNormaliser
+from molgenis.eucan_connect.transform import TransformResult, transform_catalogue
+from molgenis.eucan_connect.validator import Validator
 
 
 class Eucan:
@@ -26,15 +32,36 @@ class Eucan:
     into the EUCAN-Connect Catalogue.
     """
 
-    def __init__(self, session: EucanSession):
+    def __init__(
+        self,
+        session: EucanSession,
+        processes: int = 0,
+        streaming: bool = False,
+        recover: bool = False,
+        strict: bool = False,
+    ):
         """
         :param EucanSession session: an authenticated session with
                                      an EUCAN-Connect Catalogue
+        :param int processes: number of worker processes that transform the fetched
+                              source catalogues, 0 transforms in the main process
+        :param bool streaming: upload the rows of catalogues that are transformed in
+                               the main process in batches while they are converted
+        :param bool recover: import the valid rows of a rejected batch and report
+                             the invalid rows as warnings, instead of failing
+        :param bool strict: do not import a catalogue with invalid values at all,
+                            instead of leaving out the rows with invalid values
         """
         self.session = session
+        self.processes = processes
+        self.streaming = streaming
+        self.recover = recover
+        self.strict = strict
         self.printer = Printer()
         self.iso_country_data: IsoCountryData = session.get_iso_country_data()
         self.ref_data: RefData = session.get_reference_data()
+        # Reference labels recur in every catalogue, their IDs are kept for the run
+        self.ref_normaliser = RefNormaliser()
         self.warnings: List[EucanWarning] = []
 
     def import_catalogues(self, catalogues: List[Catalogue]) -> ErrorReport:
@@ -47,33 +74,59 @@ class Eucan:
         """
 
         report: ErrorReport = ErrorReport(catalogues)
-        for catalogue in catalogues:
-            self.warnings = []
-            self.printer.print_catalogue_title(catalogue)
-            try:
-                self._import_catalogue(catalogue)
-            except EucanError as e:
-                self.printer.print_error(e)
-                report.add_error(catalogue, e)
+        with ExitStack() as stack:
+            transforms = dict()
+            if self.processes > 0:
+                pool = stack.enter_context(ProcessPoolExecutor(self.processes))
+                transforms = self._submit_transforms(catalogues, pool)
+
+            for catalogue in catalogues:
+                self.warnings = []
+                self.printer.print_catalogue_title(catalogue)
+                try:
+                    self._import_catalogue(catalogue, transforms.get(catalogue))
+                except EucanError as e:
+                    self.printer.print_error(e)
+                    report.add_error(catalogue, e)
 
-            report.add_warnings(catalogue, self.warnings)
+                report.add_warnings(catalogue, self.warnings)
         self.printer.print_summary(report)
         return report
 
     @requests_error_handler
-    def _import_catalogue(self, catalogue: Catalogue):
+    def _import_catalogue(self, catalogue: Catalogue, transform: Future = None):
+        if transform is not None:
+            # The source catalogue is already fetched and converted in a worker
+            catalogue_data = self._collect_transform(catalogue, transform)
+        else:
+            catalogue_data = self._transform_catalogue(catalogue)
+
+        # Validate the data before anything is changed in the EUCAN-Connect Catalogue.
+        # Streamed data is converted during the import, so it can't be validated.
+        if isinstance(catalogue_data, CatalogueData):
+            catalogue_data = self._validate_catalogue_data(catalogue_data)
+            # Importing no rows at all would delete all existing rows of the catalogue
+            if not any(table.rows for table in catalogue_data.import_order):
+                raise EucanError(f"Number of records for {catalogue.description} is 0")
+
+        # Import any possible new references into the EUCAN-Connect Catalogue
+        self._add_new_ref_data(self.ref_data)
+
+        # Import the data from the source catalogue to the EUCAN-Connect Catalogue
+        self._import_catalogue_data(catalogue_data)
+
+    def _transform_catalogue(
+        self, catalogue: Catalogue
+    ) -> Union[CatalogueData, StreamingCatalogueData]:
         # Get the data from the source catalogue(s)
-        if catalogue.catalogue_type == "BirthCohorts":
-            # Get the data from the source catalogue type birth cohorts
-            raise EucanError("Birth cohort data. No module available yet!")
-        elif catalogue.catalogue_type == "LifeCycle":
+        if catalogue.catalogue_type == "LifeCycle":
             # Get the data from the source catalogue type LifeCycle
             source_data = self._get_lifecycle_data(catalogue)
-        elif catalogue.catalogue_type == "Mica":
-            # Get the data from the source catalogue type Mica
-            raise EucanError("Mica data. No module available yet!")
+        elif catalogue.catalogue_type == "BirthCohorts":
+            # Get the data from the source catalogue type BirthCohorts
+            source_data = self._get_birthcohorts_data(catalogue)
         else:
-            raise EucanError(f"Unknown catalogue type {catalogue.catalogue_type}")
+            raise self._unsupported_type_error(catalogue)
 
         self.printer.print("✏️ Verify reference data")
         with self.printer.indentation():
@@ -81,16 +134,85 @@ class Eucan:
                 printer=self.printer,
                 ref_data=self.ref_data,
                 source_data=source_data,
+                normaliser=self.ref_normaliser,
             ).ref_modifier()
 
         # Convert the source catalogue dataframes to CatalogueData
-        catalogue_data = self.session.create_catalogue_data(catalogue, source_data)
+        if self.streaming:
+            return self.session.stream_catalogue_data(catalogue, source_data)
+        return self.session.create_catalogue_data(catalogue, source_data)
 
-        # Import any possible new references into the EUCAN-Connect Catalogue
-        self._add_new_ref_data(self.ref_data)
+    def _submit_transforms(
+        self, catalogues: List[Catalogue], pool: ProcessPoolExecutor
+    ) -> Dict[Catalogue, Future]:
+        """
+        Fetches the data of every source catalogue and submits the conversion to
+        the pool, so the catalogues are converted in parallel while the main
+        process fetches and uploads.
+        """
+        self.printer.print_sub_header("📥 Get data of all source catalogues")
+        transforms = dict()
+        for catalogue in catalogues:
+            try:
+                payload = self._get_source_payload(catalogue)
+                transforms[catalogue] = pool.submit(
+                    transform_catalogue, catalogue, payload, self.ref_data
+                )
+            except EucanError as e:
+                transforms[catalogue] = Future()
+                transforms[catalogue].set_exception(e)
+        return transforms
 
-        # Import the data from the source catalogue to the EUCAN-Connect Catalogue
-        self._import_catalogue_data(catalogue_data)
+    def _collect_transform(
+        self, catalogue: Catalogue, transform: Future
+    ) -> CatalogueData:
+        """
+        Waits for the conversion of a source catalogue in the pool and turns the
+        result into CatalogueData. New reference values found by the worker are
+        added to the reference data of the main process.
+        """
+        result = TransformResult.deserialise(transform.result())
+        self.printer.print_output(result.output)
+        self.warnings += result.warnings
+
+        for ref_entity, new_refs in result.new_refs.items():
+            self.ref_data.add_new_refs(ref_entity, new_refs)
+
+        return self.session.catalogue_data_from_rows(catalogue, result.rows)
+
+    @requests_error_handler
+    def _get_source_payload(self, catalogue: Catalogue) -> List[dict]:
+        """Retrieves the data of a source catalogue without converting it"""
+        if catalogue.catalogue_type not in ("LifeCycle", "BirthCohorts"):
+            raise self._unsupported_type_error(catalogue)
+
+        try:
+            self.printer.print(f"Get data of source catalogue {catalogue.description}")
+            if catalogue.catalogue_type == "BirthCohorts":
+                payload = BirthCohorts(
+                    self.session, self.printer, catalogue, self.iso_country_data
+                ).get_cohorts()
+            else:
+                payload = LifeCycle(
+                    self.session, self.printer, catalogue
+                ).get_lc_cohort_data()
+        except MolgenisRequestError as e:
+            raise EucanError(
+                f"Error retrieving data of catalogue {catalogue.description}"
+            ) from e
+
+        # An empty catalogue would delete all its existing rows, so it is not
+        # submitted to the pool
+        if len(payload) == 0:
+            raise EucanError(f"Number of records for {catalogue.description} is 0")
+        return payload
+
+    @staticmethod
+    def _unsupported_type_error(catalogue: Catalogue) -> EucanError:
+        if catalogue.catalogue_type == "Mica":
+            return EucanError("Mica data. No module available yet!")
+        else:
+            return EucanError(f"Unknown catalogue type {catalogue.catalogue_type}")
 
     @requests_error_handler
     def _get_lifecycle_data(self, catalogue: Catalogue):
@@ -105,6 +227,52 @@ class Eucan:
                 f"Error retrieving data of catalogue {catalogue.description}"
             ) from e
 
+    @requests_error_handler
+    def _get_birthcohorts_data(self, catalogue: Catalogue):
+        self.printer.print_sub_header(
+            f"📥 Get data of source catalogue {catalogue.description}"
+        )
+        return BirthCohorts(
+            self.session, self.printer, catalogue, self.iso_country_data
+        ).birthcohorts_data()
+
+    def _validate_catalogue_data(self, catalogue_data: CatalogueData) -> CatalogueData:
+        """
+        Checks the data of the source catalogue against the metadata of the
+        EUCAN-Connect Catalogue. The invalid values are reported as warnings and the
+        rows with invalid values are left out of the import. In strict mode an
+        EucanError is raised instead, so the existing data is left untouched.
+        """
+        self.printer.print_sub_header("🔎 Validate source catalogue data")
+        with self.printer.indentation():
+            validator = Validator(printer=self.printer, ref_data=self.ref_data)
+            warnings = validator.validate(catalogue_data)
+        self.warnings += warnings
+
+        if not warnings:
+            return catalogue_data
+        if self.strict:
+            raise EucanError(
+                f"{len(warnings)} invalid value(s) in source catalogue "
+                f"{catalogue_data.catalogue.description}, nothing is imported"
+            )
+
+        with self.printer.indentation():
+            tables = dict()
+            for table in catalogue_data.import_order:
+                invalid_ids = validator.invalid_ids[table.type]
+                if invalid_ids:
+                    self.printer.print(
+                        f"{len(invalid_ids)} row(s) with invalid values are not "
+                        f"imported in {table.type.base_id}"
+                    )
+                tables[table.type] = table.without(invalid_ids)
+        return CatalogueData.from_dict(
+            catalogue=catalogue_data.catalogue,
+            source=catalogue_data.source,
+            tables=tables,
+        )
+
     def _add_new_ref_data(self, ref_data: RefData):
         """
         Inserts new reference data into the EUCAN-Connect Catalogue
@@ -117,7 +285,9 @@ class Eucan:
                 printer=self.printer,
             ).import_reference_data(ref_data)
 
-    def _import_catalogue_data(self, catalogue_data: CatalogueData):
+    def _import_catalogue_data(
+        self, catalogue_data: Union[CatalogueData, StreamingCatalogueData]
+    ):
         """
         Inserts the data of the source catalogue to the EUCAN-Connect Catalogue
         This happens in two phases:
@@ -128,7 +298,10 @@ class Eucan:
             f"📤 Importing source catalogue {catalogue_data.catalogue.description}"
         )
         with self.printer.indentation():
-            self.warnings += Importer(
-                session=self.session,
-                printer=self.printer,
-            ).import_catalogue_data(catalogue_data)
+            importer = Importer(
+                session=self.session, printer=self.printer, recover=self.recover
+            )
+            if isinstance(catalogue_data, StreamingCatalogueData):
+                self.warnings += importer.import_streaming_data(catalogue_data)
+            else:
+                self.warnings += importer.import_catalogue_data(catalogue_data)
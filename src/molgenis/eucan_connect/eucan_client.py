@@ -1,9 +1,11 @@
-from typing import List, Optional
+from itertools import compress
+from typing import Dict, Iterator, List, Mapping, Optional, Sequence, Tuple
 from urllib.parse import quote_plus
 
 import numpy as np
 import pandas as pd
 import requests
+import urllib3
 
 from molgenis.client import Session
 from molgenis.eucan_connect import utils
@@ -14,10 +16,13 @@ from molgenis.eucan_connect.model import (
     RefData,
     RefEntity,
     RefTable,
+    StreamingCatalogueData,
     Table,
     TableMeta,
+    TableStream,
     TableType,
 )
+from molgenis.eucan_connect.payload import Payload
 
 
 class ExtendedSession(Session):
@@ -30,13 +35,65 @@ class ExtendedSession(Session):
         super(ExtendedSession, self).__init__(url, token)
         self.url = url
 
-    def add_batched(self, entity_type_id: str, entities: List[dict]):
-        """Adds multiple entities in batches of 1000."""
+    def add_batched(self, entity_type_id: str, entities: Sequence[Mapping]):
+        """Adds multiple entities in batches of 1000. Every batch is encoded once."""
         # TODO adding things in bulk will fail if there are self-references across
         #  batches. Dependency resolving is needed.
-        batches = list(utils.batched(entities, 1000))
-        for batch in batches:
-            self.add_all(entity_type_id, batch)
+        for body in Payload(entities, batch_size=1000):
+            self.add_encoded(entity_type_id, body)
+
+    def add_encoded(
+        self, entity_type_id: str, body: bytes, retries: int = 2
+    ) -> List[str]:
+        """Similar to add_all() of the parent Session class, but posts an already
+        encoded request body (see payload.py). When the connection could not be made,
+        the same body is sent again, at most 'retries' times. Other errors, like a
+        read timeout, are not retried: the server may have added the rows already."""
+        response = self._send_encoded("post", entity_type_id, body, retries)
+        return [
+            resource["href"].split("/")[-1] for resource in response.json()["resources"]
+        ]
+
+    def update_batched(self, entity_type_id: str, entities: Sequence[Mapping]):
+        """Updates multiple existing entities in batches of 1000. All attributes of
+        the entities are replaced."""
+        for body in Payload(entities, batch_size=1000):
+            self.update_encoded(entity_type_id, body)
+
+    def update_encoded(self, entity_type_id: str, body: bytes, retries: int = 2):
+        """Similar to add_encoded(), but updates the entities in the request body,
+        with the update of multiple entities of the REST API V2 (PUT)."""
+        self._send_encoded("put", entity_type_id, body, retries)
+
+    def _send_encoded(
+        self, method: str, entity_type_id: str, body: bytes, retries: int
+    ) -> requests.Response:
+        url = self._api_url + "v2/" + quote_plus(entity_type_id)
+        for attempt in range(retries + 1):
+            try:
+                response = getattr(self._session, method)(
+                    url, headers=self._get_token_header_with_content_type(), data=body
+                )
+                break
+            except requests.ConnectionError as ex:
+                if attempt == retries or not self._is_not_sent(ex):
+                    raise
+        try:
+            response.raise_for_status()
+        except requests.RequestException as ex:
+            self._raise_exception(ex)
+
+        return response
+
+    @staticmethod
+    def _is_not_sent(ex: requests.ConnectionError) -> bool:
+        """Whether a request failed before it was sent, because no connection could
+        be made (also when connecting timed out)"""
+        if isinstance(ex, requests.ConnectTimeout):
+            return True
+        reason = getattr(ex.args[0], "reason", None) if ex.args else None
+        # NewConnectionError is a subclass of ConnectTimeoutError
+        return isinstance(reason, urllib3.exceptions.ConnectTimeoutError)
 
     def get_meta(self, entity_type_id: str) -> TableMeta:
         """Similar to get_entity_meta_data() of the parent Session class, but uses the
@@ -136,63 +193,181 @@ class EucanSession(ExtendedSession):
         :param df_in: the source catalogue data in pandas DataFrame
         :return: a CatalogueData object
         """
+        return self.catalogue_data_from_rows(
+            catalogue, self.get_uploadable_rows(catalogue, df_in)
+        )
 
+    def catalogue_data_from_rows(
+        self, catalogue: Catalogue, rows: Dict[TableType, List[dict]]
+    ) -> CatalogueData:
+        """
+        Fills the four EUCAN-Connect tables for the specific source catalogue with
+        rows that are already in the uploadable format
+
+        :param catalogue: the source catalogue
+        :param rows: the uploadable rows per table
+        :return: a CatalogueData object
+        """
         tables = dict()
         for table_type in TableType.get_import_order():
-            id_ = table_type.base_id
-            table = table_type.table
-            meta = self.get_meta(id_)
+            meta = self.get_meta(table_type.base_id)
 
             tables[table_type] = Table.of(
                 table_type=table_type,
                 meta=meta,
-                rows=self._get_uploadable_data(catalogue, df_in, table),
+                rows=rows[table_type],
             )
 
         return CatalogueData.from_dict(
             catalogue=catalogue, source=catalogue.description, tables=tables
         )
 
-    @staticmethod
-    def _get_uploadable_data(
-        catalogue: Catalogue, df_data: pd.DataFrame, table_type: str
-    ) -> List[dict]:
+    def stream_catalogue_data(
+        self, catalogue: Catalogue, df_in: pd.DataFrame, batch_size: int = 1000
+    ) -> StreamingCatalogueData:
         """
-        Returns all the rows of an entity type in the dataFrame, transformed to
-        the uploadable format.
+        Streaming variant of create_catalogue_data. A table is only split off the
+        source catalogue data when its batches are consumed, and its rows are
+        converted one batch at a time, while the importer uploads them.
+
+        :param catalogue: the source catalogue
+        :param df_in: the source catalogue data in pandas DataFrame
+        :param batch_size: the number of rows per batch
+        :return: a StreamingCatalogueData object
         """
+        columns = self._table_columns(df_in)
+        tables = [
+            TableStream(
+                type=table_type,
+                meta=self.get_meta(table_type.base_id),
+                batches=self._stream_uploadable_data(
+                    catalogue, df_in, columns[table_type], batch_size
+                ),
+            )
+            for table_type in TableType.get_import_order()
+        ]
 
-        table_columns = [x for x in df_data.columns if table_type in x[:10]]
-        table_data = df_data[table_columns].to_dict("records")
-        # Remove the "table" name from the columns and remove missing values
-        for row in table_data:
-            for tab_column in table_columns:
-                column = tab_column.replace(table_type + "_", "", 1)
-                row[column] = row[tab_column]
-                del row[tab_column]
+        return StreamingCatalogueData(
+            catalogue=catalogue, source=catalogue.description, tables=tables
+        )
 
-                if type(row[column]) is np.ndarray:
-                    row[column] = list(row[column])
+    @classmethod
+    def get_uploadable_rows(
+        cls, catalogue: Catalogue, df_in: pd.DataFrame
+    ) -> Dict[TableType, List[dict]]:
+        """
+        Returns the rows of the four EUCAN-Connect tables in the uploadable format
 
-                if utils.isnan(row[column]):
-                    del row[column]
+        :param catalogue: the source catalogue
+        :param df_in: the source catalogue data in pandas DataFrame
+        :return: a dictionary with the rows per table
+        """
+        return {
+            table_type: cls._get_uploadable_data(catalogue, df_table)
+            for table_type, df_table in cls._partition_tables(df_in)
+        }
+
+    @classmethod
+    def _partition_tables(
+        cls, df_in: pd.DataFrame
+    ) -> Iterator[Tuple[TableType, pd.DataFrame]]:
+        """
+        Splits the dataFrame into a dataFrame per table, in import order. The frame
+        of a table is only built when it is iterated to.
+        """
+        columns = cls._table_columns(df_in)
+        for table_type in TableType.get_import_order():
+            yield table_type, cls._partition_table(df_in, columns[table_type])
 
-        # Remove duplicate records
-        unique_data = [
-            i for n, i in enumerate(table_data) if i not in table_data[n + 1 :]
-        ]
+    @staticmethod
+    def _table_columns(df_in: pd.DataFrame) -> Dict[TableType, Dict[str, str]]:
+        """
+        Assigns the columns to the tables in one pass over the column names. Per
+        table the columns are mapped to their name without the "table" prefix.
+        """
+        table_by_prefix = {
+            f"{table_type.table}_": table_type for table_type in TableType
+        }
+        columns = {table_type: dict() for table_type in TableType}
+        for column in df_in.columns:
+            prefix = column.split("_", 1)[0] + "_"
+            if prefix in table_by_prefix:
+                columns[table_by_prefix[prefix]][column] = column[len(prefix) :]
+        return columns
 
-        # Remove empty records
-        while {} in unique_data:
-            unique_data.remove({})
+    @staticmethod
+    def _partition_table(df_in: pd.DataFrame, columns: Dict[str, str]) -> pd.DataFrame:
+        """
+        Selects and renames the columns of one table, empty rows are dropped and the
+        rows with the same id are collapsed. Like in a Table (see ColumnarRows), the
+        last row with an id is kept, in the position of the first one, so the
+        streamed and the batched import upload the same rows.
+        """
+        df_table = df_in[list(columns)].rename(columns=columns)
+        df_table = df_table.dropna(how="all")
+        if "id" not in df_table.columns:
+            return df_table
+
+        ids = df_table["id"]
+        codes, _ = pd.factorize(ids)
+        # Rows without an id are left as they are
+        without_id = codes < 0
+        last_positions = np.flatnonzero(~ids.duplicated(keep="last") & ~without_id)
+        last_position = np.empty(len(last_positions), dtype=np.int64)
+        last_position[codes[last_positions]] = last_positions
+
+        positions = np.flatnonzero(~ids.duplicated(keep="first") | without_id)
+        rows = np.where(
+            without_id[positions],
+            positions,
+            last_position[np.maximum(codes[positions], 0)],
+        )
+        return df_table.iloc[rows]
+
+    @classmethod
+    def _stream_uploadable_data(
+        cls,
+        catalogue: Catalogue,
+        df_in: pd.DataFrame,
+        columns: Dict[str, str],
+        batch_size: int,
+    ) -> Iterator[List[dict]]:
+        df_table = cls._partition_table(df_in, columns)
+        for start in range(0, len(df_table), batch_size):
+            yield cls._get_uploadable_data(
+                catalogue, df_table.iloc[start : start + batch_size]
+            )
 
-        # Add the source catalogue
-        unique_data = [
-            dict(item, source_catalogue=catalogue.code) for item in unique_data
+    @staticmethod
+    def _get_uploadable_data(
+        catalogue: Catalogue, df_table: pd.DataFrame
+    ) -> List[dict]:
+        """
+        Returns all the rows of a table, transformed to the uploadable format:
+        missing values are left out and arrays are converted to lists.
+        """
+        columns = list(df_table.columns)
+        value_columns = []
+        for column in columns:
+            values = df_table[column].to_numpy(dtype=object)
+            if pd.api.types.infer_dtype(values, skipna=True) == "mixed":
+                values = [list(x) if type(x) is np.ndarray else x for x in values]
+            value_columns.append(values)
+
+        if not value_columns:
+            return []
+
+        # The values that are not missing, one row per row of the table
+        present = ~np.column_stack([utils.isnan_array(x) for x in value_columns])
+
+        return [
+            dict(
+                compress(zip(columns, row_values), row_present),
+                source_catalogue=catalogue.code,
+            )
+            for row_values, row_present in zip(zip(*value_columns), present)
         ]
 
-        return unique_data
-
     @staticmethod
     def _to_catalogues(catalogues: List[dict]):
         """Maps rows to the Catalogue object."""
@@ -1,20 +1,40 @@
-from typing import List, Set
+from typing import List, Mapping, Sequence, Set, Union
 
 from molgenis.client import MolgenisRequestError
+from molgenis.eucan_connect import utils
+from molgenis.eucan_connect.changes import ChangeSet
 from molgenis.eucan_connect.errors import EucanError, EucanWarning
 from molgenis.eucan_connect.eucan_client import EucanSession
-from molgenis.eucan_connect.model import Catalogue, CatalogueData, RefData, Table
+from molgenis.eucan_connect.model import (
+    Catalogue,
+    CatalogueData,
+    RefData,
+    StreamingCatalogueData,
+    Table,
+    TableStream,
+)
 from molgenis.eucan_connect.printer import Printer
 
+ROW_ERROR_STATUS_CODES = {400, 409, 422}
+"""The status codes of the responses that reject a batch because of its rows"""
+
 
 class Importer:
     """
     This class is responsible for uploading the data into the EUCAN-Connect Catalogue
     """
 
-    def __init__(self, session: EucanSession, printer: Printer):
+    def __init__(self, session: EucanSession, printer: Printer, recover: bool = False):
+        """
+        :param EucanSession session: an authenticated session with
+                                     an EUCAN-Connect Catalogue
+        :param Printer printer: the printer
+        :param bool recover: when a batch of catalogue data is rejected, isolate the
+                             invalid rows and import the other rows of the batch
+        """
         self.session = session
         self.printer = printer
+        self.recover = recover
         self.warnings: List[EucanWarning] = []
 
     def import_catalogue_data(
@@ -43,7 +63,7 @@ class Importer:
                     f"Importing {len(table.rows)} rows in {table.type.base_id}"
                 )
                 try:
-                    self.session.add_batched(table.type.base_id, table.rows)
+                    self._add_rows(table.type.base_id, table.rows)
                 except MolgenisRequestError as e:
                     raise EucanError(
                         f"Error importing rows to {table.type.base_id}"
@@ -51,10 +71,69 @@ class Importer:
 
         return self.warnings
 
+    def import_streaming_data(
+        self, catalogue_data: StreamingCatalogueData
+    ) -> List[EucanWarning]:
+        """
+        Streaming variant of import_catalogue_data. The rows of a table are only known
+        while they are uploaded, so the existing rows are kept until all tables are
+        imported. This happens in three steps:
+        1. The batches of every table are uploaded while they are produced. Rows that
+           are already in the EUCAN-Connect Catalogue are updated, others are added
+        2. The existing rows that were not uploaded again are deleted
+        3. A warning is given for every deleted row
+        When the import fails halfway, no rows of the source catalogue are deleted.
+        :param catalogue_data: StreamingCatalogueData object
+        :return: List with warnings
+        """
+        self.warnings = []
+        catalogue = catalogue_data.catalogue
+        with self.printer.indentation():
+            eucan_ids = {
+                table.type: self._get_eucan_ids(table, catalogue)
+                for table in catalogue_data.tables
+            }
+
+            source_ids = dict()
+            for table in catalogue_data.tables:
+                self.printer.print(f"Importing rows in {table.type.base_id}")
+                source_ids[table.type] = set()
+                rejected_ids = set()
+                try:
+                    for batch in table.batches:
+                        rejected_ids |= self._upsert_rows(
+                            table, batch, eucan_ids[table.type]
+                        )
+                        source_ids[table.type].update(row["id"] for row in batch)
+                except MolgenisRequestError as e:
+                    raise EucanError(
+                        f"Error importing rows to {table.type.base_id}"
+                    ) from e
+
+                # Rejected rows are not imported, but their existing version is kept
+                source_ids[table.type] -= rejected_ids
+                eucan_ids[table.type] -= rejected_ids
+
+            for table in reversed(catalogue_data.tables):
+                changes = ChangeSet.from_ids(
+                    eucan_ids[table.type], source_ids[table.type]
+                )
+                self.printer.print(f"{table.type.base_id}: {changes.summary()}")
+                self._warn_deleted_ids(table, catalogue, changes.removed)
+                try:
+                    self._delete_eucan_rows(table, changes.removed)
+                except MolgenisRequestError as e:
+                    raise EucanError(
+                        f"Error deleting existing rows from {table.type.base_id}"
+                    ) from e
+
+        return self.warnings
+
     def import_reference_data(self, reference_data: RefData) -> List[EucanWarning]:
         """
         Inserts the new reference data into the EUCAN-Connect Catalogue
-        Existing data is retrieved and with that a set with new references is created.
+        Only the references that were added since the reference data was retrieved
+        (the pending references) are inserted.
 
         :param reference_data: RefData object
         :return: List with warnings
@@ -62,17 +141,7 @@ class Importer:
         with self.printer.indentation():
             for table_type in reference_data.table_by_type:
                 entity_type_id = table_type.base_id
-                meta = self.session.get_meta(entity_type_id)
-                id_attr = meta.id_attribute
-                existing_data = self.session.get(
-                    entity_type_id, batch_size=10000, attributes=id_attr
-                )
-                existing_ids = {row[id_attr] for row in existing_data}
-                # Based on the existing identifiers, decide which rows should be added
-                add = list()
-                for reference in reference_data.table_by_type[table_type].rows:
-                    if reference[id_attr] not in existing_ids:
-                        add.append(reference)
+                add = reference_data.pending_refs(table_type)
 
                 if len(add) > 0:
                     self.printer.print(
@@ -86,9 +155,92 @@ class Importer:
                     self.session.add_batched(entity_type_id, add)
                 except MolgenisRequestError as e:
                     raise EucanError(f"Error importing rows to {entity_type_id}") from e
+                reference_data.clear_pending(table_type)
 
         return self.warnings
 
+    def _upsert_rows(
+        self, table: TableStream, rows: Sequence[Mapping], eucan_ids: Set[str]
+    ) -> Set[str]:
+        """Updates the rows that are in the EUCAN-Connect Catalogue already and adds
+        the other rows. Returns the ids of the rows that are rejected."""
+        new_rows = [row for row in rows if row["id"] not in eucan_ids]
+        existing_rows = [row for row in rows if row["id"] in eucan_ids]
+        rejected_ids = set()
+        if new_rows:
+            rejected_ids |= self._add_rows(table.type.base_id, new_rows)
+        if existing_rows:
+            rejected_ids |= self._add_rows(
+                table.type.base_id, existing_rows, update=True
+            )
+        return rejected_ids
+
+    def _add_rows(
+        self, entity_type_id: str, rows: Sequence[Mapping], update: bool = False
+    ) -> Set[str]:
+        """Adds (or updates) the rows in batches, in recovery mode every batch is
+        bisected when it is rejected. Returns the ids of the rows that are rejected."""
+        if not self.recover:
+            self._upload(entity_type_id, rows, update)
+            return set()
+
+        rejected_ids = set()
+        for batch in utils.batched(rows, 1000):
+            rejected_ids |= self._add_bisecting(entity_type_id, batch, update)
+        return rejected_ids
+
+    def _add_bisecting(
+        self, entity_type_id: str, rows: Sequence[Mapping], update: bool = False
+    ) -> Set[str]:
+        """
+        Adds (or updates) a batch of rows. When the batch is rejected because of the
+        values of its rows, both halves are added separately, until the rows that
+        are rejected on their own are found. With k invalid rows in a batch of n rows
+        this takes O(k log n) requests. Other errors are raised right away.
+        :return: the ids of the rejected rows
+        """
+        try:
+            self._upload(entity_type_id, rows, update)
+        except MolgenisRequestError as e:
+            if not self._is_row_error(e):
+                raise
+            if len(rows) == 1:
+                warning = EucanWarning(
+                    f"Row {rows[0]['id']} is not imported in {entity_type_id}: "
+                    f"{e.message}"
+                )
+                self.printer.print_warning(warning)
+                self.warnings.append(warning)
+                return {rows[0]["id"]}
+            else:
+                middle = len(rows) // 2
+                return self._add_bisecting(
+                    entity_type_id, rows[:middle], update
+                ) | self._add_bisecting(entity_type_id, rows[middle:], update)
+        return set()
+
+    @staticmethod
+    def _is_row_error(error: MolgenisRequestError) -> bool:
+        """
+        Whether the server rejected the rows because of their values: a client error
+        with an error message. Other errors, like 401, 403 and 5xx responses, would
+        reject every part of the batch as well.
+        """
+        # The client only keeps successful responses on the MolgenisRequestError,
+        # the HTTPError it is raised from has the response in all cases
+        response = getattr(error.__context__, "response", None)
+        return (
+            response is not None
+            and response.status_code in ROW_ERROR_STATUS_CODES
+            and bool(response.content)
+        )
+
+    def _upload(self, entity_type_id: str, rows: Sequence[Mapping], update: bool):
+        if update:
+            self.session.update_batched(entity_type_id, rows)
+        else:
+            self.session.add_batched(entity_type_id, rows)
+
     def _delete_rows(self, table: Table, catalogue: Catalogue):
         """
         Deletes all rows from an EUCAN-Connect Catalogue table
@@ -98,13 +250,22 @@ class Importer:
         :catalogue Catalogue catalogue: the source catalogue that is being imported
         """
         # Compare the ids from the source catalogue and the EUCAN-Connect Catalogue
-        # to see what data are deleted
-        source_ids = {row["id"] for row in table.rows}
-        eucan_ids = self._get_eucan_ids(table, catalogue)
-        deleted_ids = eucan_ids.difference(source_ids)
+        # to see what data are deleted. The existing rows of the rows that are left
+        # out of the import (because of invalid values) are kept.
+        eucan_ids = self._get_eucan_ids(table, catalogue) - table.skipped_ids
+        changes = ChangeSet.from_ids(eucan_ids, table.rows_by_id.keys())
+        self.printer.print(f"{table.type.base_id}: {changes.summary()}")
+        self._warn_deleted_ids(table, catalogue, changes.removed)
+        self._delete_eucan_rows(table, eucan_ids)
 
-        # Show a warning for every id that is not in the source catalogue anymore
-        for id_ in deleted_ids:
+    def _warn_deleted_ids(
+        self,
+        table: Union[Table, TableStream],
+        catalogue: Catalogue,
+        deleted_ids: Set[str],
+    ):
+        """Shows a warning for every id that is not in the source catalogue anymore"""
+        for id_ in sorted(deleted_ids):
             warning = EucanWarning(
                 f"This {catalogue.description} {table.type.base_id} ID {id_} is not "
                 f"in the source catalogue anymore."
@@ -112,14 +273,17 @@ class Importer:
             self.printer.print_warning(warning)
             self.warnings.append(warning)
 
-        # Delete the existing source catalogue rows in the EUCAN-Connect Catalogue
+    def _delete_eucan_rows(self, table: Union[Table, TableStream], eucan_ids: Set[str]):
+        """Deletes the existing source catalogue rows in the EUCAN-Connect Catalogue"""
         if eucan_ids:
             self.printer.print(
                 f"Deleting {len(eucan_ids)} rows in {table.type.base_id}"
             )
             self.session.delete_list(table.type.base_id, list(eucan_ids))
 
-    def _get_eucan_ids(self, table: Table, catalogue: Catalogue) -> Set[str]:
+    def _get_eucan_ids(
+        self, table: Union[Table, TableStream], catalogue: Catalogue
+    ) -> Set[str]:
         try:
             rows = self.session.get(
                 table.type.base_id, batch_size=10000, attributes="id,source_catalogue"
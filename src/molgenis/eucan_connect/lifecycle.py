@@ -1,16 +1,125 @@
+from concurrent.futures import ThreadPoolExecutor
 from typing import Dict, List
 
 import numpy as np
 import pandas as pd
 import requests
 from pandas import json_normalize
+from requests.adapters import HTTPAdapter
 
 from molgenis.client import BlockAll
+from molgenis.eucan_connect import utils
 from molgenis.eucan_connect.errors import EucanError, EucanWarning
 from molgenis.eucan_connect.eucan_client import EucanSession
+from molgenis.eucan_connect.mapping import (
+    Collection,
+    Composite,
+    Field,
+    IdField,
+    ListField,
+    SourceMapping,
+)
 from molgenis.eucan_connect.model import Catalogue, TableType
 from molgenis.eucan_connect.printer import Printer
 
+LIFECYCLE_MAPPING = SourceMapping(
+    key="pid",
+    fields=[
+        Field("name", "study_name"),
+        Field("acronym"),
+        Field("description", "objectives"),
+        Field("startYear", "start_year"),
+        Field("endYear", "end_year"),
+        Field("website"),
+        Field("fundingStatement", "funding"),
+        Field("design.name", "study_design"),
+        Field("numberOfParticipants", "number_of_participants"),
+        Field("numberOfParticipantsWithSamples", "participants_with_biosamples"),
+        Field("supplementaryInformation", "number_of_participants_supplement"),
+        Field("dataAccessConditionsDescription", "contact_procedures"),
+        Field("designPaper.doi", "marker_paper"),
+    ],
+    list_fields=[ListField("dataAccessConditions", "name", "access_possibility")],
+    collections=[
+        Collection(
+            "contributors",
+            TableType.PERSONS,
+            fields=[
+                Field("contact.title.name", "title"),
+                Field("contact.firstName", "first_name"),
+                Field("contact.prefix", intermediate=True),
+                Field("contact.surname", intermediate=True),
+                Field("contact.email", "email"),
+            ],
+            list_fields=[
+                ListField(
+                    "contributionType", "name", "contribution_types", intermediate=True
+                )
+            ],
+            composites=[
+                # The last name includes the prefix, for example "de Vries"
+                Composite(
+                    "last_name",
+                    ["contact.prefix", "contact.surname"],
+                    separator=" ",
+                    optional=["contact.prefix"],
+                ),
+                # A person is identified by the email address or else by the name
+                Composite(
+                    "key",
+                    ["first_name", "contact.surname"],
+                    preferred="email",
+                    intermediate=True,
+                ),
+            ],
+        ),
+        Collection(
+            "collectionEvents",
+            TableType.EVENTS,
+            fields=[
+                Field("name"),
+                Field("description"),
+                Field("startYear.name", intermediate=True),
+                Field("endYear.name", intermediate=True),
+                Field("startMonth.code", intermediate=True),
+                Field("endMonth.code", intermediate=True),
+            ],
+            list_fields=[
+                ListField(
+                    "areasOfInformation", "name", "type_administrative_databases"
+                ),
+                ListField("sampleCategories", "name", "biosamples_type"),
+                ListField("dataCategories", "name", "datasources_type"),
+            ],
+        ),
+        Collection(
+            "subcohorts",
+            TableType.POPULATIONS,
+            fields=[
+                Field("name"),
+                Field("description"),
+                Field("inclusionCriteria", "selection_criteria_supplement"),
+                Field("supplementaryInformation", "recruitment_sources_supplement"),
+                Field("numberOfParticipants", "number_of_participants"),
+            ],
+            list_fields=[ListField("ageGroups", "code", "recruitment_sources")],
+        ),
+    ],
+    ids=[
+        IdField(TableType.PERSONS, ["persons_key"]),
+        IdField(TableType.EVENTS, ["study_id", "events_name"]),
+        IdField(TableType.POPULATIONS, ["study_id", "population_name"]),
+    ],
+)
+"""Mapping of the LifeCycle cohorts to the EUCAN-Connect tables"""
+
+
+def _text(column: pd.Series) -> pd.Series:
+    """A compacted (categorical) text column as plain text, so it can be joined"""
+    if isinstance(column.dtype, pd.CategoricalDtype):
+        return column.astype(object)
+    return column
+
 
 class LifeCycle:
     """
@@ -19,16 +128,33 @@ class LifeCycle:
     EUCAN-Connect Catalogue data model.
     """
 
-    def __init__(self, session: EucanSession, printer: Printer, catalogue: Catalogue):
+    plan = LIFECYCLE_MAPPING.compile()
+
+    def __init__(
+        self,
+        session: EucanSession,
+        printer: Printer,
+        catalogue: Catalogue,
+        split_queries: bool = True,
+        stable_ids: bool = False,
+    ):
         """Constructs a new Session.
         Args:
         url -- URL of the REST API. Should be of form 'http[s]://<EMX2 server>[:port]/'
+        split_queries -- retrieve the nested collections with concurrent sub-queries
+        stable_ids -- derive the person, event and population ids from their content
         Examples:
         session = Session('https://data-catalogue.molgeniscloud.org/')
         """
         self.catalogue = catalogue
         self.eucan_session = session
+        self.split_queries = split_queries
+        self.stable_ids = stable_ids
         self._lc_session = requests.Session()
+        # Pooled connections, so the concurrent sub-queries reuse their connection
+        adapter = HTTPAdapter(pool_maxsize=len(self.plan.graphql_collections) + 1)
+        self._lc_session.mount("http://", adapter)
+        self._lc_session.mount("https://", adapter)
         self._lc_headers = {
             "Accept": "application/json",
             "Content-Type": "application/json",
@@ -54,69 +180,71 @@ class LifeCycle:
                 f"{len(lc_cohort_data)}"
             )
 
+        return self.transform(lc_cohort_data)
+
+    def transform(self, lc_cohort_data: List[dict]) -> pd.DataFrame:
+        """
+        Converts the retrieved cohorts to the EUCAN-Connect Catalogue data model.
+        Does not need a connection, so it can run in a separate process.
+        """
         df_lc_cohorts = self._create_df(lc_cohort_data)
-        df_lc_cohorts = self._convert_values(df_lc_cohorts)
-
-        return df_lc_cohorts
-
-    def get_lc_cohort_data(self):
-        lc_query = """query {Cohorts {pid, name, acronym, description, startYear,
-                                        endYear, website, # contactEmail,
-                                contributors {contact {title {name}, firstName, prefix,
-                                                        surname, email},
-                                                        contributionType {name}},
-                                fundingStatement, design {name}, numberOfParticipants,
-                                numberOfParticipantsWithSamples,
-                                supplementaryInformation, dataAccessConditions {name},
-                                dataAccessConditionsDescription, designPaper {doi},
-                                subcohorts {name, description, inclusionCriteria,
-                                            # mainMedicalCondition {name},
-                                            supplementaryInformation,
-                                            ageGroups {name, code},
-                                            numberOfParticipants},
-                                          collectionEvents {name, description,
-                                                                startYear {name},
-                                                                endYear {name},
-                                                                startMonth {code},
-                                                                endMonth {code},
-                                                         areasOfInformation {name},
-                                                         dataCategories {name},
-                                                         sampleCategories {name}}}}"""
+
+        # The frame is compacted as soon as it is built, so the conversion works on
+        # the compact frame
+        memory_before = df_lc_cohorts.memory_usage(deep=True).sum()
+        df_lc_cohorts = self._compact_dtypes(df_lc_cohorts)
+        memory_after = df_lc_cohorts.memory_usage(deep=True).sum()
+        self.printer.print(
+            f"Memory of the cohorts frame reduced from "
+            f"{utils.format_size(memory_before)} to {utils.format_size(memory_after)}"
+        )
+
+        return self._convert_values(df_lc_cohorts)
+
+    def get_lc_cohort_data(self) -> List[dict]:
+        """
+        Retrieves the cohorts of the source catalogue. By default the query is split
+        into concurrent sub-queries per nested collection, which are stitched back
+        together on the cohort pid. Set split_queries to False to use one query.
+        """
+        if not self.split_queries:
+            return self._query_cohorts(self.plan.graphql_query)
+
+        queries = [self.plan.graphql_fields] + [
+            f"pid, {fields}" for fields in self.plan.graphql_collections.values()
+        ]
+        with ThreadPoolExecutor(max_workers=len(queries)) as executor:
+            lc_cohorts, *lc_nested_data = executor.map(self._query_cohorts, queries)
+
+        cohorts_by_pid = {cohort["pid"]: cohort for cohort in lc_cohorts}
+        for nested_cohorts in lc_nested_data:
+            for nested_cohort in nested_cohorts:
+                cohort = cohorts_by_pid.get(nested_cohort.pop("pid"))
+                if cohort is not None:
+                    cohort.update(nested_cohort)
+
+        return lc_cohorts
+
+    def _query_cohorts(self, fields: str) -> List[dict]:
+        """Posts a GraphQL query on the Cohorts table for the given field selection"""
         lc_url = self.catalogue.catalogue_url + "/catalogue/graphql"
         response = self._lc_session.post(
-            lc_url, headers=self._lc_headers, json={"query": lc_query}
+            lc_url,
+            headers=self._lc_headers,
+            json={"query": f"query {{Cohorts {{{fields}}}}}"},
         )
+        response.raise_for_status()
         lc_data = response.json()
 
         return lc_data["data"]["Cohorts"]
 
     def _create_df(self, json_data):
-        table_prefix = {
-            "study": "study_",
-            "collectionEvents": "events_",
-            "contributors": "persons_",
-            "subcohorts": "population_",
-        }
+        table_prefix = self.plan.table_prefix
         # Convert the json list to a pandas dataframe
         df_cohorts = json_normalize(json_data)
 
         # Rename the study columns
-        df_cohorts.rename(
-            columns={
-                "name": "study_name",
-                "description": "objectives",
-                "startYear": "start_year",
-                "endYear": "end_year",
-                "fundingStatement": "funding",
-                "design.name": "study_design",
-                "numberOfParticipants": "number_of_participants",
-                "numberOfParticipantsWithSamples": "participants_with_biosamples",
-                "supplementaryInformation": "number_of_participants_supplement",
-                "dataAccessConditionsDescription": "contact_procedures",
-                "designPaper.doi": "marker_paper",
-            },
-            inplace=True,
-        )
+        df_cohorts.rename(columns=self.plan.root_renames, inplace=True)
 
         # Add the study prefix
         df_cohorts = df_cohorts.add_prefix(table_prefix["study"])
@@ -127,90 +255,59 @@ class LifeCycle:
         df_cohorts = self._extract_data(json_data, df_cohorts, table_prefix)
 
         # Rename the columns of the extracted data
-        df_cohorts.rename(
-            columns={
-                "persons_contact.title.name": "persons_title",
-                "persons_contact.firstName": "persons_first_name",
-                "persons_contact.email": "persons_email",
-                "population_inclusionCriteria": "population_selection_"
-                "criteria_supplement",
-                "population_numberOfParticipants": "population_number_of_participants",
-                "population_supplementaryInformation": "population_recruitment_"
-                "sources_supplement",
-                "study_pid": "study_id",
-            },
-            inplace=True,
-        )
+        df_cohorts.rename(columns=self.plan.collection_renames, inplace=True)
 
         return df_cohorts
 
     def _convert_values(self, df_converted: pd.DataFrame):
         # Define the IDs
-        len_id_nr = "{:00" + str(len(str(len(df_converted))) + 1) + "}"
+        id_width = len(str(len(df_converted))) + 1
 
         df_converted["study_id"] = self.catalogue.get_id_prefix(
             TableType.STUDIES
         ) + df_converted["study_id"].str.replace(" ", "_", regex=False)
-        df_converted["person"] = df_converted["persons_email"].fillna(
-            df_converted["persons_first_name"] + df_converted["persons_contact.surname"]
-        )
-        df_converted["persons_id"] = self.catalogue.get_id_prefix(
-            TableType.PERSONS
-        ) + df_converted.groupby(["person"], sort=False).ngroup().apply(
-            len_id_nr.format
-        )
-        df_converted.loc[df_converted["person"].isnull(), "persons_id"] = np.nan
-        df_converted["events_id"] = self.catalogue.get_id_prefix(
-            TableType.EVENTS
-        ) + df_converted.groupby(
-            ["study_id", "events_name"], sort=False
-        ).ngroup().apply(
-            len_id_nr.format
-        )
-        df_converted.loc[df_converted["events_name"].isnull(), "events_id"] = np.nan
-        df_converted["population_id"] = self.catalogue.get_id_prefix(
-            TableType.POPULATIONS
-        ) + df_converted.groupby(
-            ["study_id", "population_name"], sort=False
-        ).ngroup().apply(
-            len_id_nr.format
-        )
-        df_converted.loc[
-            df_converted["population_name"].isnull(), "population_id"
-        ] = np.nan
-
-        # Add a prefix to the last name
-        df_converted["persons_last_name"] = (
-            df_converted["persons_contact.prefix"]
-            .fillna("")
-            .str.cat(df_converted["persons_contact.surname"], " ")
-            .str.lstrip()
-        )
+        # The composed id keys are needed before the ids are generated
+        id_keys = {key for keys in self.plan.id_keys.values() for key in keys}
+        for composite in self.plan.composites:
+            if composite.target in id_keys:
+                df_converted[composite.target] = self._compose(df_converted, composite)
+        for table_type, keys in self.plan.id_keys.items():
+            df_converted[f"{table_type.table}_id"] = self._generate_ids(
+                df_converted, keys, table_type, id_width
+            )
+        for composite in self.plan.composites:
+            if composite.target not in id_keys:
+                df_converted[composite.target] = self._compose(df_converted, composite)
+
         df_converted["events_start_end_year"] = (
-            df_converted["events_startYear.name"]
+            _text(df_converted["events_startYear.name"])
             + "-"
-            + df_converted["events_endYear.name"].fillna("")
+            + _text(df_converted["events_endYear.name"]).fillna("")
         )
 
         # Add the study acronym to the events and population name
         df_converted["events_name"] = (
-            df_converted["study_acronym"] + " - " + df_converted["events_name"]
+            _text(df_converted["study_acronym"])
+            + " - "
+            + _text(df_converted["events_name"])
         )
         df_converted["population_name"] = (
-            df_converted["study_acronym"] + " - " + df_converted["population_name"]
+            _text(df_converted["study_acronym"])
+            + " - "
+            + _text(df_converted["population_name"])
         )
 
         # Define start/end periods
         if "events_startMonth.code" in df_converted.columns:
             if "events_endMonth.code" in df_converted.columns:
                 df_converted["events_start_end_month"] = (
-                    df_converted["events_startMonth.code"]
+                    _text(df_converted["events_startMonth.code"])
                     + "-"
-                    + df_converted["events_endMonth.code"].fillna("")
+                    + _text(df_converted["events_endMonth.code"]).fillna("")
                 )
             else:
                 df_converted["events_start_end_month"] = (
-                    df_converted["events_startMonth.code"] + "-"
+                    _text(df_converted["events_startMonth.code"]) + "-"
                 )
 
         # Define the principal investigator / contact person, data_sources
@@ -261,24 +358,7 @@ class LifeCycle:
 
         # Drop irrelevant columns
         df_converted.drop(
-            [
-                "study_dataAccessConditions",
-                "person",
-                "persons_contact.prefix",
-                "persons_contact.surname",
-                "events_startYear.name",
-                "events_endYear.name",
-                "events_startMonth.code",
-                "events_endMonth.code",
-                "events_areasOfInformation",
-                "events_dataCategories",
-                "events_sampleCategories",
-                "population_ageGroups",
-                "persons_contributionType",
-                "persons_contribution_types",
-                "temp_pi",
-                "temp_contacts",
-            ],
+            self.plan.drop_columns + ["temp_pi", "temp_contacts"],
             axis=1,
             inplace=True,
             errors="ignore",
@@ -287,19 +367,99 @@ class LifeCycle:
         return df_converted
 
     @staticmethod
-    def _convert_list_values(df_list_conversion: pd.DataFrame) -> pd.DataFrame:
+    def _compose(df: pd.DataFrame, composite: Composite) -> pd.Series:
+        """
+        Composes a column out of its source columns (see mapping.Composite)
+        :param df: the LifeCycle data
+        :param composite: the composed column
+        :return a pandas Series with the composed values:
+        """
+        composed = pd.Series(np.nan, index=df.index, dtype=object)
+        for source in composite.sources:
+            # Missing values are skipped here, required ones are checked below
+            composed = (
+                (composed + composite.separator + _text(df[source]))
+                .fillna(composed)
+                .fillna(_text(df[source]))
+            )
+
+        required = [s for s in composite.sources if s not in composite.optional]
+        composed[df[required].isna().any(axis=1)] = np.nan
+        if composite.preferred:
+            composed = _text(df[composite.preferred]).fillna(composed)
+        return composed
+
+    def _generate_ids(
+        self, df: pd.DataFrame, keys: List[str], table_type: TableType, width: int
+    ) -> np.ndarray:
+        """
+        Generates an identifier for every distinct combination of the key columns.
+        By default the ids are sequence numbers (zero-padded to width) in order of
+        appearance. With stable_ids the ids are derived from a hash of the key
+        values, so they do not shift when cohorts are added or removed. Rows with a
+        missing key value get no identifier.
+        :param df: the LifeCycle data
+        :param keys: the columns that identify a row of the table
+        :param table_type: the table to generate the identifiers for
+        :param width: the minimal number of digits of the sequence numbers
+        :return a numpy array with the identifiers:
+        """
+        prefix = self.catalogue.get_id_prefix(table_type)
+        missing = df[keys].isna().any(axis=1).to_numpy()
+
+        if self.stable_ids:
+            hashes = pd.util.hash_pandas_object(df[keys], index=False).to_numpy()
+            unique_hashes, codes = np.unique(hashes, return_inverse=True)
+            labels = [f"{prefix}{hash_:016x}" for hash_ in unique_hashes]
+        else:
+            group_nrs = df.groupby(keys, sort=False, observed=True).ngroup()
+            codes = group_nrs.fillna(-1).to_numpy(dtype=np.int64)
+            labels = [
+                f"{prefix}{nr:0{width}}" for nr in range(codes.max(initial=-1) + 1)
+            ]
+
+        # Format the labels once per group and index them with the group codes,
+        # the extra last label is the missing value for the rows without a key
+        labels = np.array(labels + [np.nan], dtype=object)
+        codes[missing] = -1
+        return labels[codes]
+
+    @staticmethod
+    def _compact_dtypes(df: pd.DataFrame) -> pd.DataFrame:
+        """
+        Reduces the memory of the LifeCycle frame: the years and numbers of
+        participants become nullable integers and text columns with repeated values
+        (names, acronyms, emails, identifiers) become categorical
+        :param df: the LifeCycle data
+        :return a pandas DataFrame:
+        """
+        integer_columns = [
+            "study_start_year",
+            "study_end_year",
+            "study_number_of_participants",
+            "study_participants_with_biosamples",
+            "population_number_of_participants",
+        ]
+        for column in set(integer_columns).intersection(df.columns):
+            values = pd.to_numeric(df[column], errors="coerce")
+            if (
+                values.notna().sum() == df[column].notna().sum()
+                and (values.dropna() % 1 == 0).all()
+            ):
+                df[column] = values.astype("Int64")
+
+        for column in df.columns[df.dtypes == object]:
+            # Columns with lists or mixed values remain objects
+            if pd.api.types.infer_dtype(df[column], skipna=True) != "string":
+                continue
+            if df[column].nunique() <= len(df) // 2:
+                df[column] = df[column].astype("category")
+
+        return df
+
+    def _convert_list_values(self, df_list_conversion: pd.DataFrame) -> pd.DataFrame:
         # Convert per column the list items to columns
-        list_columns = {
-            "study_dataAccessConditions": ["_name", "study_access_possibility"],
-            "persons_contributionType": ["_name", "persons_contribution_types"],
-            "events_areasOfInformation": [
-                "_name",
-                "events_type_administrative_databases",
-            ],
-            "events_sampleCategories": ["_name", "events_biosamples_type"],
-            "events_dataCategories": ["_name", "events_datasources_type"],
-            "population_ageGroups": ["_code", "population_recruitment_sources"],
-        }
+        list_columns = self.plan.list_columns
         for df_col in list_columns.keys():
             df_converted_list = pd.DataFrame(
                 [pd.Series(x) for x in df_list_conversion[df_col]]
@@ -354,7 +514,7 @@ class LifeCycle:
     @staticmethod
     def _extract_data(json_data: List[dict], df_in: pd.DataFrame, table_prefix: Dict):
         df_extracted = df_in
-        for var in ["contributors", "collectionEvents", "subcohorts"]:
+        for var in [path for path in table_prefix.keys() if path != "study"]:
             df_no_nan = df_in.dropna(subset=[table_prefix["study"] + var])
             row_list = df_no_nan.index
             df_add = pd.DataFrame
@@ -0,0 +1,222 @@
+from dataclasses import dataclass, field
+from typing import Dict, List, Optional
+
+from molgenis.eucan_connect.model import TableType
+
+
+@dataclass(frozen=True)
+class Field:
+    """
+    A (nested) field of a source object. The path uses dots for nested objects, for
+    example "design.name". Without a target the column keeps the name of the path.
+    Intermediate fields are only needed during the conversion and are dropped after.
+    """
+
+    path: str
+    target: Optional[str] = None
+    intermediate: bool = False
+
+
+@dataclass(frozen=True)
+class ListField:
+    """
+    A list of objects in the source that is flattened to a list with the values of
+    one key of these objects, for example the names of the data access conditions.
+    """
+
+    path: str
+    key: str
+    target: str
+    intermediate: bool = False
+
+
+@dataclass(frozen=True)
+class Composite:
+    """
+    A column composed of other columns of the same table: the values of the sources
+    joined by the separator. A missing value of an optional source is left out, a
+    missing value of another source makes the composed value missing. With a
+    preferred column the composed value is only used where that column is missing.
+    Intermediate composites are only needed during the conversion.
+    """
+
+    target: str
+    sources: List[str]
+    separator: str = ""
+    optional: List[str] = field(default_factory=list)
+    preferred: Optional[str] = None
+    intermediate: bool = False
+
+    def with_prefix(self, prefix: str) -> "Composite":
+        """The composite with the table prefix added to all its column names"""
+        return Composite(
+            target=prefix + self.target,
+            sources=[prefix + source for source in self.sources],
+            separator=self.separator,
+            optional=[prefix + source for source in self.optional],
+            preferred=prefix + self.preferred if self.preferred else None,
+            intermediate=self.intermediate,
+        )
+
+
+@dataclass(frozen=True)
+class Collection:
+    """A nested list of source objects that become the rows of a EUCAN table."""
+
+    path: str
+    table_type: TableType
+    fields: List[Field]
+    list_fields: List[ListField] = field(default_factory=list)
+    composites: List[Composite] = field(default_factory=list)
+
+
+@dataclass(frozen=True)
+class IdField:
+    """The columns that identify a row of a EUCAN table."""
+
+    table_type: TableType
+    keys: List[str]
+
+
+@dataclass(frozen=True)
+class TransformPlan:
+    """
+    The compiled form of a SourceMapping. Contains the GraphQL field selections and
+    the renames, list columns, id definitions and drop lists of the conversion.
+    """
+
+    graphql_fields: str
+    """Field selection of the root objects (without the collections)"""
+    graphql_collections: Dict[str, str]
+    """Field selection per collection"""
+    table_prefix: Dict[str, str]
+    """Column prefix of the root ("study") and of every collection path"""
+    root_renames: Dict[str, str]
+    """Renames of the root columns, applied before the prefix is added"""
+    collection_renames: Dict[str, str]
+    """Renames of the prefixed columns, applied after the collections are extracted"""
+    list_columns: Dict[str, List[str]]
+    """Per list column: the suffix of the key and the target column"""
+    composites: List[Composite]
+    """The composed columns (with prefixed column names), in order of composition"""
+    id_keys: Dict[TableType, List[str]]
+    drop_columns: List[str]
+
+    @property
+    def graphql_query(self) -> str:
+        """Field selection of the root objects including all collections"""
+        collections = list(self.graphql_collections.values())
+        return ", ".join([self.graphql_fields] + collections)
+
+
+@dataclass(frozen=True)
+class SourceMapping:
+    """
+    Declarative specification of how the objects of a source catalogue map to the
+    EUCAN-Connect tables. The root objects become studies, the collections become
+    rows of the other tables. Use compile() to get the TransformPlan.
+    """
+
+    key: str
+    """Field that identifies a root object, renamed to the study id"""
+    fields: List[Field]
+    list_fields: List[ListField]
+    collections: List[Collection]
+    ids: List[IdField]
+
+    def compile(self) -> TransformPlan:
+        """Compiles the mapping once into the plan that drives the conversion"""
+        study_prefix = f"{TableType.STUDIES.table}_"
+        table_prefix = {TableType.STUDIES.table: study_prefix}
+        root_renames = {
+            field_.path: field_.target for field_ in self.fields if field_.target
+        }
+        collection_renames = {}
+        list_columns = {}
+        composites = []
+        drop_columns = []
+
+        self._add_list_fields(self.list_fields, study_prefix, list_columns)
+        drop_columns += self._intermediates(self.fields, self.list_fields, study_prefix)
+
+        graphql_collections = {}
+        for collection in self.collections:
+            prefix = f"{collection.table_type.table}_"
+            table_prefix[collection.path] = prefix
+            for field_ in collection.fields:
+                if field_.target:
+                    collection_renames[prefix + field_.path] = prefix + field_.target
+            self._add_list_fields(collection.list_fields, prefix, list_columns)
+            drop_columns += self._intermediates(
+                collection.fields, collection.list_fields, prefix
+            )
+            for composite in collection.composites:
+                composites.append(composite.with_prefix(prefix))
+                if composite.intermediate:
+                    drop_columns.append(prefix + composite.target)
+            graphql_collections[collection.path] = self._selection(
+                {collection.path: self._tree(collection.fields, collection.list_fields)}
+            )
+
+        collection_renames[study_prefix + self.key] = f"{study_prefix}id"
+
+        return TransformPlan(
+            graphql_fields=self._selection(
+                self._tree([Field(self.key)] + self.fields, self.list_fields)
+            ),
+            graphql_collections=graphql_collections,
+            table_prefix=table_prefix,
+            root_renames=root_renames,
+            collection_renames=collection_renames,
+            list_columns=list_columns,
+            composites=composites,
+            id_keys={id_.table_type: id_.keys for id_ in self.ids},
+            drop_columns=drop_columns,
+        )
+
+    @staticmethod
+    def _add_list_fields(
+        list_fields: List[ListField], prefix: str, list_columns: Dict[str, List[str]]
+    ):
+        for list_field in list_fields:
+            list_columns[prefix + list_field.path] = [
+                f"_{list_field.key}",
+                prefix + list_field.target,
+            ]
+
+    @staticmethod
+    def _intermediates(
+        fields: List[Field], list_fields: List[ListField], prefix: str
+    ) -> List[str]:
+        """The source list columns and intermediate columns that can be dropped"""
+        drop_columns = [
+            prefix + (field_.target or field_.path)
+            for field_ in fields
+            if field_.intermediate
+        ]
+        for list_field in list_fields:
+            drop_columns.append(prefix + list_field.path)
+            if list_field.intermediate:
+                drop_columns.append(prefix + list_field.target)
+        return drop_columns
+
+    @staticmethod
+    def _tree(fields: List[Field], list_fields: List[ListField]) -> dict:
+        """Builds a tree of nested field names out of the dotted paths"""
+        tree = {}
+        paths = [field_.path for field_ in fields] + [
+            f"{list_field.path}.{list_field.key}" for list_field in list_fields
+        ]
+        for path in paths:
+            node = tree
+            for name in path.split("."):
+                node = node.setdefault(name, {})
+        return tree
+
+    @classmethod
+    def _selection(cls, tree: dict) -> str:
+        """Renders a tree of field names as a GraphQL field selection"""
+        return ", ".join(
+            f"{name} {{{cls._selection(node)}}}" if node else name
+            for name, node in tree.items()
+        )
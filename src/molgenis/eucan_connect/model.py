@@ -1,8 +1,21 @@
-import typing
-from collections import OrderedDict
-from dataclasses import dataclass
+import re
+from collections.abc import Mapping
+from dataclasses import dataclass, field
 from enum import Enum
-from typing import Dict, List
+from functools import lru_cache
+from typing import (
+    Dict,
+    FrozenSet,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Pattern,
+    Sequence,
+    Set,
+)
+
+from molgenis.eucan_connect import utils
 
 
 class TableType(Enum):
@@ -26,17 +39,218 @@ class TableType(Enum):
         return f"eucan_{self.value}"
 
 
+@dataclass(frozen=True)
+class AttributeMeta:
+    """The metadata of a single attribute, as returned by the metadata API."""
+
+    name: str
+    type: str
+    ref_entity: Optional[str] = None
+    nillable: bool = True
+    max_length: Optional[int] = None
+    enum_options: Optional[List[str]] = None
+    id_attribute: bool = False
+    label_attribute: bool = False
+    auto: bool = False
+    expression: Optional[str] = None
+    default_value: Optional[str] = None
+
+    INT_TYPES = {"int", "long"}
+    DECIMAL_TYPES = {"decimal"}
+    BOOL_TYPES = {"bool"}
+    MREF_TYPES = {"mref", "categorical_mref", "one_to_many"}
+    XREF_TYPES = {"xref", "categorical", "file"}
+
+    @property
+    def is_reference(self) -> bool:
+        return self.type in self.XREF_TYPES or self.type in self.MREF_TYPES
+
+    @property
+    def is_filled_by_server(self) -> bool:
+        """Whether the server fills in a missing value: auto, expression or default"""
+        return (
+            self.auto or self.expression is not None or self.default_value is not None
+        )
+
+    def coerce(self, value):
+        """
+        Converts a value to the Python type of this attribute: int, float, bool, a
+        list of ids for the mref types or a string for the other types.
+
+        :raises ValueError: if the value can not be converted
+        """
+        if self.type in self.MREF_TYPES:
+            values = value if isinstance(value, (list, tuple)) else [value]
+            return [str(x) for x in values]
+        if self.type in self.INT_TYPES:
+            if isinstance(value, float) and not value.is_integer():
+                raise ValueError(f"{value} is not an integer")
+            return int(value)
+        if self.type in self.DECIMAL_TYPES:
+            return float(value)
+        if self.type in self.BOOL_TYPES:
+            if isinstance(value, str) and value.lower() in ("true", "false"):
+                return value.lower() == "true"
+            if value in (0, 1):
+                return bool(value)
+            raise ValueError(f"{value} is not a boolean")
+        return str(value)
+
+    @staticmethod
+    def of(data: dict) -> "AttributeMeta":
+        """Factory method that takes the "data" of an attribute of the metadata API"""
+        ref_entity = data.get("refEntityType")
+        if ref_entity:
+            ref_entity = (
+                ref_entity.get("data", {}).get("id")
+                or ref_entity.get("links", {}).get("self", "").split("/")[-1]
+            )
+        return AttributeMeta(
+            name=data["name"],
+            type=data.get("type", "string"),
+            ref_entity=ref_entity or None,
+            nillable=data.get("nullable", True),
+            max_length=data.get("maxLength"),
+            enum_options=data.get("enumOptions"),
+            id_attribute=data.get("idAttribute", False) is True,
+            label_attribute=data.get("labelAttribute", False) is True,
+            auto=data.get("auto", False) is True,
+            expression=data.get("expression") or None,
+            default_value=data.get("defaultValue"),
+        )
+
+
 @dataclass(frozen=True)
 class TableMeta:
     """Convenient wrapper for the output of the metadata API."""
 
     meta: dict
+    attributes: Dict[str, AttributeMeta] = field(init=False, repr=False, compare=False)
+    """The data attributes by name, parsed once from the metadata"""
+
+    def __post_init__(self):
+        items = self.meta.get("data", {}).get("attributes", {}).get("items", [])
+        attributes = dict()
+        for item in items:
+            attribute = AttributeMeta.of(item["data"])
+            # Compound attributes only group other attributes, they hold no data
+            if attribute.type != "compound":
+                attributes[attribute.name] = attribute
+        object.__setattr__(self, "attributes", attributes)
 
     @property
     def id_attribute(self):
-        for attribute in self.meta["data"]["attributes"]["items"]:
-            if attribute["data"]["idAttribute"] is True:
-                return attribute["data"]["name"]
+        return next(
+            (name for name, attr in self.attributes.items() if attr.id_attribute),
+            None,
+        )
+
+
+class _Missing:
+    """Marks a value that is missing from a row in a ColumnarRows column."""
+
+    def __reduce__(self):
+        # Unpickles to the module level instance, so identity checks keep working
+        return "_MISSING"
+
+
+_MISSING = _Missing()
+
+
+class RowView(Mapping):
+    """Read-only view of a single row of a ColumnarRows store."""
+
+    __slots__ = ("_store", "_position")
+
+    def __init__(self, store: "ColumnarRows", position: int):
+        self._store = store
+        self._position = position
+
+    def __getitem__(self, key: str):
+        value = self._store.columns[key][self._position]
+        if value is _MISSING:
+            raise KeyError(key)
+        return value
+
+    def __iter__(self) -> Iterator[str]:
+        return (
+            key
+            for key, column in self._store.columns.items()
+            if column[self._position] is not _MISSING
+        )
+
+    def __len__(self) -> int:
+        return sum(1 for _ in self)
+
+    def __repr__(self) -> str:
+        return repr(self.to_dict())
+
+    def to_dict(self) -> dict:
+        """Copies the row to a dict, in one pass over the columns"""
+        position = self._position
+        return {
+            key: column[position]
+            for key, column in self._store.columns.items()
+            if column[position] is not _MISSING
+        }
+
+
+class ColumnarRows(Mapping):
+    """
+    Column-oriented storage of the rows of a table, mapping the row ids to read-only
+    row views. All rows share one schema of columns with a list of values each, so a
+    row takes one slot per column instead of a dict of its own. Like an OrderedDict
+    of ids/rows, a row with an existing id replaces that row in its position.
+    """
+
+    __slots__ = ("columns", "_index", "_views", "_rows")
+
+    def __init__(self, rows: Iterable[Mapping] = ()):
+        self.columns: Dict[str, list] = {}
+        self._index: Dict[str, int] = {}
+        self._views: List[RowView] = []
+        self._rows = None
+        for row in rows:
+            self.append(row)
+
+    def append(self, row: Mapping):
+        """Adds a row (or replaces the row with the same id)"""
+        position = self._index.setdefault(row["id"], len(self._index))
+        if position == len(self._views):
+            self._views.append(RowView(self, position))
+            self._rows = None
+        for column in self.columns.values():
+            if position == len(column):
+                column.append(_MISSING)
+            else:
+                column[position] = _MISSING
+        for key, value in row.items():
+            column = self.columns.get(key)
+            if column is None:
+                column = self.columns[key] = [_MISSING] * len(self._index)
+            column[position] = value
+
+    def column(self, key: str) -> list:
+        """Returns a copy of the values of a column, with None for missing values"""
+        column = self.columns.get(key)
+        if column is None:
+            return [None] * len(self._index)
+        return [None if value is _MISSING else value for value in column]
+
+    @property
+    def rows(self) -> Sequence[RowView]:
+        if self._rows is None:
+            self._rows = tuple(self._views)
+        return self._rows
+
+    def __getitem__(self, id_: str) -> RowView:
+        return self._views[self._index[id_]]
+
+    def __iter__(self) -> Iterator[str]:
+        return iter(self._index)
+
+    def __len__(self) -> int:
+        return len(self._index)
 
 
 @dataclass(frozen=True)
@@ -47,24 +261,38 @@ class Table:
     """
 
     type: TableType
-    rows_by_id: "typing.OrderedDict[str, dict]"
+    rows_by_id: ColumnarRows
     meta: TableMeta
+    skipped_ids: FrozenSet[str] = frozenset()
+    """The ids of the rows that are left out of the import (see without), their
+    existing rows in the EUCAN-Connect Catalogue are kept"""
 
     @property
-    def rows(self) -> List[dict]:
-        return list(self.rows_by_id.values())
+    def rows(self) -> Sequence[RowView]:
+        return self.rows_by_id.rows
 
     @staticmethod
-    def of(table_type: TableType, meta: TableMeta, rows: List[dict]) -> "Table":
-        """Factory method that takes a list of rows instead of an OrderedDict of
+    def of(table_type: TableType, meta: TableMeta, rows: Iterable[Mapping]) -> "Table":
+        """Factory method that takes a list of rows instead of a ColumnarRows of
         ids/rows."""
-        rows_by_id = OrderedDict()
-        for row in rows:
-            rows_by_id[row["id"]] = row
         return Table(
             type=table_type,
             meta=meta,
-            rows_by_id=rows_by_id,
+            rows_by_id=ColumnarRows(rows),
+        )
+
+    def without(self, ids: Set[str]) -> "Table":
+        """
+        Returns a copy of the table without the rows with the given ids. The ids
+        are kept as skipped_ids, so the existing rows with these ids are not deleted.
+        """
+        if not ids:
+            return self
+        return Table(
+            type=self.type,
+            meta=self.meta,
+            rows_by_id=ColumnarRows(row for row in self.rows if row["id"] not in ids),
+            skipped_ids=self.skipped_ids | frozenset(ids),
         )
 
 
@@ -92,9 +320,14 @@ class Catalogue:
         :param TableType table_type: the table to get the id prefix for
         :return: the id prefix
         """
-        classifier = self._classifiers[table_type]
-        source = self.description.lower().replace(" ", "")
-        return f"{source}:{classifier}:"
+        return _id_prefix(self.description, self._classifiers[table_type])
+
+
+@lru_cache(maxsize=None)
+def _id_prefix(description: str, classifier: str) -> str:
+    """The id prefix of a table, built once per catalogue and table"""
+    source = description.lower().replace(" ", "")
+    return f"{source}:{classifier}:"
 
 
 @dataclass()
@@ -128,6 +361,30 @@ class CatalogueData:
         )
 
 
+@dataclass(frozen=True)
+class TableStream:
+    """
+    A EUCAN-Connect table of which the rows are produced in batches while they are
+    imported. The batches can only be consumed once.
+    """
+
+    type: TableType
+    meta: TableMeta
+    batches: Iterator[List[dict]]
+
+
+@dataclass()
+class StreamingCatalogueData:
+    """
+    Streaming variant of CatalogueData. The tables are in the order of
+    TableType.get_import_order().
+    """
+
+    catalogue: Catalogue
+    source: str
+    tables: List[TableStream]
+
+
 @dataclass(frozen=True)
 class IsoCountryData:
     """
@@ -138,23 +395,76 @@ class IsoCountryData:
     iso_country_data: List[dict]
     """List with a dictionary per country"""
 
-    def get_country_id(self, country_description: str) -> str:
-        iso_country = None
-        for iso_type in self.iso_country_data[0].keys():
-            iso_country = next(
-                (
-                    country
-                    for country in self.iso_country_data
-                    if country[iso_type] == country_description
-                ),
-                False,
+    _key_types = ["iso2_code", "iso3_code", "country_name", "country_code"]
+    """The keys a country can be found by, in order of precedence"""
+
+    _index: Dict[str, str] = field(init=False, repr=False, compare=False)
+    _names: Dict[str, str] = field(init=False, repr=False, compare=False)
+    _matcher: Optional[Pattern] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        # Index the normalised keys once. A key that is already in the index
+        # belongs to a key type with a higher precedence.
+        index = dict()
+        for key_type in self._key_types:
+            for country in self.iso_country_data:
+                if country.get(key_type) is not None:
+                    index.setdefault(utils.normalise(country[key_type]), country)
+        object.__setattr__(
+            self, "_index", {key: c["iso2_code"] for key, c in index.items()}
+        )
+
+        # One pattern that matches any of the country names in free text, longest
+        # names first, so "Guinea-Bissau" wins from "Guinea"
+        names = {
+            utils.normalise(country["country_name"]): country["iso2_code"]
+            for country in self.iso_country_data
+            if country.get("country_name")
+        }
+        object.__setattr__(self, "_names", names)
+        matcher = None
+        if names:
+            alternatives = "|".join(
+                re.escape(name) for name in sorted(names, key=len, reverse=True)
             )
-            if iso_country:
-                break
-        if iso_country:
-            return iso_country["iso2_code"]
-        else:
+            matcher = re.compile(rf"(?<!\w)(?:{alternatives})(?!\w)")
+        object.__setattr__(self, "_matcher", matcher)
+
+    def get_country_id(self, country_description: str) -> str:
+        """
+        Returns the ISO two letter code of a country, found by its ISO two or three
+        letter code, name or numeric code. Case and accents are ignored.
+
+        :param country_description: the code or name of the country
+        :return: the ISO two letter code or an empty string if the country is unknown
+        """
+        return self._index.get(utils.normalise(country_description), "")
+
+    def get_country_ids(self, country_descriptions: Iterable[str]) -> List[str]:
+        """
+        Batch variant of get_country_id for a whole column of values. Every distinct
+        value is resolved once.
+        """
+        resolved = dict()
+        ids = []
+        for description in country_descriptions:
+            if description not in resolved:
+                resolved[description] = self.get_country_id(description)
+            ids.append(resolved[description])
+        return ids
+
+    def find_country_id(self, text: str) -> str:
+        """
+        Returns the ISO two letter code of the first country name that occurs in a
+        free-text field, for example "Helsinki, Finland".
+
+        :param text: the free text
+        :return: the ISO two letter code or an empty string if no country is found
+        """
+        if self._matcher is None:
             return ""
+        match = self._matcher.search(utils.normalise(text))
+        return self._names[match.group()] if match else ""
 
 
 class RefEntity(Enum):
@@ -181,30 +491,32 @@ class RefTable:
     """
 
     type: RefEntity
-    rows_by_id: "typing.OrderedDict[str, dict]"
+    rows_by_id: ColumnarRows
 
     @property
-    def rows(self) -> List[dict]:
-        return list(self.rows_by_id.values())
+    def rows(self) -> Sequence[RowView]:
+        return self.rows_by_id.rows
 
     @staticmethod
-    def of(table_type: RefEntity, rows: List[dict]) -> "RefTable":
-        """Factory method that takes a list of rows instead of an OrderedDict of
+    def of(table_type: RefEntity, rows: Iterable[Mapping]) -> "RefTable":
+        """Factory method that takes a list of rows instead of a ColumnarRows of
         ids/rows."""
-        rows_by_id = OrderedDict()
-        for row in rows:
-            rows_by_id[row["id"]] = row
         return RefTable(
             type=table_type,
-            rows_by_id=rows_by_id,
+            rows_by_id=ColumnarRows(rows),
         )
 
 
 @dataclass()
 class RefData:
-    """Container object storing the reference entity data."""
+    """
+    Container object storing the reference entity data. New references are appended
+    to the tables and tracked as pending until they are imported.
+    """
 
     table_by_type: Dict[RefEntity, RefTable]
+    pending: Dict[RefEntity, List[str]] = field(default_factory=dict)
+    """The ids of the new references per entity, in order of addition"""
 
     @staticmethod
     def invalid_id_characters():
@@ -218,12 +530,35 @@ class RefData:
 
         return replacements
 
+    def has_ref(self, ref_entity, ref_id: str) -> bool:
+        return ref_id in self.table_by_type[RefEntity(ref_entity)].rows_by_id
+
     def add_new_ref(self, ref_entity, new_ref, ref_description):
-        refs = self.table_by_type[RefEntity(ref_entity)].rows
-        refs.append({"id": new_ref, "label": ref_description})
-        self.table_by_type[RefEntity(ref_entity)] = RefTable.of(
-            table_type=ref_entity, rows=refs
+        """Adds a new reference, unless a reference with this id already exists"""
+        ref_entity = RefEntity(ref_entity)
+        if self.has_ref(ref_entity, new_ref):
+            return
+        self.table_by_type[ref_entity].rows_by_id.append(
+            {"id": new_ref, "label": ref_description}
         )
+        self.pending.setdefault(ref_entity, []).append(new_ref)
+
+    def add_new_refs(self, ref_entity, new_refs: Iterable[Mapping]):
+        """Adds multiple new references (rows with an id and a label)"""
+        for new_ref in new_refs:
+            self.add_new_ref(ref_entity, new_ref["id"], new_ref["label"])
+
+    def pending_refs(self, ref_entity) -> List[dict]:
+        """Returns the rows of the new references that are not imported yet"""
+        rows_by_id = self.table_by_type[RefEntity(ref_entity)].rows_by_id
+        return [
+            rows_by_id[ref_id].to_dict()
+            for ref_id in self.pending.get(RefEntity(ref_entity), [])
+        ]
+
+    def clear_pending(self, ref_entity):
+        """Marks the new references of an entity as imported"""
+        self.pending.pop(RefEntity(ref_entity), None)
 
     def all_refs(self, ref_entity) -> List[str]:
         all_refs = list(self.table_by_type[RefEntity(ref_entity)].rows_by_id.keys())
@@ -0,0 +1,95 @@
+import json
+from typing import Iterator, List, Mapping, Sequence
+
+import numpy as np
+import pandas as pd
+
+from molgenis.eucan_connect import utils
+from molgenis.eucan_connect.model import RowView
+
+try:
+    import orjson
+except ImportError:  # orjson is optional, install the "fast" extra to use it
+    orjson = None
+
+
+def encode(entities: Sequence[Mapping]) -> bytes:
+    """
+    Encodes entities to the body of an add_all request ({"entities": [...]}). NumPy
+    scalars and arrays are encoded as their Python values and missing values (NaN,
+    None and pd.NA) as null. Uses orjson when it is installed.
+
+    :param entities: the rows to encode
+    :return: the UTF-8 encoded JSON body
+    """
+    entities = [_as_dict(row) for row in entities]
+    if orjson is not None:
+        return orjson.dumps(
+            {"entities": entities},
+            default=_default,
+            option=orjson.OPT_SERIALIZE_NUMPY,
+        )
+    return _encode_stdlib(entities)
+
+
+def _as_dict(row: Mapping) -> dict:
+    if type(row) is dict:
+        return row
+    if isinstance(row, RowView):
+        return row.to_dict()
+    return dict(row)
+
+
+def _default(value):
+    """Converts the values orjson can not encode natively"""
+    if isinstance(value, np.ndarray):
+        return [_to_python(x) for x in value.tolist()]
+    if isinstance(value, np.generic):
+        return _to_python(value.item())
+    if value is pd.NA:
+        return None
+    raise TypeError(f"Type is not JSON serializable: {type(value).__name__}")
+
+
+def _encode_stdlib(entities: Sequence[Mapping]) -> bytes:
+    rows = [
+        {
+            key: value if type(value) is str else _to_python(value)
+            for key, value in row.items()
+        }
+        for row in entities
+    ]
+    return json.dumps({"entities": rows}, allow_nan=False).encode("utf-8")
+
+
+def _to_python(value):
+    if isinstance(value, np.ndarray):
+        value = value.tolist()
+    if isinstance(value, list):
+        return [_to_python(x) for x in value]
+    if isinstance(value, np.generic):
+        value = value.item()
+    if value is None or utils.isnan(value):
+        return None
+    return value
+
+
+class Payload:
+    """
+    The rows of a table, encoded into the bodies of the add_all requests with one
+    body per batch. A body is encoded when it is needed and is not kept, so only the
+    body that is being sent is in memory.
+    """
+
+    def __init__(self, rows: Sequence[Mapping], batch_size: int = 1000):
+        self._batches: List[Sequence[Mapping]] = list(utils.batched(rows, batch_size))
+
+    def __len__(self) -> int:
+        return len(self._batches)
+
+    def __iter__(self) -> Iterator[bytes]:
+        for index in range(len(self._batches)):
+            yield self.body(index)
+
+    def body(self, index: int) -> bytes:
+        return encode(self._batches[index])
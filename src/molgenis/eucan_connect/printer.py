@@ -28,6 +28,11 @@ class Printer:
         else:
             print()
 
+    def print_output(self, output: str):
+        """Prints output that was captured elsewhere, for example in a worker process"""
+        for line in output.splitlines():
+            self.print(line)
+
     def print_catalogue_title(self, catalogue: Catalogue):
         title = f"🌍 Source catalogue {catalogue.description} ({catalogue.code})"
         border = "=" * (len(title) + 1)
@@ -1,12 +1,72 @@
-from typing import List
+from functools import lru_cache
+from typing import Dict, Iterable, List, Optional
 
 import numpy as np
 import pandas as pd
 
 from molgenis.eucan_connect.errors import EucanWarning
-from molgenis.eucan_connect.model import RefData
+from molgenis.eucan_connect.model import RefData, RefEntity
 from molgenis.eucan_connect.printer import Printer
 
+REF_COLUMNS = {
+    "events_biosamples_type": RefEntity.BIOSAMPLES,
+    "events_datasources_type": RefEntity.DATASOURCES,
+    "events_type_administrative_databases": RefEntity.DATABASETYPES,
+    "population_recruitment_sources": RefEntity.RECRUITMENTSOURCES,
+}
+"""The columns with reference values and the reference table they refer to"""
+
+
+class RefNormaliser:
+    """
+    Converts reference values (labels) to EUCAN-Connect Catalogue IDs: the label is
+    lower cased and the invalid id characters (see RefData.invalid_id_characters)
+    are replaced, all in a single translation pass. The IDs are kept in a bounded
+    LRU memo, so an instance can be shared by the imports of all catalogues.
+    """
+
+    def __init__(self, maxsize: Optional[int] = 10000):
+        """
+        :param int maxsize: the maximum number of labels in the memo, None for no limit
+        """
+        replacements = dict()
+        for character in RefData.invalid_id_characters():
+            replacements.update(character)
+        self._table = str.maketrans(replacements)
+        self._normalise = lru_cache(maxsize=maxsize)(self._normalise_label)
+
+    def __call__(self, label: str) -> str:
+        return self._normalise(label)
+
+    def _normalise_label(self, label: str) -> str:
+        return label.lower().translate(self._table)
+
+    def cache_info(self):
+        """The statistics of the memo (hits, misses, maxsize and currsize)"""
+        return self._normalise.cache_info()
+
+    def normalise_labels(self, labels: Iterable[str]) -> Dict[str, str]:
+        """Returns the ID of every label, each distinct label is looked up once"""
+        return {label: self(label) for label in set(labels)}
+
+    def normalise_column(self, column: pd.Series) -> pd.Series:
+        """
+        Normalises a column with lists of labels. Every distinct label is normalised
+        once and the IDs are mapped back to the lists.
+        """
+        return self.map_column(
+            column, self.normalise_labels(column.explode().dropna().unique())
+        )
+
+    @staticmethod
+    def map_column(column: pd.Series, ids: Dict[str, str]) -> pd.Series:
+        """Replaces the labels in a column with lists of labels by their IDs"""
+        return column.map(
+            lambda x: (
+                [ids[label] for label in x] if isinstance(x, (list, np.ndarray)) else x
+            )
+        )
+
 
 class RefModifier:
     """
@@ -18,11 +78,21 @@ class RefModifier:
     - population_recruitment_sources
     """
 
-    def __init__(self, printer: Printer, ref_data: RefData, source_data: pd.DataFrame):
+    def __init__(
+        self,
+        printer: Printer,
+        ref_data: RefData,
+        source_data: pd.DataFrame,
+        normaliser: RefNormaliser = None,
+    ):
         self.df = source_data
         self.ref_data = ref_data
         self.printer = printer
+        self.normaliser = normaliser or RefNormaliser()
         self.warnings: List[EucanWarning] = list()
+        self.memo_hits = 0
+        self.memo_misses = 0
+        self._ids: Optional[Dict[str, str]] = None
 
     def ref_modifier(self):
         """
@@ -33,78 +103,78 @@ class RefModifier:
         with self.printer.indentation():
             self._check_reference_data()
             self._convert_reference_data()
+            self._print_memo_statistics()
         return self.warnings
 
+    def _ref_columns(self) -> List[str]:
+        return [col for col in REF_COLUMNS if col in self.df.columns]
+
+    def _label_ids(self) -> Dict[str, str]:
+        """
+        The IDs of the distinct labels in all the reference columns. The labels are
+        normalised once per catalogue; the hits and misses of the (shared) memo during
+        that pass are the statistics of this catalogue.
+        """
+        if self._ids is None:
+            labels = set()
+            for col in self._ref_columns():
+                labels.update(self.df[col].explode().dropna().unique())
+
+            before = self.normaliser.cache_info()
+            self._ids = self.normaliser.normalise_labels(labels)
+            after = self.normaliser.cache_info()
+            self.memo_hits = after.hits - before.hits
+            self.memo_misses = after.misses - before.misses
+        return self._ids
+
+    def _print_memo_statistics(self):
+        lookups = self.memo_hits + self.memo_misses
+        if lookups:
+            self.printer.print(
+                f"{self.memo_hits} of {lookups} reference label(s) found in the memo "
+                f"({self.memo_hits / lookups:.0%})"
+            )
+
     def _check_reference_data(self):
         """
-        Checks for the "reference" columns:
-        - events_biosamples_type
-        - events_datasources_type
-        - events_type_administrative_databases
-        - population_recruitment_sources
-        if values are already in the EUCAN-Connect Catalogue, if not these will be added
+        Checks for the "reference" columns (see REF_COLUMNS) if values are already in
+        the EUCAN-Connect Catalogue, if not these will be added
         """
 
         self.printer.print("Check for new reference values")
 
-        eucan_ref_columns = [
-            {"events_biosamples_type": "biosamples"},
-            {"events_datasources_type": "data_sources"},
-            {"events_type_administrative_databases": "database_types"},
-            {"population_recruitment_sources": "recruitment_sources"},
-        ]
-
-        for ref_column in eucan_ref_columns:
-            col = list(ref_column.keys())[0]
-            if col in self.df.columns:
-                unique_refs = list(self.df[col].explode().unique())
-                if np.nan in unique_refs:
-                    unique_refs.remove(np.nan)
-                for ref_description in unique_refs:
-                    ref_id = ref_description.lower()
-                    for character in self.ref_data.invalid_id_characters():
-                        invalid_character = list(character.keys())[0]
-                        replacement = character[invalid_character]
-                        ref_id = ref_id.replace(invalid_character, replacement)
-                    if ref_id not in self.ref_data.all_refs(ref_column[col]):
-                        self.ref_data.add_new_ref(
-                            ref_column[col], ref_id, ref_description
-                        )
-                        self.printer.print(
-                            f"A new reference value ({ref_description}) will be added "
-                            f"for {col} in the EUCAN-Connect Catalogue"
-                        )
+        ids = self._label_ids()
+        for col in self._ref_columns():
+            ref_entity = REF_COLUMNS[col]
+
+            # The distinct IDs, with the first label that was found for each of them
+            labels = dict()
+            for label in self.df[col].explode().dropna().unique():
+                labels.setdefault(ids[label], label)
+
+            known_ids = self.ref_data.table_by_type[ref_entity].rows_by_id.keys()
+            new_ids = labels.keys() - known_ids
+            new_refs = [
+                {"id": id_, "label": label}
+                for id_, label in labels.items()
+                if id_ in new_ids
+            ]
+            if new_refs:
+                self.ref_data.add_new_refs(ref_entity, new_refs)
+                self.printer.print(
+                    f"{len(new_refs)} new reference value(s) will be added for {col} "
+                    f"in the EUCAN-Connect Catalogue: "
+                    f"{', '.join(ref['label'] for ref in new_refs)}"
+                )
 
     def _convert_reference_data(self):
         """
-        Replaces the values in the "reference" columns:
-        - events_biosamples_type
-        - events_datasources_type
-        - events_type_administrative_databases
-        - population_recruitment_sources
-        by the right IDs
+        Replaces the values in the "reference" columns (see REF_COLUMNS) by the right
+        IDs
         """
 
         self.printer.print("Replace reference values by ID")
-        eucan_ref_columns = [
-            "events_biosamples_type",
-            "events_datasources_type",
-            "events_type_administrative_databases",
-            "population_recruitment_sources",
-        ]
-
-        ref_columns = set(eucan_ref_columns).intersection(self.df.columns)
-
-        for col in ref_columns:
-            self.df[col] = self.df[col].apply(
-                lambda x: list(map(str.lower, x)) if x is not np.nan else x
-            )
-            for character in self.ref_data.invalid_id_characters():
-                invalid_character = list(character.keys())[0]
-                replacement = character[invalid_character]
-                # list(map etc) does not work with replace
-                self.df[col] = self.df[col].apply(
-                    lambda x: [i.replace(invalid_character, replacement) for i in x]
-                    if x is not np.nan
-                    else x
-                )
+
+        ids = self._label_ids()
+        for col in self._ref_columns():
+            self.df[col] = RefNormaliser.map_column(self.df[col], ids)
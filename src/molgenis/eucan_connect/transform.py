@@ -0,0 +1,91 @@
+import io
+import pickle
+import zlib
+from contextlib import redirect_stdout
+from dataclasses import dataclass
+from typing import Dict, List
+
+from molgenis.eucan_connect.birthcohorts import BirthCohorts
+from molgenis.eucan_connect.errors import EucanError, EucanWarning
+from molgenis.eucan_connect.eucan_client import EucanSession
+from molgenis.eucan_connect.lifecycle import LifeCycle
+from molgenis.eucan_connect.model import Catalogue, RefData, RefEntity, TableType
+from molgenis.eucan_connect.printer import Printer
+from molgenis.eucan_connect.ref_modifier import RefModifier
+
+CONNECTORS = {"LifeCycle": LifeCycle, "BirthCohorts": BirthCohorts}
+"""The connector class per catalogue type that converts a fetched payload"""
+
+
+@dataclass
+class TransformResult:
+    """
+    The outcome of transforming a source catalogue in a worker process: the
+    uploadable rows per table, the new reference values, the warnings and the
+    printed output. Travels back to the main process in a compressed pickle.
+    """
+
+    catalogue: Catalogue
+    rows: Dict[TableType, List[dict]]
+    new_refs: Dict[RefEntity, List[dict]]
+    warnings: List[EucanWarning]
+    output: str
+
+    def serialise(self) -> bytes:
+        return zlib.compress(pickle.dumps(self, protocol=pickle.HIGHEST_PROTOCOL))
+
+    @staticmethod
+    def deserialise(data: bytes) -> "TransformResult":
+        return pickle.loads(zlib.decompress(data))
+
+
+def transform_catalogue(
+    catalogue: Catalogue, payload: List[dict], ref_data: RefData
+) -> bytes:
+    """
+    Converts the fetched payload of a source catalogue to uploadable rows. This is
+    pure CPU work, so it runs in a worker process of a process pool. The reference
+    values are checked against (a copy of) the reference data of the main process.
+
+    :param catalogue: the source catalogue
+    :param payload: the data as retrieved from the source catalogue
+    :param ref_data: the reference data of the EUCAN-Connect Catalogue
+    :return: the serialised TransformResult
+    """
+    if catalogue.catalogue_type not in CONNECTORS:
+        raise EucanError(f"Unknown catalogue type {catalogue.catalogue_type}")
+
+    ref_counts = {
+        ref_entity: len(ref_data.table_by_type[ref_entity].rows)
+        for ref_entity in ref_data.table_by_type
+    }
+    printer = Printer()
+    output = io.StringIO()
+    with redirect_stdout(output):
+        connector = CONNECTORS[catalogue.catalogue_type](None, printer, catalogue)
+        source_data = connector.transform(payload)
+
+        printer.print("✏️ Verify reference data")
+        with printer.indentation():
+            warnings = RefModifier(
+                printer=printer, ref_data=ref_data, source_data=source_data
+            ).ref_modifier()
+
+        rows = EucanSession.get_uploadable_rows(catalogue, source_data)
+
+    # The reference tables are append-only, so the new references are at the end
+    new_refs = {
+        ref_entity: [
+            row.to_dict()
+            for row in ref_data.table_by_type[ref_entity].rows[ref_counts[ref_entity] :]
+        ]
+        for ref_entity in ref_data.table_by_type
+    }
+
+    return TransformResult(
+        catalogue=catalogue,
+        rows=rows,
+        new_refs=new_refs,
+        warnings=warnings,
+        output=output.getvalue(),
+    ).serialise()
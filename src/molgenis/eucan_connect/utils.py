@@ -1,4 +1,8 @@
-from typing import List
+import unicodedata
+from typing import Hashable, List
+
+import numpy as np
+import pandas as pd
 
 
 def batched(list_: List, batch_size: int):
@@ -12,6 +16,7 @@ def to_upload_format(rows: List[dict]) -> List[dict]:
     Changes the output of the REST Client such that it can be uploaded again:
     1. Non-data fields are removed (_href and _meta).
     2. Reference objects are removed and replaced with their identifiers.
+    The rows are changed in place, the returned list holds the same dicts.
     """
     upload_format = []
     for row in rows:
@@ -33,7 +38,86 @@ def to_upload_format(rows: List[dict]) -> List[dict]:
     return upload_format
 
 
+def to_hashable(value) -> Hashable:
+    """Converts lists and arrays to tuples, so they can be hashed and compared."""
+    if isinstance(value, (list, np.ndarray)):
+        return tuple(value)
+    return value
+
+
 def isnan(value):
     # A NaN implemented following the standard, is the only value for which
-    # the inequality comparison with itself should return True:
-    return value != value
+    # the inequality comparison with itself should return True. The missing value
+    # of the nullable pandas dtypes (pd.NA) does not compare, so check it first:
+    return value is pd.NA or value != value
+
+
+def isnan_array(values) -> np.ndarray:
+    """
+    Array-aware variant of isnan. Returns a boolean mask with the missing values
+    (NaN, None and pd.NA) of a sequence of values. Lists and arrays in the sequence
+    are values, not missing.
+    """
+    return pd.isna(pd.Series(values, dtype=object)).to_numpy()
+
+
+def format_size(num_bytes: float) -> str:
+    """Formats a number of bytes to a human readable size (for example 1.5 MiB)."""
+    for unit in ["B", "KiB", "MiB"]:
+        if abs(num_bytes) < 1024:
+            return f"{num_bytes:.1f} {unit}"
+        num_bytes /= 1024
+    return f"{num_bytes:.1f} GiB"
+
+
+def normalise(text: str) -> str:
+    """
+    Normalises text for case- and accent-insensitive comparison: accents are
+    removed, the text is case folded and whitespace is collapsed.
+    """
+    decomposed = unicodedata.normalize("NFKD", str(text))
+    stripped = "".join(c for c in decomposed if not unicodedata.combining(c))
+    return " ".join(stripped.casefold().split())
+
+
+_COMBINING_MARKS = [
+    (0x0300, 0x0370),
+    (0x1AB0, 0x1B00),
+    (0x1DC0, 0x1E00),
+    (0x20D0, 0x2100),
+    (0xFE20, 0xFE30),
+]
+"""The Unicode blocks with the combining diacritical marks (accents)"""
+
+_SLUG_TABLE = str.maketrans(
+    {
+        **{
+            chr(code_point): None
+            for start, end in _COMBINING_MARKS
+            for code_point in range(start, end)
+        },
+        **dict.fromkeys(" -.()\t\n", None),
+        "ø": "o",
+        "Ø": "O",
+        "æ": "ae",
+        "Æ": "AE",
+        "œ": "oe",
+        "Œ": "OE",
+        "ß": "ss",
+        "đ": "d",
+        "Đ": "D",
+        "ł": "l",
+        "Ł": "L",
+        "ı": "i",
+    }
+)
+
+
+def slugify(text: str) -> str:
+    """
+    Converts text to the part of an identifier, for example "Müller-Lüdenscheidt"
+    to "MullerLudenscheidt": the text is decomposed (NFKD) and one translation
+    removes the accents, spaces, dashes, dots and parentheses and replaces the
+    letters that do not decompose (like "ø").
+    """
+    return unicodedata.normalize("NFKD", text).translate(_SLUG_TABLE)
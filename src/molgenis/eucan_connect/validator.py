@@ -0,0 +1,139 @@
+from typing import Collection, Dict, List, Optional, Set
+
+import numpy as np
+import pandas as pd
+
+from molgenis.eucan_connect import utils
+from molgenis.eucan_connect.errors import EucanWarning
+from molgenis.eucan_connect.model import (
+    AttributeMeta,
+    CatalogueData,
+    RefData,
+    Table,
+    TableType,
+)
+from molgenis.eucan_connect.printer import Printer
+
+
+class Validator:
+    """
+    Checks the tables of a source catalogue against their metadata before anything
+    is deleted or imported. MOLGENIS rejects a whole batch for a single invalid
+    value, so all violations are collected up front:
+    - required attributes without a value (that the server does not fill in)
+    - values that do not have the type of their attribute
+    - values that are not one of the enum options
+    - strings that are longer than the maximum length
+    - references to ids that are neither in the catalogue nor in the reference data
+
+    The ids of the rows with a violation are kept in invalid_ids. A reference to an
+    invalid row of a table earlier in the import order is a violation as well, so
+    the rows can be left out of the import without breaking references.
+    """
+
+    STRING_TYPES = {"string", "text", "email", "hyperlink", "enum"}
+
+    def __init__(self, printer: Printer, ref_data: RefData):
+        self.printer = printer
+        self.ref_data = ref_data
+        self.warnings: List[EucanWarning] = list()
+        self.invalid_ids: Dict[TableType, Set[str]] = dict()
+
+    def validate(self, catalogue_data: CatalogueData) -> List[EucanWarning]:
+        """
+        Validates all tables of a source catalogue.
+
+        :param catalogue_data: CatalogueData object
+        :return: a warning for every violation
+        """
+        self.warnings = list()
+        self.invalid_ids = {table.type: set() for table in catalogue_data.import_order}
+        known_ids: Dict[str, Collection[str]] = {
+            table.type.base_id: table.rows_by_id
+            for table in catalogue_data.import_order
+        }
+        for ref_entity, ref_table in self.ref_data.table_by_type.items():
+            known_ids[ref_entity.base_id] = ref_table.rows_by_id
+
+        with self.printer.indentation():
+            for table in catalogue_data.import_order:
+                self._validate_table(table, known_ids)
+                # The tables later in the import order may not refer to invalid rows
+                if self.invalid_ids[table.type]:
+                    known_ids[table.type.base_id] = (
+                        table.rows_by_id.keys() - self.invalid_ids[table.type]
+                    )
+        return self.warnings
+
+    def _validate_table(self, table: Table, known_ids: Dict[str, Collection[str]]):
+        """
+        Validates a table column by column. The distinct values of a column are
+        checked once and the result is mapped back to the rows with their codes, so
+        only the rows with a violation are visited.
+        """
+        row_ids = np.array(list(table.rows_by_id), dtype=object)
+        for attribute in table.meta.attributes.values():
+            # A Series keeps the lists (of mrefs) as values of a one-dimensional array
+            values = pd.Series(
+                table.rows_by_id.column(attribute.name), dtype=object
+            ).to_numpy()
+            missing = utils.isnan_array(values)
+
+            # The server fills in the auto, expression and default values
+            if not attribute.nillable and not attribute.is_filled_by_server:
+                for row_id in row_ids[missing]:
+                    self._warn(table, row_id, attribute, "is required")
+
+            present = values[~missing]
+            if len(present) == 0:
+                continue
+            codes, _ = pd.factorize(
+                pd.Series([utils.to_hashable(value) for value in present], dtype=object)
+            )
+            _, first = np.unique(codes, return_index=True)
+            problems = np.array(
+                [self._check_value(attribute, present[i], known_ids) for i in first],
+                dtype=object,
+            )
+            invalid = np.not_equal(problems, None)[codes]
+            for row_id, problem in zip(
+                row_ids[~missing][invalid], problems[codes[invalid]]
+            ):
+                self._warn(table, row_id, attribute, problem)
+
+    def _check_value(
+        self, attribute: AttributeMeta, value, known_ids: Dict[str, Collection[str]]
+    ) -> Optional[str]:
+        """Returns the problem with a value, or None if the value is valid"""
+        try:
+            coerced = attribute.coerce(value)
+        except (TypeError, ValueError):
+            return f"value {value} is not of type {attribute.type}"
+
+        if attribute.enum_options and coerced not in attribute.enum_options:
+            return f"value {value} is not one of {', '.join(attribute.enum_options)}"
+
+        if (
+            attribute.type in self.STRING_TYPES
+            and attribute.max_length is not None
+            and len(coerced) > attribute.max_length
+        ):
+            return f"value is longer than {attribute.max_length} characters"
+
+        if attribute.is_reference and attribute.ref_entity in known_ids:
+            ids = coerced if isinstance(coerced, list) else [coerced]
+            unknown = [id_ for id_ in ids if id_ not in known_ids[attribute.ref_entity]]
+            if unknown:
+                return (
+                    f"refers to unknown {attribute.ref_entity} ID(s) "
+                    f"{', '.join(unknown)}"
+                )
+        return None
+
+    def _warn(self, table: Table, row_id: str, attribute: AttributeMeta, problem: str):
+        warning = EucanWarning(
+            f"{table.type.base_id} ID {row_id}: {attribute.name} {problem}"
+        )
+        self.printer.print_warning(warning)
+        self.warnings.append(warning)
+        self.invalid_ids[table.type].add(row_id)
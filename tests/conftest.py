@@ -36,7 +36,10 @@ def session() -> MagicMock:
     session.url = "url"
 
     def entity_type(table_name):
-        return f"{table_name}"
+        id_ = {"name": "id", "type": "string", "idAttribute": True, "nullable": False}
+        return TableMeta(
+            meta={"data": {"id": table_name, "attributes": {"items": [{"data": id_}]}}}
+        )
 
     session.get_meta = MagicMock(side_effect=entity_type)
 
@@ -0,0 +1,205 @@
+from unittest import mock
+from unittest.mock import MagicMock
+
+import pytest
+
+from molgenis.client import MolgenisRequestError
+from molgenis.eucan_connect.birthcohorts import BirthCohorts
+from molgenis.eucan_connect.errors import EucanError
+from molgenis.eucan_connect.model import Catalogue, IsoCountryData
+
+
+@pytest.fixture
+def catalogue():
+    return Catalogue("BC", "BirthCohorts", "https://bc/cohorts", "BirthCohorts")
+
+
+@pytest.fixture
+def cohort():
+    return {
+        "identification": {
+            "id": "12",
+            "name": "Generation Test Study",
+            "abbreviation": {},
+            "country": "Rotterdam, Netherlands",
+            "date": "1999-01-01",
+            "website": "https://gts.nl https://gts.org",
+            "contact": {
+                "name": "Prof. Jan Jansen; Dr. Piet de Vries",
+                "email": "j.jansen at gts.nl; p.devries@gts.nl",
+            },
+            "investigator": {"name": "PI: Prof. Jan Jansen", "email": {}},
+        },
+        "description": {
+            "aim": "Growth",
+            "enrollment": {
+                "followup": "Until 18 years",
+                "period": {"start": "1999-04-01", "end": "2017-12-31"},
+                "criteria_exclusion": "None\n",
+            },
+            "recruited": {"children": "100", "mothers": "0", "fathers": {}},
+        },
+    }
+
+
+def _response(data):
+    response = MagicMock()
+    response.json.return_value = data
+    return response
+
+
+def test_birthcohorts_data_empty(catalogue, printer):
+    birthcohorts = BirthCohorts(None, printer, catalogue)
+    birthcohorts.get_cohorts = MagicMock(return_value=[])
+
+    with pytest.raises(EucanError) as e:
+        birthcohorts.birthcohorts_data()
+
+    assert str(e.value) == "Number of records for BirthCohorts is 0"
+
+
+def test_get_cohorts(catalogue, printer, cohort):
+    iso_country_data = IsoCountryData(
+        iso_country_data=[
+            {
+                "iso2_code": "NL",
+                "iso3_code": "NLD",
+                "country_name": "Netherlands",
+                "country_code": 528,
+            }
+        ]
+    )
+    birthcohorts = BirthCohorts(
+        None,
+        printer,
+        catalogue,
+        iso_country_data,
+        page_size=1,
+        max_workers=1,
+        calls_per_second=None,
+    )
+    second = {"identification": {"id": "13", "country": {}}}
+    birthcohorts._bc_session.get = MagicMock(
+        side_effect=[
+            _response({"@attributes": {"count": "2"}}),
+            _response({"@attributes": {}, "cohort": cohort}),
+            _response({"@attributes": {}, "cohort": [second]}),
+        ]
+    )
+
+    cohorts = birthcohorts.get_cohorts()
+
+    assert birthcohorts._bc_session.get.mock_calls == [
+        mock.call("https://bc/cohorts?limit=0&json"),
+        mock.call("https://bc/cohorts?limit=1&page=1&json"),
+        mock.call("https://bc/cohorts?limit=1&page=2&json"),
+    ]
+    assert [c["identification"]["id"] for c in cohorts] == ["12", "13"]
+    assert [c["country_id"] for c in cohorts] == ["NL", None]
+
+
+def test_transform(catalogue, printer, cohort):
+    cohort["country_id"] = "NL"
+    df = BirthCohorts(None, printer, catalogue).transform([cohort])
+
+    studies = df.filter(like="study_").dropna(how="all")
+    assert studies.to_dict("records") == [
+        {
+            "study_id": "birthcohorts:studyID:12",
+            "study_study_name": "Generation Test Study",
+            "study_acronym": "GTS",
+            "study_start_year": 1999,
+            "study_website": "https://gts.nl",
+            "study_principle_investigators": ["birthcohorts:contactID:12:JansenJan"],
+            "study_contacts": [
+                "birthcohorts:contactID:12:JansenJan",
+                "birthcohorts:contactID:12:deVriesPiet",
+            ],
+            "study_populations": ["birthcohorts:populationID:12:children"],
+            "study_data_collection_events": ["birthcohorts:eventID:12:Until18years"],
+            "study_objectives": "Growth",
+        }
+    ]
+
+    persons = df.filter(like="persons_").dropna(how="all")
+    assert persons.to_dict("records") == [
+        {
+            "persons_id": "birthcohorts:contactID:12:JansenJan",
+            "persons_title": "Prof.",
+            "persons_country": "NL",
+            "persons_first_name": "Jan",
+            "persons_last_name": "Jansen",
+            "persons_email": "j.jansen@gts.nl",
+        },
+        {
+            "persons_id": "birthcohorts:contactID:12:deVriesPiet",
+            "persons_title": "Dr.",
+            "persons_country": "NL",
+            "persons_first_name": "Piet",
+            "persons_last_name": "de Vries",
+            "persons_email": "p.devries@gts.nl",
+        },
+    ]
+
+    events = df.filter(like="events_").dropna(how="all")
+    assert events.to_dict("records")[0]["events_start_end_year"] == "1999-2017"
+    assert events.to_dict("records")[0]["events_start_end_month"] == "04-12"
+
+    populations = df.filter(like="population_").dropna(how="all")
+    assert populations.to_dict("records") == [
+        {
+            "population_id": "birthcohorts:populationID:12:children",
+            "population_name": "GTS - Children",
+            "population_number_of_participants": 100,
+            "population_selection_criteria_supplement": "None",
+        }
+    ]
+
+
+def test_delete_legacy_rows(catalogue, printer):
+    session = MagicMock()
+    session.get.side_effect = lambda entity_type_id, **kwargs: {
+        "eucan_study": [
+            {"id": "birthcohorts:12"},
+            {"id": "birthcohorts:studyID:12"},
+            {"id": "lifecycle:studyID:abc"},
+        ],
+        "eucan_persons": [
+            {"id": "birthcohorts:12:contactID:JansenJan"},
+            {"id": "birthcohorts:contactID:12:JansenJan"},
+        ],
+    }.get(entity_type_id, [])
+    birthcohorts = BirthCohorts(session, printer, catalogue)
+
+    birthcohorts.delete_legacy_rows()
+
+    assert session.delete_list.mock_calls == [
+        mock.call("eucan_study", ["birthcohorts:12"]),
+        mock.call("eucan_persons", ["birthcohorts:12:contactID:JansenJan"]),
+    ]
+
+
+def test_delete_legacy_rows_without_imported_studies(catalogue, printer):
+    session = MagicMock()
+    session.get.return_value = [{"id": "birthcohorts:12"}]
+    birthcohorts = BirthCohorts(session, printer, catalogue)
+
+    with pytest.raises(EucanError) as e:
+        birthcohorts.delete_legacy_rows()
+
+    assert (
+        str(e.value)
+        == "No studies of BirthCohorts are imported yet, the legacy rows are kept"
+    )
+    session.delete_list.assert_not_called()
+
+
+def test_delete_legacy_rows_fails(catalogue, printer):
+    session = MagicMock()
+    session.get.side_effect = MolgenisRequestError("")
+    birthcohorts = BirthCohorts(session, printer, catalogue)
+
+    with pytest.raises(EucanError) as e:
+        birthcohorts.delete_legacy_rows()
+
+    assert str(e.value) == "Error deleting legacy rows from eucan_study"
@@ -0,0 +1,8 @@
+from molgenis.eucan_connect.changes import ChangeSet
+
+
+def test_change_set_from_ids():
+    changes = ChangeSet.from_ids(["a", "b"], ["b", "c"])
+
+    assert changes == ChangeSet(added={"c"}, removed={"a"}, kept={"b"})
+    assert changes.summary() == "1 added, 1 removed, 1 kept"
@@ -0,0 +1,53 @@
+from molgenis.eucan_connect.contacts import ContactName, ContactParser
+
+
+def test_parse():
+    parser = ContactParser()
+
+    assert parser.parse("Prof. J.A. Jansen") == ContactName(
+        ("Prof.",), "J.A.", "Jansen"
+    )
+    assert parser.parse("Jan Jansen") == ContactName((), "Jan", "Jansen")
+    assert parser.parse("Anne Marie Jansen (Anne)") == ContactName(
+        (), "Anne Marie (Anne)", "Jansen"
+    )
+    assert parser.parse("Dr. Prof. P. de Vries, PhD") == ContactName(
+        ("Prof.", "Dr.", "PhD"), "P.", "de Vries"
+    )
+    assert parser.parse("Jansen") == ContactName((), "Unknown", "Jansen")
+    assert parser.parse("Dr.").is_unknown
+    assert parser.parse("") == ContactName((), "", "")
+
+
+def test_parse_memo():
+    parser = ContactParser(maxsize=2)
+
+    parser.parse("Jan Jansen")
+    parser.parse("Jan Jansen")
+
+    info = parser.cache_info()
+    assert (info.hits, info.misses, info.maxsize) == (1, 1, 2)
+
+
+def test_split_names():
+    parser = ContactParser()
+
+    assert parser.split_names("Jan Jansen, Piet de Vries and Anna Bos") == (
+        "Jan Jansen",
+        "Piet de Vries",
+        "Anna Bos",
+    )
+    assert parser.split_names("Jansen, Prof. J.; De Vries, Dr. P.") == (
+        "Jansen, Prof. J.",
+        "De Vries, Dr. P.",
+    )
+
+
+def test_email_address():
+    parser = ContactParser()
+    emails = "a@test.nl; b at test.nl"
+
+    assert parser.email_address(emails, 1) == "a@test.nl"
+    assert parser.email_address(emails, 2) == "b@test.nl"
+    assert parser.email_address(emails, 3) == "b@test.nl"
+    assert parser.email_address("unknown", 1) is None
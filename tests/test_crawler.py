@@ -0,0 +1,96 @@
+import threading
+from unittest import mock
+from unittest.mock import MagicMock, patch
+
+import pytest
+
+from molgenis.eucan_connect.crawler import PagedCrawler, RateLimiter
+from molgenis.eucan_connect.errors import EucanError
+
+
+def _feed(count: int, page_size: int):
+    """A fake session that serves a feed of items 1..count"""
+    session = MagicMock()
+    parsed = []
+
+    def get(url):
+        response = MagicMock()
+        query = dict(part.split("=") for part in url.split("?")[1].split("&")[:-1])
+        if query["limit"] == "0":
+            data = {"@attributes": {"count": str(count)}}
+        else:
+            start = int(query["page"])
+            items = [{"id": i} for i in range(start, min(start + page_size, count + 1))]
+            data = {"@attributes": {}, "item": items[0] if len(items) == 1 else items}
+
+        def json():
+            parsed.append(url)
+            return data
+
+        response.json.side_effect = json
+        return response
+
+    session.get.side_effect = get
+    return session, parsed
+
+
+def test_items_in_page_order():
+    session, parsed = _feed(count=25, page_size=10)
+    crawler = PagedCrawler(session, "https://feed", "item", page_size=10)
+
+    items = list(crawler.items())
+
+    assert [item["id"] for item in items] == list(range(1, 26))
+    # Every response is parsed once: the count and three pages
+    assert sorted(parsed) == sorted(
+        [
+            "https://feed?limit=0&json",
+            "https://feed?limit=10&page=1&json",
+            "https://feed?limit=10&page=11&json",
+            "https://feed?limit=10&page=21&json",
+        ]
+    )
+
+
+def test_items_fetched_ahead():
+    session, _ = _feed(count=50, page_size=10)
+    crawler = PagedCrawler(session, "https://feed?x=1", "item", max_workers=2)
+
+    items = crawler.items()
+    next(items)
+
+    # The count, the consumed page and at most two pages ahead
+    assert session.get.call_count <= 4
+    assert session.get.mock_calls[0] == mock.call("https://feed?x=1&limit=0&json")
+    items.close()
+
+
+def test_page_unknown_key():
+    session = MagicMock()
+    session.get.return_value.json.return_value = {"item": [], "error": "?"}
+    crawler = PagedCrawler(session, "https://feed", "item")
+
+    with pytest.raises(EucanError) as e:
+        crawler.page(1)
+
+    assert str(e.value) == "Unknown key(s) error in the response of https://feed"
+
+
+def test_rate_limiter():
+    limiter = RateLimiter(calls_per_second=4)
+    with patch("molgenis.eucan_connect.crawler.time") as time_mock:
+        time_mock.monotonic.return_value = 100.0
+        threads = [threading.Thread(target=limiter.wait) for _ in range(3)]
+        for thread in threads:
+            thread.start()
+        for thread in threads:
+            thread.join()
+
+    assert sorted(call.args[0] for call in time_mock.sleep.mock_calls) == [0.25, 0.5]
+
+
+def test_rate_limiter_no_limit():
+    with patch("molgenis.eucan_connect.crawler.time") as time_mock:
+        RateLimiter(calls_per_second=None).wait()
+
+    time_mock.monotonic.assert_not_called()
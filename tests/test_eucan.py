@@ -1,10 +1,20 @@
+from concurrent.futures import ThreadPoolExecutor
 from unittest import mock
 from unittest.mock import MagicMock, patch
 
 import pytest
+import requests
 
 from molgenis.eucan_connect.errors import EucanError, EucanWarning
-from molgenis.eucan_connect.model import Catalogue
+from molgenis.eucan_connect.model import (
+    Catalogue,
+    CatalogueData,
+    RefEntity,
+    StreamingCatalogueData,
+    Table,
+    TableMeta,
+    TableType,
+)
 
 
 @pytest.fixture
@@ -19,6 +29,12 @@ def lifecycle_init():
         yield lifecycle_mock
 
 
+@pytest.fixture
+def birthcohorts_init():
+    with patch("molgenis.eucan_connect.eucan.BirthCohorts") as birthcohorts_mock:
+        yield birthcohorts_mock
+
+
 @pytest.fixture
 def ref_modifier_init():
     with patch("molgenis.eucan_connect.eucan.RefModifier") as ref_modifier_mock:
@@ -64,7 +80,10 @@ def test_import_catalogues(
 
     assert ref_modifier_init.mock_calls == [
         mock.call(
-            printer=eucan.printer, ref_data=eucan.ref_data, source_data=lc_source_data
+            printer=eucan.printer,
+            ref_data=eucan.ref_data,
+            source_data=lc_source_data,
+            normaliser=eucan.ref_normaliser,
         ),
         mock.call().ref_modifier(),
     ]
@@ -81,7 +100,7 @@ def test_import_catalogues(
     assert importer_init.mock_calls == [
         mock.call(printer=eucan.printer, session=eucan.session),
         mock.call().import_reference_data(eucan.ref_data),
-        mock.call(printer=eucan.printer, session=eucan.session),
+        mock.call(printer=eucan.printer, session=eucan.session, recover=False),
         mock.call().import_catalogue_data(lc_catalogue_data),
     ]
 
@@ -91,6 +110,29 @@ def test_import_catalogues(
     eucan.printer.print_summary.assert_called_once_with(report)
 
 
+def test_import_catalogues_streaming(
+    eucan, lifecycle_init, ref_modifier_init, importer_init, fake_source_data
+):
+    lc = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    eucan.streaming = True
+    lifecycle_init.return_value.lifecycle_data.side_effect = [fake_source_data]
+    ref_modifier_init.return_value.ref_modifier.side_effect = [[]]
+    importer_init.return_value.import_reference_data.side_effect = [[]]
+    importer_init.return_value.import_streaming_data.side_effect = [[]]
+    streaming_data = StreamingCatalogueData(lc, lc.description, tables=[])
+    eucan.session.stream_catalogue_data = MagicMock(return_value=streaming_data)
+    eucan.session.create_catalogue_data = MagicMock()
+
+    report = eucan.import_catalogues([lc])
+
+    assert lc not in report.errors
+    eucan.session.create_catalogue_data.assert_not_called()
+    eucan.session.stream_catalogue_data.assert_called_once()
+    assert importer_init.mock_calls[-1] == mock.call().import_streaming_data(
+        streaming_data
+    )
+
+
 def test_import_catalogues_fails(eucan):
     eucan.import_catalogues = MagicMock(side_effect=EucanError("Something went wrong"))
     catalogue = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
@@ -101,17 +143,222 @@ def test_import_catalogues_fails(eucan):
     assert str(e.value) == "Something went wrong"
 
 
+@pytest.fixture
+def invalid_catalogue_data(fake_catalogue_data):
+    """The fake catalogue data with a person without the required last name"""
+    persons_meta = TableMeta(
+        meta={
+            "data": {
+                "attributes": {
+                    "items": [
+                        {"data": {"name": "id", "type": "string", "nullable": False}},
+                        {
+                            "data": {
+                                "name": "last_name",
+                                "type": "string",
+                                "nullable": False,
+                            }
+                        },
+                    ]
+                }
+            }
+        }
+    )
+    persons = Table.of(
+        TableType.PERSONS,
+        persons_meta,
+        list(fake_catalogue_data.persons.rows) + [{"id": "p2", "first_name": "Jan"}],
+    )
+    tables = {**fake_catalogue_data.table_by_type, TableType.PERSONS: persons}
+    return CatalogueData.from_dict(
+        fake_catalogue_data.catalogue, fake_catalogue_data.source, tables
+    )
+
+
+def test_import_catalogues_validated(
+    eucan, lifecycle_init, ref_modifier_init, importer_init, fake_catalogue_data
+):
+    lc = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    ref_modifier_init.return_value.ref_modifier.side_effect = [[]]
+    importer_init.return_value.import_reference_data.side_effect = [[]]
+    importer_init.return_value.import_catalogue_data.side_effect = [[]]
+    eucan.session.create_catalogue_data = MagicMock(return_value=fake_catalogue_data)
+
+    report = eucan.import_catalogues([lc])
+
+    assert lc not in report.errors
+    assert lc not in report.warnings
+    importer_init.return_value.import_catalogue_data.assert_called_once_with(
+        fake_catalogue_data
+    )
+
+
+def test_import_catalogues_invalid_data(
+    eucan,
+    lifecycle_init,
+    ref_modifier_init,
+    importer_init,
+    invalid_catalogue_data,
+):
+    lc = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    ref_modifier_init.return_value.ref_modifier.side_effect = [[]]
+    importer_init.return_value.import_reference_data.side_effect = [[]]
+    importer_init.return_value.import_catalogue_data.side_effect = [[]]
+    eucan.session.create_catalogue_data = MagicMock(return_value=invalid_catalogue_data)
+
+    report = eucan.import_catalogues([lc])
+
+    assert lc not in report.errors
+    assert report.warnings[lc] == [
+        EucanWarning("eucan_persons ID p2: last_name is required")
+    ]
+    imported = importer_init.return_value.import_catalogue_data.call_args[0][0]
+    assert list(imported.persons.rows_by_id) == ["person_id"]
+    # The existing row of the invalid row is not deleted
+    assert imported.persons.skipped_ids == {"p2"}
+    assert imported.studies == invalid_catalogue_data.studies
+
+
+def test_import_catalogues_no_rows(
+    eucan, lifecycle_init, ref_modifier_init, importer_init, fake_catalogue_data
+):
+    lc = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    ref_modifier_init.return_value.ref_modifier.side_effect = [[]]
+    tables = {
+        table.type: Table.of(table.type, table.meta, [])
+        for table in fake_catalogue_data.import_order
+    }
+    eucan.session.create_catalogue_data = MagicMock(
+        return_value=CatalogueData.from_dict(
+            fake_catalogue_data.catalogue, fake_catalogue_data.source, tables
+        )
+    )
+
+    report = eucan.import_catalogues([lc])
+
+    # Nothing is imported, so the existing rows of the catalogue are not deleted
+    assert str(report.errors[lc]) == "Number of records for LifeCycle is 0"
+    importer_init.assert_not_called()
+
+
+def test_import_catalogues_invalid_data_strict(
+    eucan,
+    lifecycle_init,
+    ref_modifier_init,
+    importer_init,
+    invalid_catalogue_data,
+):
+    lc = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    eucan.strict = True
+    ref_modifier_init.return_value.ref_modifier.side_effect = [[]]
+    eucan.session.create_catalogue_data = MagicMock(return_value=invalid_catalogue_data)
+
+    report = eucan.import_catalogues([lc])
+
+    assert str(report.errors[lc]) == (
+        "1 invalid value(s) in source catalogue succeeds, nothing is imported"
+    )
+    assert report.warnings[lc] == [
+        EucanWarning("eucan_persons ID p2: last_name is required")
+    ]
+    importer_init.assert_not_called()
+
+
 def test_catalogue_no_module(eucan):
-    bc = Catalogue("Test", "Test", "test_url", "BirthCohorts")
     mica = Catalogue("Test", "Test", "test_url", "Mica")
     unk = Catalogue("Test", "Test", "test_url", "DNA_catalogue")
-    report = eucan.import_catalogues([bc, mica, unk])
-    assert str(report.errors[bc]) == str(
-        EucanError("Birth cohort data. No module available yet!")
-    )
+    report = eucan.import_catalogues([mica, unk])
     assert str(report.errors[mica]) == str(
         EucanError("Mica data. No module available yet!")
     )
     assert str(report.errors[unk]) == str(
         EucanError("Unknown catalogue type DNA_catalogue")
     )
+
+
+def test_import_catalogues_in_processes(
+    eucan, lifecycle_init, importer_init, lifecycle_data, fake_catalogue_data
+):
+    lc = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    mica = Catalogue("Mica", "Mica", "mica_url", "Mica")
+    eucan.processes = 2
+    lifecycle_init.return_value.get_lc_cohort_data.return_value = lifecycle_data
+    importer_init.return_value.import_reference_data.return_value = []
+    importer_init.return_value.import_catalogue_data.return_value = []
+    eucan.session.catalogue_data_from_rows = MagicMock(return_value=fake_catalogue_data)
+
+    with patch("molgenis.eucan_connect.eucan.ProcessPoolExecutor", ThreadPoolExecutor):
+        report = eucan.import_catalogues([lc, mica])
+
+    assert lifecycle_init.mock_calls == [
+        mock.call(eucan.session, eucan.printer, lc),
+        mock.call().get_lc_cohort_data(),
+    ]
+    rows = eucan.session.catalogue_data_from_rows.call_args[0][1]
+    assert rows[TableType.STUDIES][0]["id"] == "lifecycle:studyID:TEST1"
+    assert "dce1_aoi1" in eucan.ref_data.all_refs(RefEntity.DATABASETYPES)
+    assert "✏️ Verify reference data" in eucan.printer.print_output.call_args[0][0]
+    importer_init.return_value.import_catalogue_data.assert_called_once_with(
+        fake_catalogue_data
+    )
+    assert lc not in report.errors
+    assert str(report.errors[mica]) == "Mica data. No module available yet!"
+
+
+def test_import_catalogues_in_processes_empty(
+    eucan, lifecycle_init, birthcohorts_init, importer_init
+):
+    lc = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    bc = Catalogue("BC", "BirthCohorts", "bc_url", "BirthCohorts")
+    eucan.processes = 2
+    lifecycle_init.return_value.get_lc_cohort_data.return_value = []
+    birthcohorts_init.return_value.get_cohorts.return_value = []
+    pool = MagicMock()
+    pool.__enter__.return_value = pool
+
+    with patch("molgenis.eucan_connect.eucan.ProcessPoolExecutor", return_value=pool):
+        report = eucan.import_catalogues([lc, bc])
+
+    pool.submit.assert_not_called()
+    importer_init.assert_not_called()
+    assert str(report.errors[lc]) == "Number of records for LifeCycle is 0"
+    assert str(report.errors[bc]) == "Number of records for BirthCohorts is 0"
+
+
+def test_import_birthcohorts(
+    eucan,
+    birthcohorts_init,
+    ref_modifier_init,
+    importer_init,
+    fake_source_data,
+    fake_catalogue_data,
+):
+    bc = Catalogue("BC", "BirthCohorts", "bc_url", "BirthCohorts")
+    birthcohorts_init.return_value.birthcohorts_data.return_value = fake_source_data
+    ref_modifier_init.return_value.ref_modifier.return_value = []
+    importer_init.return_value.import_reference_data.return_value = []
+    importer_init.return_value.import_catalogue_data.return_value = []
+    eucan.session.create_catalogue_data = MagicMock(return_value=fake_catalogue_data)
+
+    report = eucan.import_catalogues([bc])
+
+    assert birthcohorts_init.mock_calls == [
+        mock.call(eucan.session, eucan.printer, bc, eucan.iso_country_data),
+        mock.call().birthcohorts_data(),
+    ]
+    eucan.session.create_catalogue_data.assert_called_once_with(bc, fake_source_data)
+    importer_init.return_value.import_catalogue_data.assert_called_once_with(
+        fake_catalogue_data
+    )
+    assert bc not in report.errors
+
+
+def test_import_birthcohorts_request_failed(eucan, birthcohorts_init):
+    bc = Catalogue("BC", "BirthCohorts", "bc_url", "BirthCohorts")
+    birthcohorts_init.return_value.birthcohorts_data.side_effect = (
+        requests.exceptions.ConnectionError()
+    )
+
+    report = eucan.import_catalogues([bc])
+
+    assert str(report.errors[bc]) == "Request failed"
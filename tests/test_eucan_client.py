@@ -1,10 +1,13 @@
-from unittest import mock
-from unittest.mock import MagicMock
+from unittest.mock import MagicMock, patch
 
+import numpy as np
+import pandas as pd
 import pytest
+import requests
+from urllib3.exceptions import MaxRetryError, NewConnectionError, ProtocolError
 
 from molgenis.eucan_connect.eucan_client import EucanSession
-from molgenis.eucan_connect.model import Catalogue
+from molgenis.eucan_connect.model import Catalogue, TableType
 
 
 def test_get_catalogue_list(session):
@@ -60,20 +63,222 @@ def test_create_catalogue_data(
     check_cat_data = fake_catalogue_data
     eucan_session = EucanSession("url")
     eucan_session.get_meta = session.get_meta
-    eucan_session._get_uploadable_data = MagicMock(
-        side_effect=eucan_session._get_uploadable_data
+
+    with patch.object(
+        EucanSession,
+        "_partition_tables",
+        side_effect=EucanSession._partition_tables,
+    ) as partition_tables, patch.object(
+        EucanSession,
+        "_get_uploadable_data",
+        side_effect=EucanSession._get_uploadable_data,
+    ) as get_uploadable_data:
+        catalogue_data = eucan_session.create_catalogue_data(
+            catalogue, converted_source_data
+        )
+    assert catalogue_data == check_cat_data
+
+    partition_tables.assert_called_once_with(converted_source_data)
+    assert get_uploadable_data.call_count == 4
+
+
+def test_partition_tables():
+    df = pd.DataFrame(
+        {
+            "study_id": ["s1", "s1", "s1", "s1"],
+            "study_contacts": [["p1", "p2"], ["p1", "p2"], ["p1", "p2"], ["p1", "p2"]],
+            "persons_id": ["p1", "p2", "p1", np.nan],
+            "persons_email": ["e1", "e2", "e1", np.nan],
+            "events_id": ["e1", "e1", "e2", "e2"],
+            "events_types": [
+                np.array(["a"], dtype=object),
+                np.array(["a"], dtype=object),
+                np.array(["b"], dtype=object),
+                np.array(["b"], dtype=object),
+            ],
+        }
     )
 
-    catalogue_data = eucan_session.create_catalogue_data(
-        catalogue, converted_source_data
+    tables = dict(EucanSession._partition_tables(df))
+
+    assert list(tables.keys()) == TableType.get_import_order()
+    assert tables[TableType.STUDIES].to_dict("list") == {
+        "id": ["s1"],
+        "contacts": [["p1", "p2"]],
+    }
+    assert tables[TableType.PERSONS].to_dict("list") == {
+        "id": ["p1", "p2"],
+        "email": ["e1", "e2"],
+    }
+    assert list(tables[TableType.EVENTS]["id"]) == ["e1", "e2"]
+    assert list(tables[TableType.EVENTS].columns) == ["id", "types"]
+    assert tables[TableType.POPULATIONS].empty
+
+
+def test_partition_table_collapses_ids():
+    df = pd.DataFrame(
+        {
+            "persons_id": ["p1", "p2", "p1", np.nan, "p2"],
+            "persons_email": ["old", "e2", "new", "e4", "e2"],
+            "persons_country": ["NL", np.nan, np.nan, np.nan, np.nan],
+        }
     )
-    assert catalogue_data == check_cat_data
+    columns = {
+        "persons_id": "id",
+        "persons_email": "email",
+        "persons_country": "country",
+    }
 
-    assert eucan_session._get_uploadable_data.call_count == 4
+    df_table = EucanSession._partition_table(df, columns)
 
-    assert eucan_session._get_uploadable_data.mock_calls == [
-        mock.call(catalogue, converted_source_data, "events"),
-        mock.call(catalogue, converted_source_data, "persons"),
-        mock.call(catalogue, converted_source_data, "population"),
-        mock.call(catalogue, converted_source_data, "study"),
+    # The last row of p1 is kept in the position of the first row of p1
+    assert df_table.to_dict("records") == [
+        {"id": "p1", "email": "new", "country": np.nan},
+        {"id": "p2", "email": "e2", "country": np.nan},
+        {"id": np.nan, "email": "e4", "country": np.nan},
     ]
+
+
+def test_stream_and_create_catalogue_data_collapse_ids(session):
+    catalogue = Catalogue("test", "Test", "url", "LifeCycle")
+    eucan_session = EucanSession("url")
+    eucan_session.get_meta = session.get_meta
+    df = pd.DataFrame({"persons_id": ["p1", "p1"], "persons_email": ["old", "new"]})
+
+    streamed = eucan_session.stream_catalogue_data(catalogue, df)
+    persons = [table for table in streamed.tables if table.type == TableType.PERSONS]
+    created = eucan_session.create_catalogue_data(catalogue, df)
+
+    expected = [{"id": "p1", "email": "new", "source_catalogue": "test"}]
+    assert list(persons[0].batches) == [expected]
+    assert [row.to_dict() for row in created.persons.rows] == expected
+
+
+def test_get_uploadable_data():
+    catalogue = Catalogue("test", "Test", "url", "LifeCycle")
+    df = pd.DataFrame(
+        {
+            "id": ["e1", "e2"],
+            "types": [np.array(["a", "b"], dtype=object), np.nan],
+            "year": pd.array([2000, pd.NA], dtype="Int64"),
+        }
+    )
+
+    rows = EucanSession._get_uploadable_data(catalogue, df)
+
+    assert rows == [
+        {"id": "e1", "types": ["a", "b"], "year": 2000, "source_catalogue": "test"},
+        {"id": "e2", "source_catalogue": "test"},
+    ]
+    assert type(rows[0]["types"]) is list
+
+
+def test_stream_catalogue_data():
+    catalogue = Catalogue("test", "Test", "url", "LifeCycle")
+    eucan_session = EucanSession("url")
+    eucan_session.get_meta = MagicMock()
+    df = pd.DataFrame(
+        {
+            "study_id": ["s1", "s1", "s1"],
+            "persons_id": ["p1", "p2", "p3"],
+        }
+    )
+
+    with patch.object(
+        EucanSession,
+        "_partition_table",
+        side_effect=EucanSession._partition_table,
+    ) as partition_table:
+        data = eucan_session.stream_catalogue_data(catalogue, df, batch_size=2)
+
+        assert [table.type for table in data.tables] == TableType.get_import_order()
+        assert eucan_session.get_meta.call_count == 4
+        # A table is only split off when its batches are consumed
+        partition_table.assert_not_called()
+        persons = data.tables[1]
+        assert persons.type == TableType.PERSONS
+        persons_batches = list(persons.batches)
+        partition_table.assert_called_once()
+
+    assert persons_batches == [
+        [
+            {"id": "p1", "source_catalogue": "test"},
+            {"id": "p2", "source_catalogue": "test"},
+        ],
+        [{"id": "p3", "source_catalogue": "test"}],
+    ]
+    assert list(data.tables[3].batches) == [[{"id": "s1", "source_catalogue": "test"}]]
+    assert list(data.tables[0].batches) == []
+
+
+def test_add_batched():
+    eucan_session = EucanSession("url")
+    eucan_session.add_encoded = MagicMock()
+    rows = [{"id": str(i)} for i in range(1500)]
+
+    eucan_session.add_batched("eucan_persons", rows)
+
+    assert eucan_session.add_encoded.call_count == 2
+    first_body = eucan_session.add_encoded.mock_calls[0].args[1]
+    assert first_body.startswith(b'{"entities":')
+
+
+def test_add_encoded_retries():
+    eucan_session = EucanSession("url")
+    eucan_session._session = MagicMock()
+    response = MagicMock()
+    response.json.return_value = {"resources": [{"href": "/api/v2/eucan_persons/p1"}]}
+    refused = requests.ConnectionError(
+        MaxRetryError(None, "url", NewConnectionError(None, "Connection refused"))
+    )
+    eucan_session._session.post.side_effect = [
+        refused,
+        requests.ConnectTimeout(),
+        response,
+    ]
+
+    ids = eucan_session.add_encoded("eucan_persons", b'{"entities": []}')
+
+    assert ids == ["p1"]
+    assert eucan_session._session.post.call_count == 3
+    for call in eucan_session._session.post.mock_calls:
+        assert call.kwargs["data"] == b'{"entities": []}'
+
+    eucan_session._session.post.reset_mock()
+    eucan_session._session.post.side_effect = refused
+    with pytest.raises(requests.ConnectionError):
+        eucan_session.add_encoded("eucan_persons", b"{}", retries=1)
+
+    assert eucan_session._session.post.call_count == 2
+
+
+@pytest.mark.parametrize(
+    "error",
+    [
+        requests.ReadTimeout(),
+        requests.ConnectionError(ProtocolError("Connection aborted.")),
+    ],
+)
+def test_add_encoded_does_not_retry_sent_requests(error):
+    eucan_session = EucanSession("url")
+    eucan_session._session = MagicMock()
+    eucan_session._session.post.side_effect = error
+
+    with pytest.raises(type(error)):
+        eucan_session.add_encoded("eucan_persons", b"{}")
+
+    eucan_session._session.post.assert_called_once()
+
+
+def test_update_batched():
+    eucan_session = EucanSession("url")
+    eucan_session._session = MagicMock()
+    rows = [{"id": str(i)} for i in range(1500)]
+
+    eucan_session.update_batched("eucan_persons", rows)
+
+    assert eucan_session._session.put.call_count == 2
+    eucan_session._session.post.assert_not_called()
+    first_call = eucan_session._session.put.mock_calls[0]
+    assert first_call.args[0] == "url/api/v2/eucan_persons"
+    assert first_call.kwargs["data"].startswith(b'{"entities":')
@@ -1,11 +1,32 @@
+import json
 from unittest import mock
 from unittest.mock import MagicMock
 
 import pytest
+import requests
 
-from molgenis.client import MolgenisRequestError
+from molgenis.client import MolgenisRequestError, Session
 from molgenis.eucan_connect.errors import EucanError, EucanWarning
-from molgenis.eucan_connect.model import Catalogue, RefEntity, TableType
+from molgenis.eucan_connect.importer import Importer
+from molgenis.eucan_connect.model import (
+    Catalogue,
+    RefEntity,
+    StreamingCatalogueData,
+    Table,
+    TableStream,
+    TableType,
+)
+
+
+def rejected(status_code: int, message: str = "Invalid value"):
+    """Raises the error the client raises for a response with this status code"""
+    response = requests.Response()
+    response.status_code = status_code
+    response._content = json.dumps({"errors": [{"message": message}]}).encode()
+    try:
+        response.raise_for_status()
+    except requests.RequestException as ex:
+        Session._raise_exception(ex)
 
 
 def test_import_catalogue(
@@ -79,6 +100,9 @@ def test_import_references(importer, ref_data, session, printer, meta_data):
             [{"id": "New_recr_source", "label": "Test new recruitment source"}],
         ),
     ]
+    # Only the pending references are imported, existing ids are not fetched again
+    session.get.assert_not_called()
+    assert ref_data.pending == {}
 
 
 def test_get_ids_fails(importer, session, fake_catalogue_data):
@@ -117,7 +141,8 @@ def test_delete_rows(importer, session, fake_catalogue_data):
     importer._delete_rows(fake_catalogue_data.persons, catalogue)
 
     assert importer.printer.print.mock_calls == [
-        mock.call("Deleting 2 rows in eucan_persons")
+        mock.call("eucan_persons: 0 added, 1 removed, 1 kept"),
+        mock.call("Deleting 2 rows in eucan_persons"),
     ]
 
     assert importer.warnings == [
@@ -133,3 +158,180 @@ def test_delete_rows(importer, session, fake_catalogue_data):
     target_arg = received_args[0]
     assert target_arg[0] == "eucan_persons"
     assert target_arg[1].sort() == ["person_deleted_id", "person_id"].sort()
+
+
+def test_delete_rows_keeps_skipped_rows(importer, session, fake_catalogue_data):
+    catalogue = Catalogue("Test", "Test catalogue", "test_url", "Source catalogue")
+    persons = fake_catalogue_data.persons.without({"person_id"})
+
+    importer._delete_rows(persons, catalogue)
+
+    # The existing row of the skipped row is neither deleted nor reported
+    assert importer.printer.print.mock_calls == [
+        mock.call("eucan_persons: 0 added, 1 removed, 0 kept"),
+        mock.call("Deleting 1 rows in eucan_persons"),
+    ]
+    session.delete_list.assert_called_once_with("eucan_persons", ["person_deleted_id"])
+    assert importer.warnings == [
+        EucanWarning(
+            "This Test catalogue eucan_persons ID person_deleted_id "
+            "is not in the source catalogue anymore."
+        )
+    ]
+
+
+def test_import_streaming_data(importer, session):
+    catalogue = Catalogue("Test", "Test catalogue", "test_url", "Source catalogue")
+    produced = []
+
+    def batches(table_type, ids):
+        for id_ in ids:
+            produced.append(id_)
+            yield [{"id": id_}]
+
+    catalogue_data = StreamingCatalogueData(
+        catalogue=catalogue,
+        source=catalogue.description,
+        tables=[
+            TableStream(TableType.PERSONS, MagicMock(), batches(TableType.PERSONS, [])),
+            TableStream(
+                TableType.STUDIES, MagicMock(), batches(TableType.STUDIES, ["s1", "s2"])
+            ),
+        ],
+    )
+    importer._get_eucan_ids = MagicMock(side_effect=[{"p_old"}, {"s1", "s_old"}])
+
+    def upload(entity_type_id, batch):
+        # Every batch is uploaded before the next one is produced
+        assert produced[-1] == batch[0]["id"]
+        # and the existing rows are only deleted after all tables are imported
+        session.delete_list.assert_not_called()
+
+    session.add_batched.side_effect = upload
+    session.update_batched.side_effect = upload
+
+    warnings = importer.import_streaming_data(catalogue_data)
+
+    assert session.update_batched.mock_calls == [
+        mock.call("eucan_study", [{"id": "s1"}])
+    ]
+    assert session.add_batched.mock_calls == [mock.call("eucan_study", [{"id": "s2"}])]
+    assert session.delete_list.mock_calls == [
+        mock.call("eucan_study", ["s_old"]),
+        mock.call("eucan_persons", ["p_old"]),
+    ]
+    assert warnings == [
+        EucanWarning(
+            "This Test catalogue eucan_study ID s_old "
+            "is not in the source catalogue anymore."
+        ),
+        EucanWarning(
+            "This Test catalogue eucan_persons ID p_old "
+            "is not in the source catalogue anymore."
+        ),
+    ]
+
+
+def test_import_streaming_data_fails(importer, session):
+    catalogue = Catalogue("Test", "Test catalogue", "test_url", "Source catalogue")
+    catalogue_data = StreamingCatalogueData(
+        catalogue=catalogue,
+        source=catalogue.description,
+        tables=[TableStream(TableType.PERSONS, MagicMock(), iter([[{"id": "p1"}]]))],
+    )
+    importer._get_eucan_ids = MagicMock(return_value={"p_old"})
+    session.add_batched.side_effect = MolgenisRequestError("")
+
+    with pytest.raises(EucanError) as e:
+        importer.import_streaming_data(catalogue_data)
+
+    assert str(e.value) == "Error importing rows to eucan_persons"
+    session.delete_list.assert_not_called()
+
+
+def test_import_catalogue_recover(session, printer, fake_catalogue_data):
+    importer = Importer(session, printer, recover=True)
+    importer._delete_rows = MagicMock()
+    bad_ids = {"p3", "p6"}
+    rows = [{"id": f"p{i}"} for i in range(8)]
+    fake_catalogue_data.persons = Table.of(TableType.PERSONS, MagicMock(), rows)
+
+    def add_batched(entity_type_id, batch):
+        if bad_ids.intersection(row["id"] for row in batch):
+            rejected(400)
+
+    session.add_batched.side_effect = add_batched
+
+    warnings = importer.import_catalogue_data(fake_catalogue_data)
+
+    assert [str(warning.message) for warning in warnings] == [
+        "Row p3 is not imported in eucan_persons: 400 Client Error: None for url: "
+        "None: Invalid value",
+        "Row p6 is not imported in eucan_persons: 400 Client Error: None for url: "
+        "None: Invalid value",
+    ]
+    persons_calls = [
+        call.args[1]
+        for call in session.add_batched.mock_calls
+        if call.args[0] == "eucan_persons"
+    ]
+    # 1 batch of 8, 2 of 4, 4 of 2 and 4 single rows
+    assert len(persons_calls) == 11
+    imported = [
+        row["id"]
+        for batch in persons_calls
+        if not bad_ids.intersection(row["id"] for row in batch)
+        for row in batch
+    ]
+    assert sorted(imported) == ["p0", "p1", "p2", "p4", "p5", "p7"]
+
+
+@pytest.mark.parametrize("status_code", [401, 500])
+def test_import_catalogue_recover_other_errors(
+    session, printer, fake_catalogue_data, status_code
+):
+    importer = Importer(session, printer, recover=True)
+    importer._delete_rows = MagicMock()
+    session.add_batched.side_effect = lambda entity_type_id, batch: rejected(
+        status_code
+    )
+
+    with pytest.raises(EucanError) as e:
+        importer.import_catalogue_data(fake_catalogue_data)
+
+    assert str(e.value) == "Error importing rows to eucan_persons"
+    # The batch is not bisected
+    assert session.add_batched.call_count == 1
+
+
+def test_import_streaming_data_recover(session, printer):
+    importer = Importer(session, printer, recover=True)
+    catalogue = Catalogue("Test", "Test catalogue", "test_url", "Source catalogue")
+    catalogue_data = StreamingCatalogueData(
+        catalogue=catalogue,
+        source=catalogue.description,
+        tables=[
+            TableStream(
+                TableType.PERSONS,
+                MagicMock(),
+                iter([[{"id": "p1"}, {"id": "p2"}], [{"id": "p3"}]]),
+            )
+        ],
+    )
+    importer._get_eucan_ids = MagicMock(return_value={"p1", "p_old"})
+
+    def upload(entity_type_id, batch):
+        if {"p1", "p3"}.intersection(row["id"] for row in batch):
+            rejected(400)
+
+    session.add_batched.side_effect = upload
+    session.update_batched.side_effect = upload
+
+    importer.import_streaming_data(catalogue_data)
+
+    # The rejected update of p1 does not delete its existing row
+    assert session.delete_list.mock_calls == [mock.call("eucan_persons", ["p_old"])]
+    assert (
+        mock.call("eucan_persons: 1 added, 1 removed, 0 kept")
+        in printer.print.mock_calls
+    )
@@ -5,7 +5,8 @@ import numpy as np
 import pandas as pd
 
 from molgenis.eucan_connect.lifecycle import LifeCycle
-from molgenis.eucan_connect.model import Catalogue
+from molgenis.eucan_connect.mapping import Composite
+from molgenis.eucan_connect.model import Catalogue, TableType
 
 
 def test_lifecycle_data(
@@ -23,7 +24,9 @@ def test_lifecycle_data(
     lifecycle.lifecycle_data()
     lifecycle.get_lc_cohort_data.assert_called_once()
 
-    assert eucan.printer.print.mock_calls == [mock.call("🗑 Get LifeCycle studies")]
+    assert eucan.printer.print.mock_calls[0] == mock.call("🗑 Get LifeCycle studies")
+    message = eucan.printer.print.mock_calls[1].args[0]
+    assert message.startswith("Memory of the cohorts frame reduced from ")
     assert eucan.printer.print_sub_header.mock_calls == [
         mock.call("Number of cohorts retrieved for LifeCycle is 2")
     ]
@@ -87,3 +90,121 @@ def test_create_df_and_convert_values(
     lifecycle._convert_list_values.assert_called_once()
     lifecycle._extract_data.assert_called_once()
     lifecycle._group_column_information.assert_called_once()
+
+
+def test_get_lc_cohort_data_split(eucan):
+    catalogue = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    lifecycle = LifeCycle(eucan, eucan.printer, catalogue)
+
+    def graphql_response(url, headers, json):
+        query = json["query"]
+        if "contributors" in query:
+            cohorts = [{"pid": "C1", "contributors": [{"contact": {"email": "e"}}]}]
+        elif "subcohorts" in query:
+            cohorts = [{"pid": "C2", "subcohorts": [{"name": "pop"}]}, {"pid": "C1"}]
+        elif "collectionEvents" in query:
+            cohorts = [{"pid": "C1"}, {"pid": "C2"}]
+        else:
+            cohorts = [{"pid": "C1", "name": "One"}, {"pid": "C2", "name": "Two"}]
+        response = MagicMock()
+        response.json.return_value = {"data": {"Cohorts": cohorts}}
+        return response
+
+    lifecycle._lc_session.post = MagicMock(side_effect=graphql_response)
+
+    cohorts = lifecycle.get_lc_cohort_data()
+
+    assert lifecycle._lc_session.post.call_count == 4
+    assert cohorts == [
+        {"pid": "C1", "name": "One", "contributors": [{"contact": {"email": "e"}}]},
+        {"pid": "C2", "name": "Two", "subcohorts": [{"name": "pop"}]},
+    ]
+
+
+def test_get_lc_cohort_data_single(eucan, lifecycle_data):
+    catalogue = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    lifecycle = LifeCycle(eucan, eucan.printer, catalogue, split_queries=False)
+    lifecycle._lc_session.post = MagicMock()
+    lifecycle._lc_session.post.return_value.json.return_value = {
+        "data": {"Cohorts": lifecycle_data}
+    }
+
+    assert lifecycle.get_lc_cohort_data() == lifecycle_data
+
+    lifecycle._lc_session.post.assert_called_once()
+    query = lifecycle._lc_session.post.call_args[1]["json"]["query"]
+    assert query.startswith("query {Cohorts {pid, name, acronym")
+    assert "contributors {contact" in query
+    assert "collectionEvents {name" in query
+
+
+def test_compact_dtypes(lifecycle_converted_df):
+    df = lifecycle_converted_df.copy()
+    memory_before = df.memory_usage(deep=True).sum()
+
+    compact_df = LifeCycle._compact_dtypes(df)
+
+    assert compact_df.memory_usage(deep=True).sum() < memory_before
+    assert compact_df["study_start_year"].dtype == "Int64"
+    assert compact_df["population_number_of_participants"].dtype == "Int64"
+    assert compact_df["study_acronym"].dtype == "category"
+    assert compact_df["persons_id"].dtype == "category"
+    assert compact_df["study_contacts"].dtype == object
+    assert compact_df["population_number_of_participants"].isna().sum() == (
+        lifecycle_converted_df["population_number_of_participants"].isna().sum()
+    )
+    assert compact_df.to_dict("records")[0]["study_start_year"] == 1994
+
+
+def test_generate_ids(eucan):
+    catalogue = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    lifecycle = LifeCycle(eucan, eucan.printer, catalogue)
+    df = pd.DataFrame(
+        {"study_id": ["s1", "s1", "s2", "s2"], "events_name": ["a", "b", np.nan, "a"]}
+    )
+
+    ids = lifecycle._generate_ids(df, ["study_id", "events_name"], TableType.EVENTS, 3)
+
+    assert list(ids[[0, 1, 3]]) == [
+        "lifecycle:eventID:000",
+        "lifecycle:eventID:001",
+        "lifecycle:eventID:002",
+    ]
+    assert ids[2] is np.nan
+
+
+def test_generate_stable_ids(eucan, lifecycle_data):
+    catalogue = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    lifecycle = LifeCycle(eucan, eucan.printer, catalogue, stable_ids=True)
+
+    all_cohorts = lifecycle._convert_values(lifecycle._create_df(lifecycle_data))
+    one_cohort = lifecycle._convert_values(lifecycle._create_df(lifecycle_data[:1]))
+
+    for column in ["persons_id", "events_id", "population_id"]:
+        first_ids = all_cohorts.loc[
+            all_cohorts["study_id"] == one_cohort["study_id"][0], column
+        ]
+        assert list(first_ids.dropna()) == list(one_cohort[column].dropna())
+        assert first_ids.dropna().str.match(r"lifecycle:\w+:[0-9a-f]{16}$").all()
+
+
+def test_compose():
+    df = pd.DataFrame(
+        {
+            "prefix": ["de", np.nan, "van", np.nan],
+            "surname": ["Vries", "Jansen", np.nan, np.nan],
+            "email": [np.nan, "j@x.nl", np.nan, np.nan],
+        }
+    )
+
+    last_name = LifeCycle._compose(
+        df, Composite("n", ["prefix", "surname"], " ", optional=["prefix"])
+    )
+    key = LifeCycle._compose(
+        df, Composite("k", ["prefix", "surname"], preferred="email")
+    )
+
+    assert last_name.tolist()[:2] == ["de Vries", "Jansen"]
+    assert last_name[2:].isna().all()
+    assert key.tolist()[:2] == ["deVries", "j@x.nl"]
+    assert key[2:].isna().all()
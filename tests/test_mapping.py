@@ -0,0 +1,73 @@
+from molgenis.eucan_connect.mapping import (
+    Collection,
+    Composite,
+    Field,
+    IdField,
+    ListField,
+    SourceMapping,
+)
+from molgenis.eucan_connect.model import TableType
+
+
+def test_compile():
+    mapping = SourceMapping(
+        key="pid",
+        fields=[Field("name", "study_name"), Field("design.name", "study_design")],
+        list_fields=[ListField("conditions", "name", "access_possibility")],
+        collections=[
+            Collection(
+                "contributors",
+                TableType.PERSONS,
+                fields=[
+                    Field("contact.email", "email"),
+                    Field("contact.surname", intermediate=True),
+                ],
+                list_fields=[
+                    ListField("type", "name", "contribution_types", intermediate=True)
+                ],
+                composites=[
+                    Composite(
+                        "key", ["contact.surname"], preferred="email", intermediate=True
+                    )
+                ],
+            ),
+        ],
+        ids=[IdField(TableType.PERSONS, ["persons_email"])],
+    )
+
+    plan = mapping.compile()
+
+    assert plan.graphql_fields == "pid, name, design {name}, conditions {name}"
+    assert plan.graphql_collections == {
+        "contributors": "contributors {contact {email, surname}, type {name}}"
+    }
+    assert plan.graphql_query == (
+        "pid, name, design {name}, conditions {name}, "
+        "contributors {contact {email, surname}, type {name}}"
+    )
+    assert plan.table_prefix == {"study": "study_", "contributors": "persons_"}
+    assert plan.root_renames == {"name": "study_name", "design.name": "study_design"}
+    assert plan.collection_renames == {
+        "persons_contact.email": "persons_email",
+        "study_pid": "study_id",
+    }
+    assert plan.list_columns == {
+        "study_conditions": ["_name", "study_access_possibility"],
+        "persons_type": ["_name", "persons_contribution_types"],
+    }
+    assert plan.composites == [
+        Composite(
+            "persons_key",
+            ["persons_contact.surname"],
+            preferred="persons_email",
+            intermediate=True,
+        )
+    ]
+    assert plan.id_keys == {TableType.PERSONS: ["persons_email"]}
+    assert plan.drop_columns == [
+        "study_conditions",
+        "persons_contact.surname",
+        "persons_type",
+        "persons_contribution_types",
+        "persons_key",
+    ]
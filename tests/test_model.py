@@ -0,0 +1,234 @@
+import pickle
+
+import pytest
+
+from molgenis.eucan_connect.model import (
+    AttributeMeta,
+    Catalogue,
+    ColumnarRows,
+    IsoCountryData,
+    RefData,
+    RefEntity,
+    RefTable,
+    TableMeta,
+    TableType,
+)
+
+
+def test_columnar_rows():
+    rows = ColumnarRows(
+        [
+            {"id": "a", "label": "A"},
+            {"id": "b", "parent": "a"},
+            {"id": "a", "label": "A2"},
+        ]
+    )
+
+    assert list(rows.keys()) == ["a", "b"]
+    assert rows.rows == (rows["a"], rows["b"])
+    assert rows["a"] == {"id": "a", "label": "A2"}
+    assert rows["b"] == {"id": "b", "parent": "a"}
+    assert "label" not in rows["b"]
+    assert rows["b"].get("label") is None
+    assert list(rows.columns) == ["id", "label", "parent"]
+    with pytest.raises(TypeError):
+        rows["a"]["label"] = "B"
+
+
+def test_ref_table_rows_are_cached():
+    table = RefTable.of(RefEntity.BIOSAMPLES, [{"id": "blood", "label": "Blood"}])
+
+    assert table.rows is table.rows
+    assert dict(table.rows[0]) == {"id": "blood", "label": "Blood"}
+
+
+def test_columnar_rows_pickle():
+    rows = ColumnarRows([{"id": "a", "label": "A"}, {"id": "b"}])
+
+    unpickled = pickle.loads(pickle.dumps(rows))
+
+    assert unpickled["b"] == {"id": "b"}
+    assert unpickled.rows == rows.rows
+
+
+@pytest.fixture
+def iso_country_data():
+    return IsoCountryData(
+        iso_country_data=[
+            {
+                "iso2_code": "NL",
+                "iso3_code": "NLD",
+                "country_name": "Netherlands",
+                "country_code": 528,
+            },
+            {
+                "iso2_code": "CI",
+                "iso3_code": "CIV",
+                "country_name": "Côte d'Ivoire",
+                "country_code": 384,
+            },
+            {
+                "iso2_code": "GN",
+                "iso3_code": "GIN",
+                "country_name": "Guinea",
+                "country_code": 324,
+            },
+            {
+                "iso2_code": "GW",
+                "iso3_code": "GNB",
+                "country_name": "Guinea-Bissau",
+                "country_code": 624,
+            },
+        ]
+    )
+
+
+def test_get_country_id(iso_country_data):
+    assert iso_country_data.get_country_id("NL") == "NL"
+    assert iso_country_data.get_country_id("nld") == "NL"
+    assert iso_country_data.get_country_id(" the netherlands ") == ""
+    assert iso_country_data.get_country_id("NETHERLANDS") == "NL"
+    assert iso_country_data.get_country_id("cote d'ivoire") == "CI"
+    assert iso_country_data.get_country_id("528") == "NL"
+    assert iso_country_data.get_country_id("Belgium") == ""
+
+
+def test_get_country_ids(iso_country_data):
+    assert iso_country_data.get_country_ids(["NL", "GIN", "NL", "?"]) == [
+        "NL",
+        "GN",
+        "NL",
+        "",
+    ]
+
+
+def test_find_country_id(iso_country_data):
+    assert iso_country_data.find_country_id("Amsterdam, the Netherlands") == "NL"
+    assert iso_country_data.find_country_id("Bissau (Guinea-Bissau)") == "GW"
+    assert iso_country_data.find_country_id("Conakry, GUINEA") == "GN"
+    assert iso_country_data.find_country_id("Abidjan, Cote d'Ivoire") == "CI"
+    assert iso_country_data.find_country_id("Netherlandsish") == ""
+    assert IsoCountryData(iso_country_data=[]).find_country_id("Guinea") == ""
+
+
+def test_ref_data_add_new_ref():
+    ref_data = RefData.from_dict(
+        {
+            RefEntity.BIOSAMPLES: RefTable.of(
+                RefEntity.BIOSAMPLES, [{"id": "blood", "label": "Blood"}]
+            )
+        }
+    )
+    rows_by_id = ref_data.table_by_type[RefEntity.BIOSAMPLES].rows_by_id
+
+    ref_data.add_new_ref("biosamples", "urine", "Urine")
+    ref_data.add_new_ref(RefEntity.BIOSAMPLES, "blood", "Blood again")
+    ref_data.add_new_refs("biosamples", [{"id": "urine", "label": "Urine"}])
+
+    # The rows are appended to the existing table
+    assert ref_data.table_by_type[RefEntity.BIOSAMPLES].rows_by_id is rows_by_id
+    assert ref_data.has_ref(RefEntity.BIOSAMPLES, "urine")
+    assert ref_data.all_refs(RefEntity.BIOSAMPLES) == ["blood", "urine"]
+    assert ref_data.table_by_type[RefEntity.BIOSAMPLES].rows[0]["label"] == "Blood"
+    assert ref_data.pending_refs(RefEntity.BIOSAMPLES) == [
+        {"id": "urine", "label": "Urine"}
+    ]
+
+    ref_data.clear_pending(RefEntity.BIOSAMPLES)
+
+    assert ref_data.pending_refs(RefEntity.BIOSAMPLES) == []
+    assert ref_data.has_ref(RefEntity.BIOSAMPLES, "urine")
+
+
+@pytest.fixture
+def persons_meta():
+    def attribute(**data):
+        return {"data": data}
+
+    return TableMeta(
+        meta={
+            "data": {
+                "id": "eucan_persons",
+                "attributes": {
+                    "items": [
+                        attribute(
+                            name="id", type="string", idAttribute=True, nullable=False
+                        ),
+                        attribute(
+                            name="name", type="string", labelAttribute=True, maxLength=5
+                        ),
+                        attribute(name="details", type="compound"),
+                        attribute(name="year", type="int"),
+                        attribute(name="weight", type="decimal"),
+                        attribute(name="active", type="bool"),
+                        attribute(
+                            name="country",
+                            type="xref",
+                            refEntityType={"data": {"id": "eucan_country"}},
+                        ),
+                        attribute(
+                            name="types",
+                            type="mref",
+                            refEntityType={
+                                "links": {"self": "https://url/metadata/eucan_types"}
+                            },
+                        ),
+                    ]
+                },
+            }
+        }
+    )
+
+
+def test_table_meta_attributes(persons_meta):
+    attributes = persons_meta.attributes
+
+    assert persons_meta.id_attribute == "id"
+    assert list(attributes) == [
+        "id",
+        "name",
+        "year",
+        "weight",
+        "active",
+        "country",
+        "types",
+    ]
+    assert attributes["id"] == AttributeMeta(
+        "id", "string", nillable=False, id_attribute=True
+    )
+    assert attributes["name"].label_attribute is True
+    assert attributes["name"].max_length == 5
+    assert attributes["country"].ref_entity == "eucan_country"
+    assert attributes["types"].ref_entity == "eucan_types"
+    assert attributes["types"].is_reference
+    assert not attributes["year"].is_reference
+
+
+def test_attribute_meta_filled_by_server():
+    assert AttributeMeta.of({"name": "id", "auto": True}).is_filled_by_server
+    assert AttributeMeta.of({"name": "a", "expression": "id"}).is_filled_by_server
+    assert AttributeMeta.of({"name": "b", "defaultValue": "x"}).is_filled_by_server
+    assert not AttributeMeta.of({"name": "c", "expression": ""}).is_filled_by_server
+
+
+def test_attribute_meta_coerce(persons_meta):
+    attributes = persons_meta.attributes
+
+    assert attributes["year"].coerce(2001.0) == 2001
+    assert attributes["weight"].coerce("3.5") == 3.5
+    assert attributes["active"].coerce("True") is True
+    assert attributes["types"].coerce("t1") == ["t1"]
+    assert attributes["id"].coerce("p1") == "p1"
+    with pytest.raises(ValueError):
+        attributes["year"].coerce(2001.5)
+    with pytest.raises(ValueError):
+        attributes["active"].coerce("maybe")
+
+
+def test_get_id_prefix():
+    catalogue = Catalogue("BC", "Birth Cohorts", "bc_url", "BirthCohorts")
+
+    assert catalogue.get_id_prefix(TableType.PERSONS) == "birthcohorts:contactID:"
+    assert catalogue.get_id_prefix(TableType.PERSONS) is catalogue.get_id_prefix(
+        TableType.PERSONS
+    )
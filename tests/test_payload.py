@@ -0,0 +1,70 @@
+import json
+from unittest.mock import patch
+
+import numpy as np
+import pandas as pd
+import pytest
+
+from molgenis.eucan_connect import payload
+from molgenis.eucan_connect.model import ColumnarRows
+from molgenis.eucan_connect.payload import Payload
+
+ROWS = [
+    {
+        "id": "a",
+        "count": np.int64(3),
+        "size": np.float64("nan"),
+        "types": np.array(["x", "y"], dtype=object),
+        "year": pd.NA,
+        "list": [1, np.nan],
+    },
+    {"id": "b"},
+]
+
+EXPECTED = {
+    "entities": [
+        {
+            "id": "a",
+            "count": 3,
+            "size": None,
+            "types": ["x", "y"],
+            "year": None,
+            "list": [1, None],
+        },
+        {"id": "b"},
+    ]
+}
+
+
+def test_encode():
+    assert json.loads(payload.encode(ColumnarRows(ROWS).rows)) == EXPECTED
+
+
+def test_encode_without_orjson():
+    with patch("molgenis.eucan_connect.payload.orjson", None):
+        assert json.loads(payload.encode(ROWS)) == EXPECTED
+
+
+def test_encode_unknown_type():
+    with pytest.raises(TypeError):
+        payload.encode([{"id": object()}])
+
+
+def test_payload_bodies_are_encoded_lazily():
+    rows = [{"id": str(i)} for i in range(5)]
+    with patch(
+        "molgenis.eucan_connect.payload.encode", side_effect=payload.encode
+    ) as encode:
+        bodies = Payload(rows, batch_size=2)
+        assert len(bodies) == 3
+        assert encode.call_count == 0
+
+        body_iterator = iter(bodies)
+        assert json.loads(next(body_iterator)) == {
+            "entities": [{"id": "0"}, {"id": "1"}]
+        }
+        assert encode.call_count == 1
+
+        assert len(list(body_iterator)) == 2
+        assert json.loads(bodies.body(2)) == {"entities": [{"id": "4"}]}
+        assert encode.call_count == 4
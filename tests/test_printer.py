@@ -47,6 +47,15 @@ def test_reset_indent(capsys):
     assert captured.out == expected
 
 
+def test_print_output(capsys):
+    printer = Printer()
+    printer.indent()
+    printer.print_output("line1\n\n    line2\n")
+
+    captured = capsys.readouterr()
+    assert captured.out == "    line1\n\n        line2\n"
+
+
 def test_print_catalogue_title(capsys):
     catalogue = Catalogue("RC", "RECAP", "recap_url", "Mica")
     expected = textwrap.dedent(
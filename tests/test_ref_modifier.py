@@ -1,32 +1,33 @@
 from unittest import mock
 
+import numpy as np
 import pandas as pd
 
 from molgenis.eucan_connect.model import RefEntity
-from molgenis.eucan_connect.ref_modifier import RefModifier
+from molgenis.eucan_connect.ref_modifier import RefModifier, RefNormaliser
 
 
 def test_check_references(fake_source_data, printer, ref_data):
-    new_ref_vals = {
-        "Urine": "events_biosamples_type",
-        "New Biosample": "events_biosamples_type",
-        "Survey Data": "events_datasources_type",
-        "Phone call": "events_datasources_type",
-        "DNA Database": "events_type_administrative_databases",
-        "80-81": "population_recruitment_sources",
-        "3-4": "population_recruitment_sources",
-    }
-    expected_ref_print = [mock.call("Check for new reference values")]
-    for value, column in new_ref_vals.items():
-        expected_ref_print.append(
-            mock.call(
-                "A new reference value ("
-                + value
-                + ") will be added for "
-                + column
-                + " in the EUCAN-Connect Catalogue"
-            )
-        )
+    expected_ref_print = [
+        mock.call("Check for new reference values"),
+        mock.call(
+            "2 new reference value(s) will be added for events_biosamples_type in "
+            "the EUCAN-Connect Catalogue: Urine, New Biosample"
+        ),
+        mock.call(
+            "2 new reference value(s) will be added for events_datasources_type in "
+            "the EUCAN-Connect Catalogue: Survey Data, Phone call"
+        ),
+        mock.call(
+            "1 new reference value(s) will be added for "
+            "events_type_administrative_databases in the EUCAN-Connect Catalogue: "
+            "DNA Database"
+        ),
+        mock.call(
+            "2 new reference value(s) will be added for "
+            "population_recruitment_sources in the EUCAN-Connect Catalogue: 80-81, 3-4"
+        ),
+    ]
 
     RefModifier(
         printer=printer, ref_data=ref_data, source_data=fake_source_data
@@ -60,3 +61,80 @@ def test_convert_references(
     )._convert_reference_data()
 
     pd.testing.assert_frame_equal(fake_source_data, fake_converted_source_data)
+
+
+def test_ref_normaliser():
+    normaliser = RefNormaliser()
+    column = pd.Series(
+        [
+            np.array(["Phone call", "80-81"], dtype=object),
+            np.nan,
+            ["Before/After", "<5", "A+"],
+        ]
+    )
+
+    assert normaliser("Survey Data") == "survey_data"
+    assert normaliser.normalise_column(column).tolist()[0] == [
+        "phone_call",
+        "80_till_81",
+    ]
+    assert np.isnan(normaliser.normalise_column(column)[1])
+    assert normaliser.normalise_column(column)[2] == [
+        "before_or_after",
+        "before_5",
+        "aPlus",
+    ]
+
+
+def test_ref_normaliser_column_normalises_distinct_labels_once():
+    normaliser = RefNormaliser()
+    column = pd.Series([["Urine", "Blood"], ["Urine"], np.nan, ["Blood", "Urine"]])
+
+    with mock.patch.object(
+        RefNormaliser, "__call__", autospec=True, side_effect=RefNormaliser.__call__
+    ) as call:
+        converted = normaliser.normalise_column(column)
+
+    assert call.call_count == 2
+    assert converted[3] == ["blood", "urine"]
+
+
+def test_ref_normaliser_memo_is_bounded():
+    normaliser = RefNormaliser(maxsize=2)
+
+    for label in ["Urine", "Blood", "Urine", "Saliva", "Blood"]:
+        normaliser(label)
+
+    info = normaliser.cache_info()
+    assert (info.hits, info.misses, info.currsize) == (1, 4, 2)
+
+
+def test_ref_modifier_memo_statistics(fake_source_data, printer, ref_data):
+    normaliser = RefNormaliser()
+    first = RefModifier(
+        printer=printer,
+        ref_data=ref_data,
+        source_data=fake_source_data.copy(),
+        normaliser=normaliser,
+    )
+    first.ref_modifier()
+
+    assert first.memo_hits == 0
+    assert first.memo_misses == normaliser.cache_info().currsize
+    assert first.memo_misses > 0
+
+    # A second catalogue with the same labels finds all of them in the shared memo
+    second = RefModifier(
+        printer=printer,
+        ref_data=ref_data,
+        source_data=fake_source_data.copy(),
+        normaliser=normaliser,
+    )
+    second.ref_modifier()
+
+    assert second.memo_hits == first.memo_misses
+    assert second.memo_misses == 0
+    printer.print.assert_called_with(
+        f"{second.memo_hits} of {second.memo_hits} reference label(s) found in the "
+        f"memo (100%)"
+    )
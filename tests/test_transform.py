@@ -0,0 +1,48 @@
+import pytest
+
+from molgenis.eucan_connect.errors import EucanError, EucanWarning
+from molgenis.eucan_connect.model import Catalogue, RefEntity, TableType
+from molgenis.eucan_connect.transform import TransformResult, transform_catalogue
+
+
+def test_transform_catalogue(lifecycle_data, ref_data):
+    catalogue = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+
+    result = TransformResult.deserialise(
+        transform_catalogue(catalogue, lifecycle_data, ref_data)
+    )
+
+    assert result.catalogue == catalogue
+    assert [len(result.rows[table_type]) for table_type in TableType] == [3, 2, 3, 2]
+    assert result.rows[TableType.STUDIES][0]["id"] == "lifecycle:studyID:TEST1"
+    assert result.rows[TableType.STUDIES][0]["source_catalogue"] == "LC"
+    assert {ref["id"] for ref in result.new_refs[RefEntity.DATABASETYPES]} == {
+        "dce1_aoi1",
+        "dce1_aoi2",
+    }
+    assert result.new_refs[RefEntity.RECRUITMENTSOURCES] == [
+        {"id": "code_rc1", "label": "code_RC1"}
+    ]
+    assert result.warnings == []
+    assert result.output.splitlines()[1] == "✏️ Verify reference data"
+
+
+def test_transform_unknown_type(ref_data):
+    catalogue = Catalogue("Test", "Test", "test_url", "DNA_catalogue")
+    with pytest.raises(EucanError) as e:
+        transform_catalogue(catalogue, [], ref_data)
+
+    assert str(e.value) == "Unknown catalogue type DNA_catalogue"
+
+
+def test_serialise():
+    catalogue = Catalogue("LC", "LifeCycle", "lifecycle_url", "LifeCycle")
+    result = TransformResult(
+        catalogue=catalogue,
+        rows={TableType.PERSONS: [{"id": "p1", "email": "e"}] * 100},
+        new_refs={RefEntity.BIOSAMPLES: [{"id": "blood", "label": "Blood"}]},
+        warnings=[EucanWarning("warning")],
+        output="output\n",
+    )
+
+    assert TransformResult.deserialise(result.serialise()) == result
@@ -1,4 +1,5 @@
 import numpy as np
+import pandas as pd
 import pytest
 
 from molgenis.eucan_connect import utils
@@ -63,3 +64,36 @@ def test_isnan():
     assert utils.isnan(x2) is False
     assert utils.isnan(x3) is False
     assert utils.isnan(x4) is True
+    assert utils.isnan(pd.NA) is True
+
+
+def test_format_size():
+    assert utils.format_size(512) == "512.0 B"
+    assert utils.format_size(1536) == "1.5 KiB"
+    assert utils.format_size(3 * 1024 ** 2) == "3.0 MiB"
+    assert utils.format_size(5 * 1024 ** 3) == "5.0 GiB"
+
+
+def test_isnan_array():
+    values = [np.nan, None, pd.NA, "a", 0, ["x", "y"], np.array(["z"])]
+
+    assert list(utils.isnan_array(values)) == [
+        True,
+        True,
+        True,
+        False,
+        False,
+        False,
+        False,
+    ]
+
+
+def test_normalise():
+    assert utils.normalise("  Côte  d'Ivoire ") == "cote d'ivoire"
+    assert utils.normalise("ÅLAND") == "aland"
+    assert utils.normalise(528) == "528"
+
+
+def test_slugify():
+    assert utils.slugify("de Vries-Bos (Jr.)") == "deVriesBosJr"
+    assert utils.slugify("Müller Ødegård Ćosić Łukasz") == "MullerOdegardCosicLukasz"
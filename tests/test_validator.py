@@ -0,0 +1,146 @@
+from unittest.mock import MagicMock
+
+import numpy as np
+
+from molgenis.eucan_connect.errors import EucanWarning
+from molgenis.eucan_connect.model import (
+    Catalogue,
+    CatalogueData,
+    RefEntity,
+    Table,
+    TableMeta,
+    TableType,
+)
+from molgenis.eucan_connect.validator import Validator
+
+
+def table_meta(*attributes: dict) -> TableMeta:
+    return TableMeta(
+        meta={"data": {"attributes": {"items": [{"data": a} for a in attributes]}}}
+    )
+
+
+def catalogue_data(persons: list, events: list) -> CatalogueData:
+    id_ = {"name": "id", "type": "string", "idAttribute": True, "nullable": False}
+    persons_meta = table_meta(
+        id_,
+        {"name": "last_name", "type": "string", "nullable": False, "maxLength": 5},
+        {"name": "role", "type": "enum", "enumOptions": ["PI", "contact"]},
+    )
+    events_meta = table_meta(
+        id_,
+        {"name": "start_year", "type": "int"},
+        {
+            "name": "biosamples_type",
+            "type": "mref",
+            "refEntityType": {"data": {"id": "eucan_biosamples"}},
+        },
+        {
+            "name": "contact",
+            "type": "xref",
+            "refEntityType": {"data": {"id": "eucan_persons"}},
+        },
+    )
+    empty_meta = table_meta(id_)
+    tables = {
+        TableType.PERSONS: Table.of(TableType.PERSONS, persons_meta, persons),
+        TableType.EVENTS: Table.of(TableType.EVENTS, events_meta, events),
+        TableType.POPULATIONS: Table.of(TableType.POPULATIONS, empty_meta, []),
+        TableType.STUDIES: Table.of(TableType.STUDIES, empty_meta, []),
+    }
+    catalogue = Catalogue("Test", "Test catalogue", "test_url", "LifeCycle")
+    return CatalogueData.from_dict(catalogue, catalogue.description, tables)
+
+
+def test_validate(printer, ref_data):
+    data = catalogue_data(
+        persons=[
+            {"id": "p1", "last_name": "Geluk", "role": "PI"},
+            {"id": "p2", "last_name": "Gelukkig", "role": "boss"},
+            {"id": "p3", "last_name": np.nan},
+        ],
+        events=[
+            {"id": "e1", "start_year": 2001, "biosamples_type": ["blood"]},
+            {"id": "e2", "start_year": "soon", "contact": "p1"},
+            {"id": "e3", "biosamples_type": ["blood", "hair"], "contact": "p9"},
+        ],
+    )
+
+    warnings = Validator(printer, ref_data).validate(data)
+
+    assert warnings == [
+        EucanWarning("eucan_persons ID p3: last_name is required"),
+        EucanWarning(
+            "eucan_persons ID p2: last_name value is longer than 5 characters"
+        ),
+        EucanWarning("eucan_persons ID p2: role value boss is not one of PI, contact"),
+        EucanWarning("eucan_events ID e2: start_year value soon is not of type int"),
+        EucanWarning(
+            "eucan_events ID e3: biosamples_type refers to unknown eucan_biosamples "
+            "ID(s) hair"
+        ),
+        EucanWarning(
+            "eucan_events ID e3: contact refers to unknown eucan_persons ID(s) p9"
+        ),
+    ]
+    assert printer.print_warning.call_count == 6
+
+
+def test_validate_filled_by_server(printer, ref_data):
+    id_ = {"name": "id", "type": "string", "idAttribute": True, "nullable": False}
+    meta = table_meta(
+        id_,
+        {"name": "auto_id", "type": "string", "nullable": False, "auto": True},
+        {"name": "label", "type": "string", "nullable": False, "expression": "id"},
+        {"name": "status", "type": "string", "nullable": False, "defaultValue": "A"},
+        {"name": "name", "type": "string", "nullable": False},
+    )
+    empty_meta = table_meta(id_)
+    tables = {
+        TableType.PERSONS: Table.of(TableType.PERSONS, meta, [{"id": "p1"}]),
+        TableType.EVENTS: Table.of(TableType.EVENTS, empty_meta, []),
+        TableType.POPULATIONS: Table.of(TableType.POPULATIONS, empty_meta, []),
+        TableType.STUDIES: Table.of(TableType.STUDIES, empty_meta, []),
+    }
+    catalogue = Catalogue("Test", "Test catalogue", "test_url", "LifeCycle")
+    data = CatalogueData.from_dict(catalogue, catalogue.description, tables)
+
+    # Only the attribute without a value of the server is required
+    assert Validator(printer, ref_data).validate(data) == [
+        EucanWarning("eucan_persons ID p1: name is required")
+    ]
+
+
+def test_validate_new_reference(printer, ref_data):
+    ref_data.add_new_ref(RefEntity.BIOSAMPLES, "hair", "Hair")
+    data = catalogue_data(
+        persons=[{"id": "p1", "last_name": "Geluk"}],
+        events=[{"id": "e1", "biosamples_type": ["blood", "hair"]}],
+    )
+
+    assert Validator(MagicMock(), ref_data).validate(data) == []
+
+
+def test_validate_reference_to_invalid_row(printer, ref_data):
+    data = catalogue_data(
+        persons=[
+            {"id": "p1", "last_name": "Geluk"},
+            {"id": "p2", "last_name": "Gelukkig"},
+        ],
+        events=[{"id": "e1", "contact": "p1"}, {"id": "e2", "contact": "p2"}],
+    )
+    validator = Validator(printer, ref_data)
+
+    warnings = validator.validate(data)
+
+    assert warnings[-1] == EucanWarning(
+        "eucan_events ID e2: contact refers to unknown eucan_persons ID(s) p2"
+    )
+    assert validator.invalid_ids == {
+        TableType.PERSONS: {"p2"},
+        TableType.EVENTS: {"e2"},
+        TableType.POPULATIONS: set(),
+        TableType.STUDIES: set(),
+    }
+    events = data.events.without(validator.invalid_ids[TableType.EVENTS])
+    assert [row.to_dict() for row in events.rows] == [{"id": "e1", "contact": "p1"}]